@@ -1,7 +1,14 @@
 import sublime, sublime_plugin
 from os import path
-import os, datetime, tempfile, desktop, re, sys, pickle
-from plistlib import readPlist
+import os, tempfile, desktop, re, sys, bisect, threading, itertools, time, Queue
+from htmlprint import HtmlRenderer, HtmlSink, join_runs, load_scheme, SCHEMES, entity_ref, \
+    Comment, SortedComments, CommentAnchors, CommentStore, CommentDatabase, ExportCache, \
+    LineFragments, PhaseTimer, LineIndex, render_pages, page_files
+
+try:
+    import cProfile
+except ImportError:
+    cProfile = None
 
 PACKAGE_SETTINGS = "PrintHtml.sublime-settings"
 
@@ -18,250 +25,232 @@ ICON = "../PrintHtml/icon" if sublime.load_settings(PACKAGE_SETTINGS).get("use_i
 ICONSCOPE = sublime.load_settings(PACKAGE_SETTINGS).get("icon_scope", "comment")
 # affects the colour of the gutter icon
 
-WORD, CMT, LINE, STAMP = range(4)                   # indices for the vcomments dictionary
-UTF8 = ('utf-8', 'xmlcharrefreplace')               # arguments for encode() function
-
-HEADER = \
-"""<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>%(fname)s</title>
-"""
-
-CSS_MAIN = \
-"""
-    <style type="text/css">
-    body { color: %(fcolor)s; background-color: %(bcolor)s; font: %(fsize)dpt '%(fface)s', Consolas, Monospace; }
-    #preCode { border: 0; margin: 0; margin-top: 1em; padding: 0; font: %(fsize)dpt '%(fface)s', Consolas, Monospace; }
-    span { color: %(fcolor)s; background-color: %(bcolor)s; display: inline; border: 0; margin: 0; padding: 0; }
-    * html a:hover { background: transparent; }
-"""
-
-CSS_COMMENTS = \
-"""
-    .tooltip {
-        border-bottom: 1px dotted %(dot_colour)s;
-        outline: none; text-decoration: none;
-        position: relative;
-    }
-    .tooltip .comment {
-        border-radius: 5px 5px;
-        -moz-border-radius: 5px;
-        -webkit-border-radius: 5px;
-        box-shadow: 5px 5px 5px rgba(0, 0, 0, 0.1);
-        -webkit-box-shadow: 5px 5px rgba(0, 0, 0, 0.1);
-        -moz-box-shadow: 5px 5px rgba(0, 0, 0, 0.1);
-
-        white-space: -moz-pre-wrap; /* Mozilla */
-        white-space: -hp-pre-wrap; /* HP printers */
-        white-space: -o-pre-wrap; /* Opera 7 */
-        white-space: -pre-wrap; /* Opera 4-6 */
-        white-space: pre-wrap; /* CSS 2.1 */
-        white-space: pre-line; /* CSS 3 (and 2.1 as well, actually) */
-        word-wrap: break-word; /* IE */
-
-        position: absolute; z-index: 99;
-        width: 250px; left: 1em; top: 2em; padding: 0.8em 1em;
-
-        margin-left: -999em;
-
-        color: blue; background: #FFFFAA; border: 1px solid #FFAD33;
-        font-family: Calibri, Tahoma, Geneva, sans-serif;
-        font-size: %(fsize)dpt; font-weight: bold;
-    }
-    .tooltip:hover .comment { margin-left: 0pt; }
-    .comment .stamp { position: absolute; top: 0;
-        color: black; background: #FFFFAA; font-size: x-small; }
-    #divComments { display: none; height: 400px; width: 540px; overflow: auto; margin: 0; }
-    #divComments.inpage { position: static; }
-    #divComments.inpage #bottom_row { display: none; }
-    #divComments.overlay { position: fixed; z-index: 99; height: 400px; right:50px;
-        top: 100px; bottom: auto; left: auto; }
-    #divComments.overlay_bl { position: fixed; z-index: 99; height: 200px; right: auto;
-        top: auto; bottom: 50px; left: 50px; overflow-y: scroll; }
-    #divComments.overlay #bottom_row, #divComments.overlay_bl #bottom_row { display: table-row; }
-    #tblComments {
-        box-shadow: 5px 5px 5px rgba(0, 0, 0, 0.1);
-        -webkit-box-shadow: 5px 5px rgba(0, 0, 0, 0.1);
-        -moz-box-shadow: 5px 5px rgba(0, 0, 0, 0.1);
-        border-collapse: collapse; margin: 0;
-        font-family: Calibri, Tahoma, Geneva, sans-serif;
-        color: #000000; background-color: lightyellow;
-    }
-    #tblComments th, #tblComments td { border: thin solid; padding: 5px; }
-    td.nos { width: 50px; text-align: right; padding-right: 10px !important; }
-    td.stamps {text-align: center; font-size: smaller; }
-    td.cmts { min-width: 400px; max-width: 600px; }
-"""
-
-CKBs_COMMENTS = \
-"""
-<p>Show table of comments:<input type="checkbox" name="ckbComments" id="ckbComments" value="1" onclick="listComments()">&nbsp;
-Overlay table of comments:<input type="checkbox" name="ckbOverlay" id="ckbOverlay" value="1" onclick="overlayComments()">&nbsp;
-Show/hide comments (disables hover):<input type="checkbox" name="ckbToggle" id="ckbToggle" value="1" onclick="toggleComments()"></p>
-"""
-
-SCOPED = \
-"""<span>%(t_text)s</span>"""
-SCOPEDCOLOR = \
-"""<span style="color:%(colour)s;">%(t_text)s</span>"""
-SCOPEDCOMMENT = \
-"""<a class="tooltip" href="#" onclick="return false;">%(scoped)s<span class="comment"><span class="stamp">%(stamp)s</span>%(comment)s</span></a>"""
-
-JS_STANDARD = \
-""" function dismissChecks() {
-        var chks = document.getElementById("dChecks");
-        chks.style.display = "none";
-    }
-    function tidySpaces() {
-        var olCode, spans, i, span_textnode, span_text, span_next, offLeft, newLeft;
-        if (document.getElementsByClassName) {
-            spans = document.getElementsByClassName('tidy');
-            if (spans != 'undefined' && spans.length) {
-                for ( i = 0; i < spans.length; i++ )
-                    spans[i].style.paddingLeft = (spans[i].style.paddingLeft == '0px') ? spans[i].prevValue : '0px';
-                return;
-            }
-        }
-        olCode = document.getElementById('olCode');
-        spans = olCode.getElementsByTagName('span');
-        for (i = 0; i < spans.length; i++) {
-            if ( spans[i].previousSibling ) {
-                if ( spans[i].className && spans[i].className == 'comment')
-                    continue;
-                span_textnode = spans[i].firstChild;
-                span_text = span_textnode.data;
-                tidied = span_text.replace(/\s{2,}$/,'');
-                if (span_text.length && (span_text.length > tidied.length)) {
-                    if ( spans[i].nextSibling ) {
-                        span_next = spans[i];
-                        while ( (span_next = span_next.nextSibling) && span_next.className
-                            && span_next.className == 'comment' && span_next.nextSibling )
-                            ;       // do nothing, get next span (or 'a' tag)
-                        if ( span_next ) {
-                            offLeft = span_next.offsetLeft;
-                            newLeft = (parseInt(offLeft / 60)) * 60 + 60;
-                            span_next.style.paddingLeft = (newLeft - offLeft) + 'px';
-                            span_next.className = 'tidy';
-                            span_next.prevValue = span_next.style.paddingLeft;
-                        }
-                    }
-                }
-            }
-        }
-    }
-"""
-
-JS_COMMENTS = \
-""" function listComments() {
-        var comments_div = document.getElementById('divComments');
-        if (!comments_div.style.display || comments_div.style.display == 'none') {
-            if (!comments_div.className || comments_div.className == 'inpage')
-                document.getElementById('preCode').style.display = 'none';
-            comments_div.style.display = 'block';
-        }
-        else {
-            comments_div.style.display = 'none';
-            document.getElementById('preCode').style.display = 'block';
-            document.getElementById('ckbComments').checked = false;
-        }
-    }
-    function overlayComments() {
-        var comments_div = document.getElementById('divComments');
-        document.getElementById('preCode').style.display = 'block';
-        if (document.getElementById('ckbOverlay').checked) {
-            comments_div.className = (document.getElementById('ckbBottom').checked) ?
-                'overlay_bl' : 'overlay';
-        }
-        else {
-            comments_div.className = 'inpage';
-        }
-    }
-    function tableToBottom() {
-        document.getElementById('divComments').className =
-            (document.getElementById('ckbBottom').checked) ? 'overlay_bl' : 'overlay'; 
-    }
-    function toggleComments() {
-        var comments, newMargin, i;
-        if (document.getElementsByClassName) {
-            comments = document.getElementsByClassName('comment');
-        }
-        else if (document.querySelectorAll) {
-            comments = document.querySelectorAll('.comment');
-        }
-        else {
-            return false;
-        }
-        newMargin = (document.getElementById('ckbToggle').checked) ? '0pt' : '-999em';
-        for (i = 0; i < comments.length; i++) {
-            comments[i].style.marginLeft = newMargin;
-        }
-    }
-    function gotoLine(line_no) {
-        var code_list = document.getElementById('olCode');
-        var code_lines = code_list.getElementsByTagName('li');
-        // scroll the line(-5) into view (so it's not right at the top)
-        line_no = (line_no - 5 + 1) * (line_no - 5 + 1 > 0);
-        code_lines[line_no].scrollIntoView();
-        return false;
-    }
-    function addComment(e) {
-        var span_target, awrapper, new_comment, comment_text;
-        if (!e) e = window.event;
-        span_target = e.target || e.srcElement;
-        if (span_target.nodeName != 'SPAN' || span_target.className == 'comment') {
-            return false;
-        }
-        awrapper = document.createElement('a');
-        awrapper.href = '#';
-        awrapper.onclick = function () { return false; };
-        awrapper.className = 'tooltip';
-        new_comment = document.createElement('textarea');
-        new_comment.className = 'comment';
-        new_comment.style.marginLeft = '0pt';
-        new_comment.style.backgroundColor = 'yellow';
-        comment_text = document.createTextNode('New comment text');
-        new_comment.appendChild(comment_text);
-        awrapper.appendChild(span_target.cloneNode(true));
-        awrapper.appendChild(new_comment);
-        span_target.parentNode.replaceChild(awrapper, span_target);
-        return false;
-    }
-    window.onload = function () {
-        document.getElementById('olCode').ondblclick = addComment;
-    };
-"""
-
-COMMENTS_TBLHEAD = \
-"""
-<div id="divComments" class="inpage">
-<table id="tblComments"> 
-    <tr><th>Line</th><th>dd/mm</th><th>The Comment</th></tr>
-"""
-COMMENTS_TBLROW = \
-"""
-    <tr><td class="nos"><a href="#" onclick="gotoLine(%(line_adj)s);return false;">%(line_no)s</a></td>
-    <td class="stamps">%(stamp)s</td><td class="cmts">%(comment)s</td></tr>
-"""
-COMMENTS_TBLEND = \
-"""
-    <tr id="bottom_row"><td colspan="3" style=\"font-size:smaller; text-align:right;\"><a href="#top">Top</a>&nbsp;&nbsp;
-    <a href="#" onclick="listComments();return false;">Close</a>&nbsp;&nbsp;
-    Position: bottom-left <input type="checkbox" name="ckbBottom" id="ckbBottom" value="1" onclick="tableToBottom()"></td>
-    </tr>
-</table>
-</div>
-"""
-
-def dt_stamp():
-    return datetime.datetime.now().strftime("%d/%m %H:%M")
-
-def entity_ref(text, reverse=False):
-    if reverse:
-        return text.replace('&lt;', '<').replace('&gt;', '>').replace('&amp;', '&')
-    else:
-        return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+sublime.load_settings(PACKAGE_SETTINGS).add_on_change("alternate_scheme", SCHEMES.clear)
+# parsed colour-schemes are re-read when the scheme changes
+
+ANCHORS = {}        # view id -> CommentAnchors, the edits made to a view with comments (by on_modified)
+
+def use_comments(view, comments):   # (re)sets the view's comments, and follows the view's edits for them
+    view.vcomments = comments
+    ANCHORS[view.id()] = CommentAnchors(comments, view.size(), view.rowcol(view.size())[0])
+    return comments
+
+def comment_anchors(view):          # the CommentAnchors for the view's (current) comments
+    anchors = ANCHORS.get(view.id(), None)
+    if anchors is None or anchors.comments is not view.vcomments:
+        use_comments(view, view.vcomments)
+    return ANCHORS[view.id()]
+
+def caret(view):                    # (pt, row, col) of the view's single, empty selection, or None
+    sels = view.sel()
+    if len(sels) != 1 or not sels[0].empty():
+        return None
+    return (sels[0].begin(),) + tuple(view.rowcol(sels[0].begin()))
+
+def comment_store(view, fname):     # the view's CommentStore, for its .cmts file
+    if not hasattr(view, 'cstore') or view.cstore.path != fname:
+        view.cstore = CommentStore(fname)
+    return view.cstore
+
+DATABASE = {}       # path -> the CommentDatabase open there (or None, if it couldn't be opened)
+
+def comment_database():             # the database of every file's comments, or None if there isn't one
+    db_path = sublime.load_settings(PACKAGE_SETTINGS).get("comments_database", "")
+    if db_path is False:
+        return None                 # turned off
+    db_path = db_path or path.join(sublime.packages_path(), "User", "PrintHtml.comments.sqlite")
+    if db_path not in DATABASE:
+        try:
+            DATABASE[db_path] = CommentDatabase(db_path)
+        except IOError as e:
+            print str(e)
+            DATABASE[db_path] = None
+    return DATABASE[db_path]
+
+def saved_note(cstore):             # the .cmts file's size and mtime, as recorded in the database
+    return "%d %.3f" % cstore.stat if cstore.stat else None
+
+def index_comments(view, fname, before = None):     # records the view's comments, as just saved (or
+    db = comment_database()                         # loaded), in the database - before: the note of
+    if db is None:                                  # the .cmts file from before the save
+        return
+    saved = saved_note(view.cstore)
+    try:
+        indexed = db.saved_as(fname)
+        if indexed == saved:
+            return                  # (loaded, and unchanged since it was last recorded)
+        elif before is not None and indexed == before:
+            db.update_points(fname, view.cstore.changes, saved)
+        else:                       # (from the store - a view's comments loaded from a file are
+            db.update_file(fname, view.cstore.saved_items(), saved)     # left to be decoded as used)
+    except IOError as e:
+        print str(e)
+
+def comment_item(the_comment):      # a comment, as shown in a quick-panel
+    return "%s Line: %03d %s" % (the_comment.shown_stamp(), the_comment.line + 1,
+        entity_ref(the_comment.comment, True))
+
+WORD_SEPARATORS = u"./\\()\"'-:,.;<>~!@#$%^&*|+=[]{}`~?"     # (the default 'word_separators')
+
+SNAPSHOTS = {}      # view id -> the ViewSnapshot of its text, as at its change_count
+SNAPSHOT_POINTS = 50    # points a command looks up, beyond which it reads the view's text in one go
+
+def view_snapshot(view):            # the view's snapshot - begun again if the view has changed since
+    change = view.change_count()
+    snap = SNAPSHOTS.get(view.id(), None)
+    if snap is None or snap.change != change:
+        snap = SNAPSHOTS[view.id()] = ViewSnapshot(view, change)
+    return snap
+
+def walk_snapshot(view, points):    # the view's snapshot for a command walking this many points - or
+    return view_snapshot(view) if points > SNAPSHOT_POINTS else None    # None, to ask the view itself
+
+class ViewSnapshot(object):         # for a command walking many points to answer from, rather than asking
+    def __init__(self, view, change):   # the view a point at a time: the view's line offsets, indexed once,
+        self.view = view                # and its text - read in one go when first asked for, and let go
+        self.change = change            # again once the command that asked is done (no copy is kept)
+        self.separators = view.settings().get('word_separators', WORD_SEPARATORS)
+        self.held = None                # the text, while a command is using it
+        self.index = None               # the LineIndex, once it's been asked for
+
+    def text(self):
+        text = self.held
+        if text is None:
+            text = self.held = self.view.substr(sublime.Region(0, self.view.size()))
+            sublime.set_timeout(self.release, 0)
+        return text
+
+    def release(self):
+        self.held = None
+
+    def lines(self):
+        if self.index is None:
+            self.index = LineIndex(self.text())
+        return self.index
+
+    def substr(self, region):
+        return self.text()[region.begin():region.end()]
+
+    def word(self, pt):             # the word at pt, as view.word() finds it - or None if pt isn't next to
+        text = self.text()          # a word (for the view to say what it finds there)
+        if not 0 <= pt <= len(text):
+            return None
+        begin = end = pt
+        while begin > 0 and not text[begin - 1].isspace() and text[begin - 1] not in self.separators:
+            begin -= 1
+        while end < len(text) and not text[end].isspace() and text[end] not in self.separators:
+            end += 1
+        return sublime.Region(begin, end) if begin < end else None
+
+FEED_LINES = 500    # lines read from the view at a time, for a print
+FEED_BATCHES = 8    # batches read ahead of the worker rendering them, at most
+VIEW_CALLS = {}     # view API name -> the calls made to it, counted where they're made (for profile_print)
+
+def count_calls(name, calls = 1):
+    VIEW_CALLS[name] = VIEW_CALLS.get(name, 0) + calls
+
+def scope_runs(view, begin, text, scopes):  # [(scope, begin, end), ..] for a line, whitespace joins the
+    end = begin + len(text)                 # preceding run (scopes: the scope names seen, to share one
+    extract = getattr(view, 'extract_tokens_with_scopes', None)                 # copy of each)
+    if extract is not None:                 # bulk API (where available) - one call per line
+        count_calls('extract_tokens_with_scopes')
+        return join_runs(begin, text, [(scopes.setdefault(scope, scope), r.begin(), r.end()) \
+            for (r, scope) in extract(sublime.Region(begin, end))])
+    runs = []
+    scope = view.scope_name(begin)
+    run_scope, run_begin, probes = (scopes.setdefault(scope, scope), begin, 1)
+    for i in xrange(1, len(text)):          # probe only the points that can start a new run
+        if text[i] in ' \t':
+            continue
+        scope = view.scope_name(begin + i)
+        probes += 1
+        if scope != run_scope:
+            runs.append((run_scope, run_begin, begin + i))
+            run_scope, run_begin = (scopes.setdefault(scope, scope), begin + i)
+    runs.append((run_scope, run_begin, end))
+    count_calls('scope_name', probes)
+    return runs
+
+def scoped_lines(view, begin, end):         # (begin, text, runs) for each line from begin to end - the
+    scopes = {}                             # text read FEED_LINES lines at a time, so that only those
+    end = min(end, view.size())             # are held (as they're asked for)
+    row, last_row = (view.rowcol(begin)[0], view.rowcol(end)[0])
+    count_calls('rowcol', 2)
+    pt = begin
+    while pt <= end:
+        row += FEED_LINES
+        if row > last_row:
+            batch_end = end
+        else:
+            batch_end = min(view.text_point(row, 0) - 1, end)
+            count_calls('text_point')
+        count_calls('substr')
+        for text in view.substr(sublime.Region(pt, batch_end)).split(u'\n'):
+            yield (pt, text, scope_runs(view, pt, text, scopes) if text else [])
+            pt += len(text) + 1
+
+REGION_STYLES = {                   # add_regions arguments for the comment highlights and gutter icons
+    "comments": ("comment", OUTLINED),
+    "comment_errs": ("invalid", OUTLINED),
+    "hidden_cmts": (ICONSCOPE, ICON, sublime.HIDDEN)
+}
+
+class CommentRegions(object):       # a view's highlight and hidden regions, kept (sorted) as (begin, end)
+    def __init__(self, view):       # pairs so that a batch of changes is drawn with one add_regions per key
+        self.view = view
+        self.regions = {}
+        self.widest = {}            # the longest region for each key, to bound the search for a point
+        self.dirty = set()          # keys changed since they were last drawn
+        self.change = None          # the view's change_count when the regions were last read
+
+    def sync(self):                 # the view moves its regions with edits, so re-read them after any
+        change = self.view.change_count()
+        if change == self.change:
+            return
+        self.flush()
+        for key in REGION_STYLES:
+            self.regions[key] = sorted([(r.begin(), r.end()) for r in self.view.get_regions(key)])
+            self.widest[key] = max([e - b for (b, e) in self.regions[key]] or [0])
+        self.change = change
+
+    def get(self, key):
+        self.sync()
+        return [sublime.Region(b, e) for (b, e) in self.regions[key]]
+
+    def add(self, key, region):
+        self.sync()
+        pair = (region.begin(), region.end())
+        bisect.insort(self.regions[key], pair)
+        self.widest[key] = max(self.widest[key], pair[1] - pair[0])
+        self.dirty.add(key)
+
+    def remove(self, key, pt):      # removes the regions containing pt
+        self.sync()
+        regs = self.regions[key]
+        i = j = bisect.bisect_right(regs, (pt, sys.maxint))
+        while i > 0 and regs[i - 1][0] >= pt - self.widest[key]:
+            i -= 1
+        kept = [r for r in regs[i:j] if r[1] < pt]
+        if len(kept) < j - i:
+            regs[i:j] = kept
+            self.dirty.add(key)
+
+    def set(self, key, regions):
+        self.sync()
+        pairs = sorted([(r.begin(), r.end()) for r in regions])
+        if pairs != self.regions[key]:
+            self.regions[key] = pairs
+            self.widest[key] = max([e - b for (b, e) in pairs] or [0])
+            self.dirty.add(key)
+
+    def flush(self):                # draw the changed keys
+        for key in self.dirty:
+            if self.regions[key]:
+                self.view.add_regions(key, [sublime.Region(b, e) for (b, e) in self.regions[key]], \
+                    *REGION_STYLES[key])
+            else:
+                self.view.erase_regions(key)
+        self.dirty.clear()
 
 class CommentHtmlCommand(sublime_plugin.TextCommand):
     sensible_word = re.compile(r"""[a-zA-Z_]{1}[a-zA-Z_0-9]+""")
@@ -274,36 +263,60 @@ class CommentHtmlCommand(sublime_plugin.TextCommand):
         else:
             return (False, '')                      # ok, word is suitable to attach comment to
 
-    def get_metrics(self, pt = None):               # return word, begin(), etc., at cursor or point
-        try:
+    def comment_regions(self):                      # utility fn - the view's CommentRegions
+        if not hasattr(self.view, 'cregions'):
+            self.view.cregions = CommentRegions(self.view)
+        return self.view.cregions
+
+    def get_metrics(self, pt = None, snap = None):  # return word, begin(), etc., at cursor or point -
+        try:                                        # from the snapshot, if walking many points
             if pt is None:
                 sels = self.view.sel()
                 sel = sels[0]
                 pt = sel.begin()
-            word_region = self.view.word(pt)
-            word = self.view.substr(word_region)
-            word_pt, word_end = (word_region.begin(), word_region.end())
-            line, col = self.view.rowcol(word_pt)
+                count_calls('sel')
+            if snap is None:
+                word_region = self.view.word(pt)
+                word = self.view.substr(word_region)
+                word_pt, word_end = (word_region.begin(), word_region.end())
+                line, col = self.view.rowcol(word_pt)
+                count_calls('word'); count_calls('substr'); count_calls('rowcol')
+            else:
+                word_region = snap.word(pt)
+                if word_region is None:
+                    word_region = self.view.word(pt)
+                    count_calls('word')
+                word = snap.substr(word_region)
+                word_pt, word_end = (word_region.begin(), word_region.end())
+                line, col = snap.lines().rowcol(word_pt)
         except Exception:
             return {}
         return locals()
 
-    def same_word(self, key_pt):                    # is the comment-point still on the same word?
-        try:                                        # key_pt should be/will be pointing to the beginning 
-            word_region = self.view.word(key_pt)    # of the comment's word.
-            curr_word = self.view.substr(word_region)
+    def same_word(self, key_pt, snap = None):       # is the comment-point still on the same word?
+        try:                                        # key_pt should be/will be pointing to the beginning
+            if snap is None:                        # of the comment's word.
+                curr_word = self.view.substr(self.view.word(key_pt))
+                count_calls('word'); count_calls('substr')
+            else:
+                curr_word = snap.substr(snap.word(key_pt) or self.view.word(key_pt))
         except Exception:
             return False
-        return (self.view.vcomments[key_pt][WORD] == curr_word)
-
-    def adjust_comments(self):              # utility fn - move all comment-pts to beginning of their current
-        eov = self.view.size()              # word, but remember the previous word (so it can be moved)
-        for key_pt in [ pt for pt in self.view.vcomments.keys() if pt < eov ]:
-            current = self.get_metrics(key_pt)
+        return (self.view.vcomments[key_pt].word == curr_word)
+
+    def adjust_comments(self):              # utility fn - move comment-pts to beginning of their current word,
+        eov = self.view.size()              # but remember the previous word (so it can be moved) - only the
+        touched = comment_anchors(self.view).take_touched()     # comments that edits have disturbed
+        if touched is None:                 # (or all of them, if the edits couldn't be followed)
+            touched = self.view.vcomments.points_between(0, eov - 1)
+        touched = [pt for pt in touched if pt < eov and pt in self.view.vcomments]
+        snap = walk_snapshot(self.view, len(touched))
+        for key_pt in touched:
+            current = self.get_metrics(key_pt, snap)
             if not current or current['word_pt'] in self.view.vcomments:
                 continue                                # there is already a comment at the word's begin-point
-            existing_wd, comment, _line, _stamp = self.view.vcomments[key_pt]
-            self.view.vcomments[current['word_pt']] = (existing_wd, comment, current['line'], dt_stamp())
+            existing = self.view.vcomments[key_pt]
+            self.view.vcomments[current['word_pt']] = Comment(existing.word, existing.comment, current['line'])
             del self.view.vcomments[key_pt]             # delete comment from its previous position
 
     def get_comment(self):                              # return comment-text at cursor, or ''
@@ -312,10 +325,10 @@ class CommentHtmlCommand(sublime_plugin.TextCommand):
         self.adjust_comments()              # first, position all comments at beginning of their 'word'
         selection = self.get_metrics()
         if selection and selection['word_pt'] in self.view.vcomments:
-            prev_word = self.view.vcomments[selection['word_pt']][WORD]
+            prev_word = self.view.vcomments[selection['word_pt']].word
             if selection['word'] != prev_word:
                 sublime.status_message("The comment-word has changed: %s" % prev_word)
-            return (entity_ref(self.view.vcomments[selection['word_pt']][CMT], True))    # the comment text
+            return (entity_ref(self.view.vcomments[selection['word_pt']].comment, True)) # the comment text
         else:
             return ''
 
@@ -329,12 +342,13 @@ class CommentHtmlCommand(sublime_plugin.TextCommand):
             sublime.status_message('The input panel is already active?! Click into view/tab first.')
             return
         if not hasattr(self.view, 'vcomments'):             # on first run (for this view)
-            self.view.vcomments = {}
+            use_comments(self.view, SortedComments())
             curr_comment = ''
             try:
-                self.view.erase_regions("comments")         # in case they have persisted
-                self.view.erase_regions("comment_errs")
-                self.view.erase_regions("hidden_cmts")
+                regions = self.comment_regions()            # in case they have persisted
+                for key in REGION_STYLES:
+                    regions.set(key, [])
+                regions.flush()
             except Exception:
                 pass
             fname = self.view.file_name()
@@ -359,20 +373,21 @@ class CommentHtmlCommand(sublime_plugin.TextCommand):
             sel_orig = sublime.Region(0, 0)         # default to beginning of view
         _ = self.remove_highlights()
         eov = self.view.size()
-        for key_pt in sorted(self.view.vcomments.keys()):
-            prev_wd, prev_comment, prev_line, _stamp = self.view.vcomments[key_pt]
+        snap = walk_snapshot(self.view, len(self.view.vcomments))
+        for key_pt in list(self.view.vcomments.points):
+            prev = self.view.vcomments[key_pt]
             if key_pt >= eov:                       # delete comments past end of the view
                 del self.view.vcomments[key_pt]
-                print "Comment past end-of-view deleted: %s (was line %d)" % (prev_comment, prev_line + 1)
+                print "Comment past end-of-view deleted: %s (was line %d)" % (prev.comment, prev.line + 1)
                 continue
-            current = self.get_metrics(key_pt)
-            if current and self.same_word(key_pt):
+            current = self.get_metrics(key_pt, snap)
+            if current and self.same_word(key_pt, snap):
                 sels.add(current['word_region'])
                 if len(sels) == 1:                          # show 1st comment region
                     self.view.show(current['word_region'])
             else:
                 print "DELETED: Commented word was '%s' on line %d comment: %s" \
-                    % (prev_wd, prev_line + 1, prev_comment)
+                    % (prev.word, prev.line + 1, prev.comment)
                 del self.view.vcomments[key_pt]             # delete mis-positioned comment
         if not sels:                    # nothing selected, so re-instate original (1st) selection,
             sels.add(sel_orig)          # or beginning of view
@@ -389,26 +404,22 @@ class CommentHtmlCommand(sublime_plugin.TextCommand):
                 return 'Ensure the cursor is somewhere in the view.'
             curr_pt = selection['pt']
         if direction == 'down':
-            sorted_pts = (key_pt for key_pt in sorted(self.view.vcomments.keys()) if key_pt > curr_pt)
+            next_pt = self.view.vcomments.next_point(curr_pt)
         else:
-            sorted_pts = (key_pt for key_pt in reversed(sorted(self.view.vcomments.keys())) if key_pt < curr_pt)
-        try:
-            next_pt = sorted_pts.next()
-        except StopIteration:
-            next_pt = None
+            next_pt = self.view.vcomments.prev_point(curr_pt)
         if next_pt is not None:
-            next_wd, next_comment, next_line, _stamp = self.view.vcomments[next_pt]
+            next_cmt = self.view.vcomments[next_pt]
             if next_pt >= self.view.size():                     # next comment is beyond the view-size
-                print "Comment past end-of-view: %s (was line %d)" % (next_comment, next_line + 1)
+                print "Comment past end-of-view: %s (was line %d)" % (next_cmt.comment, next_cmt.line + 1)
                 return "Comment is past end-of-view - use 'recover' command: %s (was line %d)" \
-                    % (next_comment, next_line + 1)
+                    % (next_cmt.comment, next_cmt.line + 1)
             current = self.get_metrics(next_pt)
             if not current:                                # problem reading points' word, etc.
                 return "Unable to read details at next comment point."
             if not self.same_word(next_pt):
-                message = "The word has changed - was '%s'" % next_wd
+                message = "The word has changed - was '%s'" % next_cmt.word
                 print "Commented word was '%s' on line %d now '%s' on line %d comment: %s" \
-                    % (next_wd, next_line + 1, current['word'], current['line'] + 1, next_comment)
+                    % (next_cmt.word, next_cmt.line + 1, current['word'], current['line'] + 1, next_cmt.comment)
             sels = self.view.sel()
             sels.clear()
             sels.add(current['word_region'])
@@ -423,32 +434,33 @@ class CommentHtmlCommand(sublime_plugin.TextCommand):
         comment_errors = []
         eov = self.view.size()
         beyond_eov = False                          # are their any comments beyond the view-size?
-        for key_pt in sorted(self.view.vcomments.keys()):
-            prev_wd, prev_comment, prev_line, _stamp = self.view.vcomments[key_pt]
+        snap = walk_snapshot(self.view, len(self.view.vcomments))
+        for key_pt in list(self.view.vcomments.points):
+            prev = self.view.vcomments[key_pt]
             if key_pt >= eov:                           # comment is beyond the view-size
-                print "Comment is past end-of-view - use 'recover' command: %s" % (prev_comment)
+                print "Comment is past end-of-view - use 'recover' command: %s" % (prev.comment)
                 beyond_eov = True
                 continue
-            current = self.get_metrics(key_pt)
+            current = self.get_metrics(key_pt, snap)
             if not current:                        # problem reading points' word, etc.
-                print "DELETED: Could not find a location for comment: %s" % (prev_comment)
+                print "DELETED: Could not find a location for comment: %s" % (prev.comment)
                 del self.view.vcomments[key_pt]
                 continue
-            if self.same_word(key_pt):
+            if self.same_word(key_pt, snap):
                 if not comment_regions and not comment_errors:
                     self.view.show(current['word_region'])                  # show the 1st highlighted region
                 comment_regions.append(current['word_region'])
             else:
                 print "Commented word was '%s' now '%s' on line %d comment: %s" \
-                    % (prev_wd, current['word'], current['line'] + 1, prev_comment)
+                    % (prev.word, current['word'], current['line'] + 1, prev.comment)
                 if not comment_regions and not comment_errors:
                     self.view.show(current['word_region'])                  # show the 1st highlighted region
                 comment_errors.append(current['word_region'])
         if comment_regions:
-            self.view.add_regions("comments", comment_regions, "comment", OUTLINED)
+            self.comment_regions().set("comments", comment_regions)
             self.view.highlighted = True
         if comment_errors:
-            self.view.add_regions("comment_errs", comment_errors, "invalid", OUTLINED)
+            self.comment_regions().set("comment_errs", comment_errors)
             self.view.highlighted = True
         if beyond_eov:
             return "There are comment(s) beyond the view-size - use 'recover' command."
@@ -459,8 +471,8 @@ class CommentHtmlCommand(sublime_plugin.TextCommand):
 
     def remove_highlights(self):
         try:
-            self.view.erase_regions("comments")
-            self.view.erase_regions("comment_errs")
+            self.comment_regions().set("comments", [])
+            self.comment_regions().set("comment_errs", [])
             self.view.highlighted = False
             return 'Removed comment highlighting.'
         except Exception:
@@ -468,7 +480,7 @@ class CommentHtmlCommand(sublime_plugin.TextCommand):
 
     def remove_all_hidden(self):                            # utility fn - not called as a 'command'
         try:
-            self.view.erase_regions("hidden_cmts")
+            self.comment_regions().set("hidden_cmts", [])
         except Exception:
             pass
 
@@ -476,56 +488,29 @@ class CommentHtmlCommand(sublime_plugin.TextCommand):
         self.remove_hidden(pt)
         if not self.view.highlighted:
             return
-        high_cs = self.view.get_regions("comments")
-        high_errs = self.view.get_regions("comment_errs")   # the highlight might be an error-region
-        if not high_cs and not high_errs:                   # nothing to remove
-            return
-        comment_regions = []
-        for reg in [r for r in high_cs if not r.contains(pt)]:
-                comment_regions.append(reg)                 # add regions other than the current one
-        self.view.erase_regions("comments")
-        if comment_regions:
-            self.view.add_regions("comments", comment_regions, "comment", OUTLINED)
-        comment_errors = []                                 # repeat sequence for error regions
-        for reg in [r for r in high_errs if not r.contains(pt)]:
-            comment_errors.append(reg)
-        self.view.erase_regions("comment_errs")
-        if comment_errors:
-            self.view.add_regions("comment_errs", comment_errors, "invalid", OUTLINED)
+        self.comment_regions().remove("comments", pt)
+        self.comment_regions().remove("comment_errs", pt)   # the highlight might be an error-region
 
     def remove_hidden(self, pt):                            # utility fn - not called as a 'command'
-        hidden = self.view.get_regions("hidden_cmts")
-        if not hidden:
-            return
-        hidden_temp = []
-        for reg in [r for r in hidden if not r.contains(pt)]:
-                hidden_temp.append(reg)
-        self.view.erase_regions("hidden_cmts")
-        if hidden_temp:
-            self.view.add_regions("hidden_cmts", hidden_temp, ICONSCOPE, ICON, sublime.HIDDEN)
+        self.comment_regions().remove("hidden_cmts", pt)
 
     def add_highlight(self, new_region, error = False):     # utility fn - not called as a 'command'
         self.add_hidden(new_region)
         if not self.view.highlighted:
             return
         if error:                                           # error == True: add as error region
-            high_reg, high_scope = ("comment_errs", "invalid")
+            self.comment_regions().add("comment_errs", new_region)
         else:
-            high_reg, high_scope = ("comments", "comment")
-        highs = self.view.get_regions(high_reg) or []
-        highs.append(new_region)
-        self.view.add_regions(high_reg, highs, high_scope, OUTLINED)
+            self.comment_regions().add("comments", new_region)
 
     def add_hidden(self, new_region):
-        hidden = self.view.get_regions("hidden_cmts") or []
-        hidden.append(new_region)
-        self.view.add_regions("hidden_cmts", hidden, ICONSCOPE, ICON, sublime.HIDDEN)
+        self.comment_regions().add("hidden_cmts", new_region)
 
     def follow_highlights(self):            # attempt to re-position comments to highlighted regions
         if not self.view.highlighted:       # (if there are the same number of comments as highlights)
             return 'View comments are not currently highlighted.'
-        high_cs = self.view.get_regions("comments")
-        high_errs = self.view.get_regions("comment_errs")
+        high_cs = self.comment_regions().get("comments")
+        high_errs = self.comment_regions().get("comment_errs")
         if not high_cs and not high_errs:
             return 'There are no highlighted regions to follow.'
         if high_errs:
@@ -535,43 +520,45 @@ class CommentHtmlCommand(sublime_plugin.TextCommand):
         _ = self.remove_highlights()                    # will set self.view.highlighted = False
         comment_regions = []
         comment_errors = []
-        for pt, area in zip(sorted(self.view.vcomments.keys()), high_cs):
-            prev_wd, prev_comment, _line, _stamp = self.view.vcomments[pt]
-            c_highlight = self.get_metrics(area.begin())
+        snap = walk_snapshot(self.view, len(high_cs))
+        for pt, area in zip(list(self.view.vcomments.points), high_cs):
+            prev = self.view.vcomments[pt]
+            c_highlight = self.get_metrics(area.begin(), snap)
             if not c_highlight:
                 continue                                # unable to read metrics at highlight
-            if c_highlight['word'] == prev_wd:
+            if c_highlight['word'] == prev.word:
                 comment_regions.append(c_highlight['word_region'])
             else:
                 comment_errors.append(c_highlight['word_region'])
             if c_highlight['word_pt'] != pt:            # if not already there, move comment
                 self.view.vcomments[c_highlight['word_pt']] = \
-                    (prev_wd, prev_comment, c_highlight['line'], dt_stamp())
+                    Comment(prev.word, prev.comment, c_highlight['line'])
                 del self.view.vcomments[pt]
 
         message = 'Unable to re-position comments.'
         if comment_regions:
-            self.view.add_regions("comments", comment_regions, "comment", OUTLINED)
+            self.comment_regions().set("comments", comment_regions)
             self.view.highlighted = True
             message = 'Comments re-positioned to highlights.'
         if comment_errors:
-            self.view.add_regions("comment_errs", comment_errors, "invalid", OUTLINED)
+            self.comment_regions().set("comment_errs", comment_errors)
             self.view.highlighted = True
             message = 'Some comments are in the wrong position.'
         return message
 
     def correct_to_hidden(self):        # if there are the same number of comments as hidden regions
-        hidden = self.view.get_regions("hidden_cmts")
+        hidden = self.comment_regions().get("hidden_cmts")
         if not hidden or (len(hidden) != len(self.view.vcomments)):
             return  'The number of comments and hidden regions differ.'
-        for pt, area in zip(sorted(self.view.vcomments.keys()), hidden):
-            prev_wd, prev_comment, _line, _stamp = self.view.vcomments[pt]
-            c_hidden = self.get_metrics(area.begin())
+        snap = walk_snapshot(self.view, len(hidden))
+        for pt, area in zip(list(self.view.vcomments.points), hidden):
+            prev = self.view.vcomments[pt]
+            c_hidden = self.get_metrics(area.begin(), snap)
             if not c_hidden:
                 continue                                # unable to read metrics at hidden region
             if c_hidden['word_pt'] != pt:               # if not already there, move comment
                 self.view.vcomments[c_hidden['word_pt']] = \
-                    (prev_wd, prev_comment, c_hidden['line'], dt_stamp())
+                    Comment(prev.word, prev.comment, c_hidden['line'])
                 del self.view.vcomments[pt]
         if self.view.highlighted:
             return self.highlight_comments()
@@ -587,7 +574,7 @@ class CommentHtmlCommand(sublime_plugin.TextCommand):
         else:                                       # delete comments within the selection
             begin = selection['sel'].begin(); end = selection['sel'].end()
         deleted = False
-        for cmt in [pt for pt in self.view.vcomments.keys() if begin <= pt <= end]:
+        for cmt in self.view.vcomments.points_between(begin, end):
             del self.view.vcomments[cmt]
             deleted = True                          # at least one comment deleted
             self.remove_highlight(cmt)
@@ -596,7 +583,7 @@ class CommentHtmlCommand(sublime_plugin.TextCommand):
     def delete_all_comments(self):
         _ = self.remove_highlights()
         self.remove_all_hidden()
-        self.view.vcomments = {}
+        use_comments(self.view, SortedComments())
         return 'All comments deleted.'
 
     def push_comments(self, direction = 'down'):                # move selected comment(s) down or up
@@ -611,7 +598,7 @@ class CommentHtmlCommand(sublime_plugin.TextCommand):
                 return 'No comment found at cursor.'
         elif direction == 'recover':                    # bring back comments that are beyond end-of-view
             pt_begin = self.view.size()
-            pt_end = max(self.view.vcomments)
+            pt_end = self.view.vcomments.points[-1]
             if pt_end < pt_begin:
                 return 'There are no comments beyond the view-size.'
         else:
@@ -619,18 +606,18 @@ class CommentHtmlCommand(sublime_plugin.TextCommand):
         if pt_begin == pt_end:
             sorted_pts = [pt_begin]             # just the current comment to move (use single list-item)
         else:
-            sorted_pts = [key_pt for key_pt in sorted(self.view.vcomments.keys()) if pt_begin <= key_pt <= pt_end]
-            if direction == 'down':
-                sorted_pts = reversed(sorted_pts)
+            sorted_pts = self.view.vcomments.points_between(pt_begin, pt_end)
+        snap = walk_snapshot(self.view, len(sorted_pts))    # (the text doesn't change while they're moved)
+        if direction == 'down':
+            sorted_pts = reversed(sorted_pts)
 
         sels.clear()
-
         for next_pt in sorted_pts:
-            prev_wd, prev_comment, _line, _stamp = self.view.vcomments[next_pt]
+            prev = self.view.vcomments[next_pt]
             if direction == 'down':         # find next occurrence of the comment-word
-                new_region = self.view.find(prev_wd, next_pt + 1, sublime.LITERAL)
+                new_region = self.view.find(prev.word, next_pt + 1, sublime.LITERAL)
             else:                           # find previous occurrence of comment-word
-                new_regions = (r for r in reversed(self.view.find_all(prev_wd, sublime.LITERAL)) \
+                new_regions = (r for r in reversed(self.view.find_all(prev.word, sublime.LITERAL)) \
                     if r.begin() < next_pt)
                 try:
                     new_region = new_regions.next()
@@ -638,14 +625,15 @@ class CommentHtmlCommand(sublime_plugin.TextCommand):
                     continue
             if new_region:                              # was the comment-word found further up/down?
                 new_region_begin = new_region.begin()
-                new_comment_line, _ = self.view.rowcol(new_region_begin)
+                new_comment_line = snap.lines().row(new_region_begin) if snap is not None \
+                    else self.view.rowcol(new_region_begin)[0]
                 if new_region_begin in self.view.vcomments:
-                    _, old_comment, old_line, _stamp = self.view.vcomments[new_region_begin]
+                    old = self.view.vcomments[new_region_begin]
                     sels.add(new_region)
                     self.view.show(new_region)
-                    print "Already a comment at line %d comment: %s" % (new_comment_line + 1, old_comment)
-                    return "Already a comment at line %d comment: %s" % (new_comment_line + 1, old_comment)
-                self.view.vcomments[new_region_begin] = (prev_wd, prev_comment, new_comment_line, dt_stamp())
+                    print "Already a comment at line %d comment: %s" % (new_comment_line + 1, old.comment)
+                    return "Already a comment at line %d comment: %s" % (new_comment_line + 1, old.comment)
+                self.view.vcomments[new_region_begin] = Comment(prev.word, prev.comment, new_comment_line)
                 self.add_highlight(new_region, False)
                 del self.view.vcomments[next_pt]        # delete the comment from its previous position
                 self.remove_highlight(next_pt)
@@ -674,17 +662,15 @@ class CommentHtmlCommand(sublime_plugin.TextCommand):
             return 'There is already a comment at the cursor.'
 
         if direction == 'down':
-            sorted_pts = (key_pt for key_pt in reversed(sorted(self.view.vcomments.keys())) if key_pt < curr_pt)
+            next_pt = self.view.vcomments.prev_point(curr_pt)
         else:
-            sorted_pts = (key_pt for key_pt in sorted(self.view.vcomments.keys()) if key_pt > curr_pt)
-        try:
-            next_pt = sorted_pts.next()
-        except StopIteration:
+            next_pt = self.view.vcomments.next_point(curr_pt)
+        if next_pt is None:
             return "There is no comment to pull %s to the cursor position." % (direction)
         # The comment we are moving may not be in it's correctly highlighted position. So, 
         discard_message = self.correct_to_hidden()
-        next_wd, next_comment, _line, _stamp = self.view.vcomments[next_pt]
-        self.view.vcomments[curr_pt] = (selection['word'], next_comment, selection['line'], dt_stamp())
+        next_cmt = self.view.vcomments[next_pt]
+        self.view.vcomments[curr_pt] = Comment(selection['word'], next_cmt.comment, selection['line'])
         del self.view.vcomments[next_pt]
         self.remove_highlight(next_pt)          # that is, from its 'previous' position
         self.add_highlight(selection['word_region'], False)
@@ -706,11 +692,11 @@ class CommentHtmlCommand(sublime_plugin.TextCommand):
         comment = entity_ref(text)
         comment = comment.replace('\t', ' ' * 4).strip()
         if curr['word_pt'] in self.view.vcomments and \
-                self.view.vcomments[curr['word_pt']][CMT] == comment:       # it's the same comment..
-            if self.view.vcomments[curr['word_pt']][WORD] != curr['word']:
+                self.view.vcomments[curr['word_pt']].comment == comment:    # it's the same comment..
+            if self.view.vcomments[curr['word_pt']].word != curr['word']:
                 # .. but it's a different word, so they are correcting the comment
                 self.view.vcomments[curr['word_pt']] = \
-                    (curr['word'], comment, curr['line'], dt_stamp())
+                    Comment(curr['word'], comment, curr['line'])
                 print "Comment-word corrected at line %d: %s" % (curr['line'] + 1, comment)
                 self.remove_highlight(curr['word_pt'])
                 self.add_highlight(curr['word_region'], False)      # False == not an error region
@@ -721,26 +707,29 @@ class CommentHtmlCommand(sublime_plugin.TextCommand):
             return select_msg
         else:                       # create a new comment at the cursor
             self.view.vcomments[curr['word_pt']] = \
-                (curr['word'], comment, curr['line'], dt_stamp())
+                Comment(curr['word'], comment, curr['line'])
             print "New comment at line %d: %s" % (curr['line'] + 1, comment)
             self.add_highlight(curr['word_region'], False)          # False == not an error region
             self.just_added = True                                  # don't re-display the comment text
-            return "Comment added: %s" % (self.view.vcomments[curr['word_pt']][CMT])
+            return "Comment added: %s" % (self.view.vcomments[curr['word_pt']].comment)
 
     def save_comments(self):                # the same filename/location, with 'cmts' added at end
+        comment_anchors(self.view).settle()
         fname = self.view.file_name()
         if fname == None or not path.exists(fname):
             fname = "Untitled."
+        cstore = comment_store(self.view, fname + 'cmts')
+        before = saved_note(cstore)
         try:
-            fname_dict = open(fname + 'cmts', 'wb')
-            pickle.dump(self.view.vcomments, fname_dict)
-        except IOError:
+            cstore.save(self.view.vcomments)
+        except Exception as e:
+            print str(e)
             return "Could not create comments file: %s" % (fname + 'cmts')
-        fname_dict.close()
         if fname == "Untitled.":                    # getcwd() - 'current working directory'
             print "File not saved, so comments saved as: %s%sUntitled.cmts" % (os.getcwd(), os.path.sep)
             return "File not saved, so comments saved as: %s%sUntitled.cmts" % (os.getcwd(), os.path.sep)
         else:
+            index_comments(self.view, fname, before)
             print "Saved as %s" % (fname + 'cmts')
             return "Saved as %s" % (fname + 'cmts')
 
@@ -749,16 +738,17 @@ class CommentHtmlCommand(sublime_plugin.TextCommand):
         if fname == None or not path.exists(fname):
             return "The filename is not available, so comments cannot be loaded."
         try:
-            fname_dict = open(fname + 'cmts', 'rb')
-            the_comments = pickle.load(fname_dict)
+            the_comments = comment_store(self.view, fname + 'cmts').load()
         except IOError:
             return "Could not find or read comments file: %s" % (fname + 'cmts')
-        fname_dict.close()
+        if self.view.cstore.migrated:
+            print "Comments file converted to the current format: %s" % (fname + 'cmts')
         if not the_comments:
             return "No comments found in %s" % (fname + 'cmts')
         _ = self.remove_highlights()
         self.remove_all_hidden()
-        self.view.vcomments = the_comments
+        use_comments(self.view, the_comments)
+        sublime.set_timeout(lambda: index_comments(self.view, fname), 0)    # after the panel is shown
         return "Comments loaded - use 'Select' or 'Highlight' command."
 
     def process_commentary(self, text, caller_id):                  # on_done for comments panel
@@ -781,6 +771,8 @@ class CommentHtmlCommand(sublime_plugin.TextCommand):
 
         comment_command = text.strip().upper()
         has_comments = hasattr(self.view, 'vcomments') and self.view.vcomments
+        if has_comments:
+            self.adjust_comments()                  # catch up with any edits made since the last command
         message = None                              # possible message to display in the status bar
 
         if comment_command in ('SELECT','SEL','SEL ALL','SELECT ALL'):      # select commented words
@@ -796,7 +788,7 @@ class CommentHtmlCommand(sublime_plugin.TextCommand):
             message = self.select_next('down', -1) if has_comments else 'There are no comments to select.'
 
         elif comment_command == 'LAST':                             # select the last comment
-            message = self.select_next('up', max(self.view.vcomments) + 1) if has_comments \
+            message = self.select_next('up', self.view.vcomments.points[-1] + 1) if has_comments \
                 else 'There are no comments to select.'
 
         elif comment_command in ('HIGH','HIGHLIGHT'):                   # highlight all comments
@@ -849,6 +841,7 @@ class CommentHtmlCommand(sublime_plugin.TextCommand):
         else:
             message = self.add_comment(text)                # add new (or correct) comment at cursor
             
+        self.comment_regions().flush()                      # draw the command's highlight changes
         if message is not None:
             sublime.status_message(message)
         self.show_again()                                   # the "commments panel"
@@ -879,19 +872,14 @@ class QuickCommentsCommand(sublime_plugin.TextCommand):
         elif not hasattr(self.view, 'vcomments') or not self.view.vcomments:
             sublime.status_message('No comments for this view.')
         else:
-            the_comments = []
-            for key_pt in sorted(self.view.vcomments.keys()):
-                the_comments.append("%s Line: %03d %s" % ( self.view.vcomments[key_pt][STAMP],
-                    self.view.vcomments[key_pt][LINE] + 1,
-                    entity_ref(self.view.vcomments[key_pt][CMT], True)))
+            comment_anchors(self.view).settle()
+            the_comments = [comment_item(the_comment) for the_comment in self.view.vcomments.values()]
             window.show_quick_panel(the_comments, self.on_chosen)
 
     def on_chosen(self, index):
         if index == -1: return
-        sorted_keys = (k for (i, k) in enumerate(sorted(self.view.vcomments.keys())) if i == index)
-        try:
-            the_key = sorted_keys.next()
-        except StopIteration:
+        the_key = self.view.vcomments.nth_point(index)
+        if the_key is None:
             sublime.status_message("Comment-point not found.")
             return
         if the_key > self.view.size():
@@ -902,18 +890,56 @@ class QuickCommentsCommand(sublime_plugin.TextCommand):
         sels.clear()
         sels.add(comment_region)
         self.view.show(comment_region)
-        if self.view.substr(comment_region) != self.view.vcomments[the_key][WORD]:
+        if self.view.substr(comment_region) != self.view.vcomments[the_key].word:
             sublime.status_message("The comment is no longer on its original word.")
         else:
-            sublime.status_message("Comment: %s" % (entity_ref(self.view.vcomments[the_key][CMT], True)))
+            sublime.status_message("Comment: %s" % (entity_ref(self.view.vcomments[the_key].comment, True)))
+
+class ProjectCommentsCommand(sublime_plugin.TextCommand):     # the comments of every file (within the
+    def run(self, edit, text = None):                           # window's folders) that match text
+        window = sublime.active_window()
+        if window is None:
+            sublime.status_message('No active window.')
+        elif comment_database() is None:
+            sublime.status_message('The comments database is not available - see the console.')
+        elif text is None:
+            window.show_input_panel('Search comments>', '', self.show_matches, None, None)
+        else:
+            self.show_matches(text)
+
+    def show_matches(self, text):
+        window = sublime.active_window()
+        if window is None:
+            return
+        try:
+            self.matches = comment_database().search(text, window.folders())
+        except IOError as e:
+            sublime.status_message(str(e))
+            return
+        if not self.matches:
+            sublime.status_message('No comments found.')
+            return
+        window.show_quick_panel([[comment_item(the_comment), fname]
+            for (fname, pt, the_comment) in self.matches], self.on_chosen)
+
+    def on_chosen(self, index):
+        window = sublime.active_window()
+        if index == -1 or window is None: return
+        fname, pt, the_comment = self.matches[index]
+        if not path.exists(fname):
+            sublime.status_message("File not found: %s" % fname)
+            return
+        window.open_file("%s:%d" % (fname, the_comment.line + 1), sublime.ENCODED_POSITION)
 
 class PrintHtmlCommand(sublime_plugin.TextCommand):
-    def setup(self, numbers):
+    def setup(self, numbers, profile = None):
+        profile = profile or PrintProfile()
         path_packages = sublime.packages_path()
         if not hasattr(self.view, 'vcomments'):
-            self.view.vcomments = {}                # create empty dictionary anyway
+            use_comments(self.view, SortedComments())   # create empty dictionary anyway
             self.has_comments = False
         else:
+            comment_anchors(self.view).settle()         # move the comments with any edits
             self.has_comments = (len(self.view.vcomments) > 0)
 
         self.file_name = self.view.file_name()
@@ -933,234 +959,349 @@ class PrintHtmlCommand(sublime_plugin.TextCommand):
         alt_scheme = sublime.load_settings(PACKAGE_SETTINGS).get("alternate_scheme", False)
         scheme_file = settings.get('color_scheme') if alt_scheme == False else alt_scheme
         colour_scheme = path.normpath(scheme_file)
-        plist_file = readPlist(path_packages + colour_scheme.replace('Packages', ''))
-        colour_settings = plist_file["settings"][0]["settings"]
 
-        # Get general theme colors from color scheme file
-        self.bground = colour_settings.get('background', '#FFFFFF')
-        self.fground = colour_settings.get('foreground', '#000000')
-        self.gfground = colour_settings.get('gutterForeground', self.fground)
+        # Get general theme colors and the scope colour-mapping (parsed once, until the file changes)
+        scheme_path = path_packages + colour_scheme.replace('Packages', '')
+        with profile.phase('theme'):
+            self.bground, self.fground, self.gfground, self.colours = load_scheme(scheme_path)
 
         # Determine start and end points and whether to parse whole file or selection
         curr_sel = self.view.sel()[0]
-        if curr_sel.empty() or len(self.view.lines(curr_sel)) < 2:              # don't print just 1 line
+        first_row, last_row = (self.view.rowcol(curr_sel.begin())[0], self.view.rowcol(curr_sel.end())[0])
+        if curr_sel.empty() or first_row == last_row:   # not just 1 line
             self.size = self.view.size()
             self.pt, self.end, self.curr_row, self.partial = (0, 1, 1, False)   # partial = False: print entire view
+            self.count = self.view.rowcol(self.size)[0] + 1
         else:
             self.size = curr_sel.end()
             self.pt = curr_sel.begin()
             self.end = self.pt + 1
-            self.curr_row = self.view.rowcol(self.pt)[0] + 1
+            self.curr_row = first_row + 1
             self.partial = True                     # printing selection
+            self.count = last_row - first_row + 1   # (the lines to print)
             if self.has_comments:                   # are there any comments within the selection?
-                within_sel = (pt for pt in self.view.vcomments.keys() if self.pt <= pt <= self.size)
-                try:
-                    any_pt = within_sel.next()
-                except StopIteration:
+                if not self.view.vcomments.points_between(self.pt, self.size):
                     self.has_comments = False       # that is, none within selection
 
-        # Create scope colour-mapping from colour-scheme file
-        self.colours = { self.view.scope_name(self.end).split(' ')[0]: self.fground }
-        for item in plist_file["settings"]:
-            scope = item.get('scope', None)
-            if 'settings' in item and 'foreground' in item['settings']:
-                colour = item['settings']['foreground']
-            else:
-                colour = None
-            if scope != None and colour != None:
-                self.colours[scope] = colour
-
-    def guess_colour(self, the_key):
-        the_colour = None
-        if the_key in self.colours:
-            the_colour = self.colours[the_key]
-        else:
-            best_match = 0
-            for key in self.colours:
-                if self.view.score_selector(self.pt, key) > best_match:
-                    best_match = self.view.score_selector(self.pt, key)
-                    the_colour = self.colours[key]
-            self.colours[the_key] = the_colour or self.fground
-        return the_colour or self.fground
-
-    def add_comments_table(self, the_html):
-        the_html.write((COMMENTS_TBLHEAD).encode(*UTF8))
+        self.css_classes = sublime.load_settings(PACKAGE_SETTINGS).get("css_classes", False)
+        self.page_lines = sublime.load_settings(PACKAGE_SETTINGS).get("page_lines", 0)
+        self.key = (self.view.id(), self.view.change_count(), self.file_name, self.pt, self.size,
+            self.numbers, scheme_path, path.getmtime(scheme_path), self.font_size, self.font_face,
+            self.tab_size, self.padd_top, self.padd_bottom, self.css_classes, self.page_lines,
+            self.view.vcomments.version if self.has_comments else None)    # all that the HTML depends on
 
-        for (line_no, comment, stamp) in self.comments_list:
-            the_html.write((COMMENTS_TBLROW % {"line_adj": str(line_no - self.curr_row), \
-                "line_no": str(line_no + 1), "stamp": stamp, "comment": comment}).encode(*UTF8))
-
-        the_html.write((COMMENTS_TBLEND).encode(*UTF8))
-
-    def write_header(self, the_html):
-        the_html.write((HEADER % {"fname": self.file_name}).encode(*UTF8))
-
-        the_html.write((CSS_MAIN % {"fcolor": self.fground, "bcolor": self.bground, \
-                    "fsize": self.font_size, "fface": self.font_face}).encode(*UTF8))
-
-        if self.numbers:
-            the_html.write(('\t#olCode { list-style-type: decimal; list-style-position: outside; }\n' \
-                ).encode(*UTF8))
-        else:
-            the_html.write(('\t#olCode { list-style-type: none; list-style-position: inside; ' \
-                            + 'margin: 0px; padding: 0px; }\n').encode(*UTF8))
+    def make_renderer(self):
+        return HtmlRenderer((self.bground, self.fground, self.gfground, self.colours), self.file_name,
+            self.numbers, self.font_size, self.font_face, self.tab_size, self.padd_top, self.padd_bottom,
+            self.curr_row, self.comments_snapshot() if self.has_comments else None, self.css_classes,
+            FRAGMENTS.setdefault(self.view.id(), LineFragments()) \
+                if sublime.load_settings(PACKAGE_SETTINGS).get("reuse_printed_lines", False) else None)
 
-        the_html.write(('\tli { color: %s; margin-top: %dpt; margin-bottom: %dpt; }\n' \
-            % (self.gfground, self.padd_top, self.padd_bottom)).encode(*UTF8))
+    def comments_snapshot(self):            # the comments to be printed, decoded - for the renderer to
+        return SortedComments([(pt, self.view.vcomments[pt])   # read (on a worker) while the view's
+            for pt in self.view.vcomments.points_between(self.pt, self.size)])    # comments change
 
-        if self.has_comments:
-            the_html.write((CSS_COMMENTS % { "dot_colour": self.fground, "fsize": self.font_size } \
-                ).encode(*UTF8))
+    def scoped_lines(self):                 # (begin, text, runs) for each line to be printed
+        return scoped_lines(self.view, self.pt, self.size)
 
-        the_html.write(('\t</style>\n').encode(*UTF8))
-
-        the_html.write(('\t<script type="text/javascript">\n').encode(*UTF8))
-        the_html.write((JS_STANDARD).encode(*UTF8))
-        if self.has_comments:
-            the_html.write((JS_COMMENTS).encode(*UTF8))  # JS code to display comments
-        the_html.write(('\t</script>\n').encode(*UTF8))
-
-        the_html.write(('</head>\n').encode(*UTF8))
-
-    def convert_view_to_html(self, the_html):
-        first_line = True
-        if self.has_comments:
-            self.comments_list = []     # [(line number, comment, stamp), ..] for the commments-table
-
-        for line in self.view.split_by_newlines(sublime.Region(self.pt, self.size)):
-            self.pt = line.begin(); self.end = self.pt + 1
-            if line.empty():
-                if first_line:
-                    the_html.write(('\n</li>').encode(*UTF8))
-                    first_line = False
-                else:
-                    the_html.write(('<li>\n</li>').encode(*UTF8))
-                continue
-            self.line_end = line.end()
-            temp_line = []
-
-            while self.end <= self.line_end:
-                scope_name = self.view.scope_name(self.pt)
-                while (self.end < self.line_end and (self.view.scope_name(self.end) == scope_name 
-                        or (self.view.substr(self.end) in ('\t', ' ', '')))):
-                    self.end += 1
-
-                region = sublime.Region(self.pt, self.end)
-                if region.empty():
-                    self.pt = self.end
-                    self.end = self.pt + 1
-                    continue
-
-                tidied_text = self.view.substr(region)
-                the_colour = self.guess_colour(scope_name.strip())
-                the_comment = None; the_stamp = None
-
-                if tidied_text and self.has_comments:
-                    for x in [x for x in range(self.pt, self.end) if x in self.view.vcomments]:
-                        the_word, the_comment, the_line, the_stamp = self.view.vcomments[x]
-                        break
-
-                tidied_text = entity_ref(tidied_text)
-                tidied_text = tidied_text.replace('\t', ' ' * self.tab_size).strip('\r\n')
-                temp_line.append((the_colour, tidied_text, the_comment, the_stamp))
-
-                self.pt = self.end
-                self.end = self.pt + 1
-
-            if temp_line:
-                html_line = '' if first_line else '<li>'        # 1st opening-li is already in place
-                for (the_colour, tidied_text, the_comment, the_stamp) in temp_line:
-                    if the_colour == self.fground:
-                        the_span = (SCOPED % { "t_text": tidied_text })         # just use body (default) color
-                    else:
-                        the_span = (SCOPEDCOLOR % { "colour": the_colour, "t_text": tidied_text })
-                    if the_comment is not None:
-                        the_span = (SCOPEDCOMMENT % { "scoped": the_span, "comment": the_comment, "stamp": the_stamp })
-                        line_no, _ = self.view.rowcol(self.pt - 1)
-                        self.comments_list.append((line_no, the_comment, the_stamp))    # for the comments table
-                    html_line += the_span
-                the_html.write((html_line + '</li>').encode(*UTF8))
-                temp_line[:] = []
-            elif first_line:
-                the_html.write(('\n</li>').encode(*UTF8))
-            first_line = False
-
-    def write_body(self, the_html):
-        temp_body = '<body>\n<p id="top" style="color:%s">%s - %s</p>\n' % (self.fground, self.file_name, dt_stamp())
-        temp_body += '<div id="dChecks"><p>Attempt to tidy spaces:<input type="checkbox" name="ckbTidy" ' \
-            + 'id="ckbTidy" value="1" onclick="tidySpaces()">&nbsp;\n'
-        temp_body += 'Remove these check-boxes:<input type="checkbox" name="ckbDismiss" ' \
-            + 'id="ckbDismiss" value="1" onclick="dismissChecks()"></p>\n'
-
-        if self.has_comments:
-            temp_body += CKBs_COMMENTS              # the checkbox options
-
-        temp_body += '</div><pre id="preCode"><ol id="olCode"><li value="%d">' % (self.curr_row)    # use code's line numbering
-        
-        the_html.write((temp_body).encode(*UTF8))
-
-        self.convert_view_to_html(the_html)         # convert view to HTML
-
-        the_html.write(('</ol></pre>\n<br/>\n').encode(*UTF8))
-        # included empty line (br) to allow copying of last line without issue
-
-    def run(self, edit, numbers):
+    def run(self, edit, numbers, background = None):
         window = sublime.active_window()
         view = window.active_view() if window != None else None
         if view is None or view.id() != self.view.id():
             sublime.status_message('Click into the view/tab first.')
             return
-        self.setup(numbers)
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.html') as the_html:
-            self.write_header(the_html)
-            self.write_body(the_html)
-            if self.has_comments and self.view.vcomments:               # check if all comments were deleted
-                self.add_comments_table(the_html)                       # initially, display: none
-
-            the_html.write(('</body>\n</html>').encode(*UTF8))
+        if self.view.id() in PRINTS:
+            sublime.status_message('Already printing this view - use cancel_print_html to stop it.')
+            return
+        settings = sublime.load_settings(PACKAGE_SETTINGS)
+        if background is None:
+            background = settings.get("print_in_background", True)
+        profile = PrintProfile(settings.get("profile_print", False))
+        profile.enable()
+        try:
+            with profile.phase('setup'):
+                self.setup(numbers, profile)
+            html_file = PRINTED.get(self.key)
+            if html_file is None:
+                self.renderer = self.make_renderer()
+                profile.resolving(self.colours)
+                lines = self.scoped_lines()     # (read as they're rendered - on the main thread)
+        finally:
+            profile.disable()
+        if html_file is not None:           # nothing has changed since it was last printed
+            open_html(self.view, html_file)
+            sublime.status_message('Unchanged since last printed: %s' % html_file)
+            profile.report()
+            return
+        PrintJob(self.view, self.key, self.renderer, lines, self.count, self.page_lines, profile).start(background)
+
+def open_html(view, file_name):
+    try:
+        desktop.open(file_name)                                         # try to open in browser
+    except Exception:                                                   # .. otherwise, open in ST tab
+        open_in_tab(view, file_name)
+
+def open_in_tab(view, file_name):   # in the view's window - or, if the view has been closed since, the
+    window = view.window() or sublime.active_window()                   # active one (if there is one)
+    if window is not None:
+        window.open_file(file_name)
+    else:
+        sublime.status_message('HTML printed to %s' % file_name)
+
+class PrintCancelled(Exception):
+    pass
+
+class PrintProfile(object):         # where a print's time goes, if the 'profile_print' setting is on:
+    def __init__(self, setting = False):    # the time of each phase and the view API calls made, printed
+        self.on = bool(setting)             # to the console - and, if it's "dump", a cProfile dump of it
+        self.timer = PhaseTimer()           # all, beside the HTML file
+        self.calls = dict(VIEW_CALLS)       # (the counts so far, to be taken from those at the end)
+        self.colours = None                 # (the ScopeColours, and its guessing so far)
+        self.guessed = 0
+        self.profiler = cProfile.Profile() if setting == "dump" and cProfile is not None else None
+
+    def phase(self, name):
+        return self.timer.phase(name)
+
+    def resolving(self, colours):   # the colours the print resolves - its guessing timed as a phase
+        self.colours = (colours, colours.guessed, colours.guessing)
+
+    def add_colours(self):          # (at the end of the render, within it)
+        if self.colours is not None:
+            colours, guessed, guessing = self.colours
+            self.timer.add('colours', colours.guessing - guessing)
+            self.guessed = colours.guessed - guessed
+
+    def enable(self):               # (profiling one thread at a time: the main thread, then the worker)
+        if self.profiler is not None:
+            self.profiler.enable()
+
+    def disable(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+
+    def report(self, file_name = None):
+        if not self.on:
+            return
+        print "PrintHtml: %s" % self.timer.report()
+        print "PrintHtml: view calls reading the lines: %s; colours guessed for %d scope names" % (', '.join(['%s %d' % \
+            (name, count - self.calls.get(name, 0)) for (name, count) in sorted(VIEW_CALLS.items()) \
+                if count > self.calls.get(name, 0)]) or 'none', self.guessed)
+        if self.profiler is not None and file_name is not None:
+            try:
+                self.profiler.dump_stats(file_name + '.prof')
+                print "PrintHtml: profile written to %s.prof" % file_name
+            except (IOError, OSError) as e:
+                print str(e)
+
+PRINTS = {}         # view id -> the PrintJob rendering it (in the background)
+PRINTED = ExportCache()     # the HTML files of recent prints, by their PrintHtmlCommand.key
+FRAGMENTS = {}      # view id -> the LineFragments of its last print, for the lines unchanged since
+
+class PrintJob(object):             # renders a view's lines to a temporary file (or, for more lines than
+    def __init__(self, view, key, renderer, lines, count, page_lines = 0, profile = None):  # page_lines,
+        self.view = view                                # to an index file and its pages beside it) and
+        self.key = key                                  # opens it - on a worker thread, if in the
+        self.renderer = renderer                        # background, with the main thread reading the
+        self.lines = lines                              # lines for it a few batches ahead, and watching
+        self.count = count                              # its progress
+        self.page_lines = page_lines
+        self.pages = []             # the pages' files, if paged
+        self.profile = profile or PrintProfile()
+        self.done = 0               # lines rendered so far
+        self.cancelled = False
+        self.finished = False
+        self.file_name = None
+        self.opened = False         # opened in the browser (otherwise it's opened in a tab)
+        self.error = None
+        self.batches = None         # (in the background) the batches of lines read for the worker
+        self.stopped = None         # the error that stopped the reading, if one did
+        self.reading = 0.0          # seconds spent reading them
+
+    def start(self, background):
+        if not background:
+            self.render()
+            self.report()
+            return
+        PRINTS[self.view.id()] = self
+        self.batches = Queue.Queue(FEED_BATCHES)
+        worker = threading.Thread(target = self.render)
+        worker.daemon = True        # (don't hold up ST closing)
+        worker.start()
+        sublime.set_timeout(self.feed, 0)
+        sublime.set_timeout(self.watch, 100)
+
+    def feed(self):                 # (on the main thread) reads batches of lines for the worker, while
+        started = time.time()       # there's room for them, for a moment at a time
+        try:
+            while not (self.cancelled or self.finished or self.batches.full()) and \
+                    time.time() - started < 0.05:
+                if self.view.change_count() != self.key[1]:
+                    raise IOError('The view was changed while printing - print it again.')
+                batch = list(itertools.islice(self.lines, FEED_LINES))
+                self.batches.put(batch)
+                if not batch:
+                    return          # (the empty batch ends them)
+        except Exception as e:
+            self.stopped = e
+            return
+        finally:
+            self.reading += time.time() - started
+        if not (self.cancelled or self.finished):   # (the worker may have stopped, on an error)
+            sublime.set_timeout(self.feed, 10 if self.batches.full() else 0)
 
+    def fed_lines(self):            # (on the worker) the lines, as the main thread reads them
+        while True:
             try:
-                desktop.open(the_html.name)                             # try to open in browser
+                batch = self.batches.get(True, 0.1)
+            except Queue.Empty:
+                if self.stopped is not None:
+                    raise self.stopped
+                if self.cancelled:
+                    raise PrintCancelled()
+                continue
+            if not batch:
+                return
+            for line in batch:
+                yield line
+
+    def read_lines(self):           # (in the foreground) the lines, a batch at a time - timing the reading
+        while True:
+            started = time.time()
+            batch = list(itertools.islice(self.lines, FEED_LINES))
+            self.reading += time.time() - started
+            if not batch:
+                return
+            for line in batch:
+                yield line
+
+    def counted_lines(self):
+        for line in self.fed_lines() if self.batches is not None else self.read_lines():
+            if self.cancelled:
+                raise PrintCancelled()
+            yield line
+            self.done += 1
+
+    def render(self):               # (on the worker thread - no sublime API calls here)
+        profile = self.profile
+        profile.enable()
+        try:
+            with tempfile.NamedTemporaryFile(delete=False, suffix='.html') as html_file:
+                self.file_name = html_file.name
+            with profile.phase('render'):
+                if self.page_lines and self.count > self.page_lines:
+                    self.pages = render_pages(self.renderer, self.counted_lines(), self.file_name,
+                        self.page_lines, self.write_file)
+                else:
+                    self.write_file(self.file_name, self.write_document)
+                profile.add_colours()
+            try:
+                with profile.phase('open'):
+                    desktop.open(self.file_name)                        # try to open in browser
+                self.opened = True
             except Exception:                                           # .. otherwise, open in ST tab
-                self.view.window().open_file(the_html.name)
+                pass
+        except PrintCancelled:
+            self.remove_files()
+        except Exception as e:      # (reported, on the main thread - and nothing is cached)
+            self.error = e
+            self.remove_files()
+        finally:
+            profile.disable()
+            self.finished = True
+
+    def remove_files(self):         # the file (and pages) of a print that didn't finish
+        if self.file_name is None:
+            return
+        for file_name in [self.file_name] + page_files(self.file_name):
+            try:
+                os.remove(file_name)
+            except OSError:
+                pass
+
+    def write_file(self, file_name, write):     # write(the_file) into the file
+        with open(file_name, 'wb') as the_file:
+            write(the_file)
+
+    def write_document(self, the_file):
+        the_html = HtmlSink(the_file)
+        self.renderer.render(the_html, self.counted_lines())
+        the_html.flush()
+
+    def watch(self):                # (on the main thread) progress in the status bar, until finished
+        if not self.finished:
+            self.view.set_status('print_html', 'Printing HTML: %d%%%s' % (100 * self.done / \
+                max(1, self.count), ' (cancelling)' if self.cancelled else ''))
+            sublime.set_timeout(self.watch, 100)
+            return
+        self.view.erase_status('print_html')
+        PRINTS.pop(self.view.id(), None)
+        self.report()
+
+    def report(self):
+        if self.cancelled:
+            sublime.status_message('Printing cancelled.')
+        elif self.error is not None:
+            sublime.status_message('Could not print HTML: %s' % self.error)
+        else:
+            PRINTED.add(self.key, self.file_name, self.pages)
+            if not self.opened:
+                open_in_tab(self.view, self.file_name)
+            self.profile.timer.add('scopes', self.reading)      # (read while they were rendered)
+            self.profile.report(self.file_name)
+
+class CancelPrintHtmlCommand(sublime_plugin.TextCommand):
+    def run(self, edit):
+        job = PRINTS.get(self.view.id(), None)
+        if job is None:
+            sublime.status_message('Not printing this view.')
+        else:
+            job.cancelled = True
 
 class SaveWithCommentsCommand(sublime_plugin.TextCommand):
     def run(self, edit):
+        try:
+            self.save_comments()
+        finally:
+            self.view.run_command('save')   # (whatever became of the comments)
+
+    def save_comments(self):
         if not hasattr(self.view, 'vcomments') or not self.view.vcomments:
             print "No comments found to save."
-            self.view.run_command('save')
             return
+        comment_anchors(self.view).settle()
         fname = self.view.file_name()
         if fname == None or not path.exists(fname):
             fname = "Untitled."
+        cstore = comment_store(self.view, fname + 'cmts')
+        before = saved_note(cstore)
         try:
-            fname_dict = open(fname + 'cmts', 'wb')
-            pickle.dump(self.view.vcomments, fname_dict)
-        except IOError:
-            print "Could not create comments file: %s" % (fname + 'cmts')
-            self.view.run_command('save')
+            cstore.save(self.view.vcomments)
+        except Exception as e:
+            print "Could not create comments file: %s (%s)" % (fname + 'cmts', e)
             return
-        fname_dict.close()
         if fname == "Untitled.":                    # getcwd() - 'current working directory'
             print "File not saved, so comments saved as: %s%sUntitled.cmts" \
                 % (os.getcwd(), os.path.sep)
         else:
+            index_comments(self.view, fname, before)
             print "Comments saved as %s" % (fname + 'cmts')
 
-        self.view.run_command('save')
-
-        if fname == None or not path.exists(fname):
-            print "The filename is not available, so comments cannot be loaded."
-            return
-        try:
-            fname_dict = open(fname + 'cmts', 'rb')
-            the_comments = pickle.load(fname_dict)
-        except IOError:
-            print "Could not find or read comments file: %s" % (fname + 'cmts')
-            return
-        fname_dict.close()
-        if not the_comments:
-            print "No comments found in %s" % (fname + 'cmts')
-        else:
-            self.view.vcomments = the_comments
-            print 'Comments re-loaded.'
\ No newline at end of file
+class CommentAnchorsListener(sublime_plugin.EventListener):
+    def on_modified(self, view):            # note the edit, for the view's comments to follow it later
+        anchors = ANCHORS.get(view.id(), None)
+        if anchors is None:
+            return                          # no comments for this view
+        anchors.modified(view.size(), view.rowcol(view.size())[0], caret(view))
+
+    def on_selection_modified(self, view):  # (where the next edit is made, if it's typed)
+        anchors = ANCHORS.get(view.id(), None)
+        if anchors is not None:
+            anchors.moved(caret(view))
+
+    def on_close(self, view):
+        ANCHORS.pop(view.id(), None)
+        FRAGMENTS.pop(view.id(), None)
+        SNAPSHOTS.pop(view.id(), None)
+        if view.id() in PRINTS:
+            PRINTS[view.id()].cancelled = True      # (its watch no longer has a view to report to)
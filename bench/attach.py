@@ -0,0 +1,94 @@
+# Times attaching comments to the runs they fall in while rendering - HtmlRenderer walking the sorted
+# comment-points alongside the runs, against the way print_html once did it: probing the comments for
+# each point of each run. The document is one of long string tokens (where the probing cost the most),
+# with a comment on many of its lines; the two renders' HTML is checked to be the same.
+#
+#   python bench/attach.py --lines 20000 --length 400 --comments 5000
+
+import io, sys, time, random, optparse
+from os import path
+
+BENCH = path.dirname(path.abspath(__file__))
+REPO = path.dirname(BENCH)
+
+def long_tokens(lines, length, seed = 1):   # -> (text, tokens): each line a name and a long string
+    rnd = random.Random(seed)
+    pieces, tokens, pos = ([], [], 0)
+    for row in range(lines):
+        for (text, scope) in (('name_%d = ' % row, 'source.python '),
+                ("'%s'" % ''.join([rnd.choice('abcdef <&> ') for _ in range(length)]),
+                    'source.python string.quoted.single.python '),
+                ('\n', 'source.python ')):
+            tokens.append((scope, pos, pos + len(text)))
+            pieces.append(text)
+            pos += len(text)
+    return (u''.join(pieces), tokens)
+
+def make_comments(text, count, seed = 1):   # -> SortedComments, on count points of the text's lines
+    from htmlprint import Comment, SortedComments
+    rnd = random.Random(seed)
+    starts = [0] + [i + 1 for (i, c) in enumerate(text) if c == '\n']
+    comments = SortedComments()
+    for row in rnd.sample(range(len(starts) - 1), min(count, len(starts) - 1)):
+        pt = rnd.randint(starts[row], starts[row + 1] - 2)
+        comments[pt] = Comment(text[pt], u'Comment on line %d' % (row + 1), row, 0)
+    return comments
+
+def scanning_renderer(HtmlRenderer):        # a renderer attaching comments as print_html once did
+    from htmlprint.render import entity_ref, SCOPEDCOMMENT
+    class ScanningRenderer(HtmlRenderer):
+        def line_spans(self, row, line_text, line_begin, runs):
+            for (scope_name, pt, end) in runs:
+                tidied_text = line_text[pt - line_begin:end - line_begin]
+                the_colour = self.colours.resolve(scope_name.strip())
+                the_comment = None; the_stamp = None
+                if tidied_text and self.has_comments:
+                    for x in [x for x in range(pt, end) if x in self.comments]:
+                        comment = self.comments[x]
+                        the_comment, the_stamp = (comment.comment, comment.shown_stamp())
+                        break
+                tidied_text = entity_ref(tidied_text)
+                tidied_text = tidied_text.replace('\t', ' ' * self.tab_size).strip('\r\n')
+                the_span = self.span(the_colour, tidied_text)
+                if the_comment is not None:
+                    the_span = (SCOPEDCOMMENT % { "scoped": the_span, "comment": the_comment, "stamp": the_stamp })
+                    self.comments_list.append((self.curr_row - 1 + row, the_comment, the_stamp))
+                yield the_span
+    return ScanningRenderer
+
+def render(renderer_class, scheme, text, tokens, comments):    # -> (the HTML, seconds, table rows)
+    from htmlprint import HtmlSink, document_lines, text_lines
+    renderer = renderer_class(scheme, u'strings.py', True, comments=comments)
+    target = io.BytesIO()
+    started = time.time()
+    the_html = HtmlSink(target)
+    renderer.render(the_html, document_lines(text_lines(text), iter(tokens)))
+    the_html.flush()
+    return (target.getvalue(), time.time() - started, len(renderer.comments_list))
+
+def main(argv = None):
+    parser = optparse.OptionParser(usage="%prog [options]")
+    parser.add_option("--lines", type="int", default=20000, help="lines in the document")
+    parser.add_option("--length", type="int", default=400, help="characters in each line's string")
+    parser.add_option("--comments", type="int", default=5000, help="comments (at most one a line)")
+    parser.add_option("--scheme", default="Print-Color.tmTheme", help="colour-scheme (in ColorSchemes/)")
+    options, args = parser.parse_args(argv)
+
+    sys.path[:0] = [BENCH, REPO]
+    from htmlprint import HtmlRenderer, load_scheme
+    scheme = load_scheme(path.join(REPO, 'ColorSchemes', options.scheme))
+    text, tokens = long_tokens(options.lines, options.length)
+    comments = make_comments(text, options.comments)
+    sys.stdout.write("%d lines, %d chars, %d comments\n" % (options.lines, len(text), len(comments)))
+    results = []
+    for (way, renderer_class) in (('range scan', scanning_renderer(HtmlRenderer)), ('merge-walk', HtmlRenderer)):
+        html, seconds, rows = render(renderer_class, scheme, text, tokens, comments)
+        results.append(html)
+        sys.stdout.write("%-11s %8.1f ms  (%d table rows)\n" % (way, seconds * 1e3, rows))
+    if results[0] != results[1]:
+        sys.stdout.write("The two renders differ!\n")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
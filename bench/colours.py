@@ -0,0 +1,76 @@
+# Times resolving scope names to colours with ScopeColours - the colour-scheme's selectors compiled
+# into a trie, each name resolved once - against the way print_html once did it: asking the view to
+# score every selector of the scheme (twice, for the best so far) for each new scope name. The scheme
+# is a synthetic one of several hundred rules, the names as deep as a real grammar's.
+#
+#   python bench/colours.py --rules 400 --names 2000
+
+import sys, time, random, optparse
+from os import path
+
+BENCH = path.dirname(path.abspath(__file__))
+REPO = path.dirname(BENCH)
+
+HEADS = ['comment', 'string', 'constant', 'keyword', 'storage', 'entity', 'variable', 'support', 'meta',
+    'markup', 'punctuation', 'invalid']
+PARTS = ['name', 'other', 'quoted', 'numeric', 'language', 'function', 'class', 'tag', 'control', 'type',
+    'definition', 'begin', 'end']
+LANGUAGES = ['python', 'js', 'html', 'css', 'ruby', 'json']
+
+def synthetic(rules, names, seed = 3):  # -> (the scheme's settings, scope names)
+    rnd = random.Random(seed)
+    def selector(parts):
+        return '.'.join([rnd.choice(HEADS)] + [rnd.choice(PARTS) for _ in range(parts)])
+    scheme = [{'settings': {}}] + [{'scope': selector(rnd.randint(0, 2)) +
+        (' ' + selector(1) if rnd.random() < 0.2 else ''),
+        'settings': {'foreground': '#%06X' % rnd.randint(0, 0xFFFFFF)}} for _ in range(rules)]
+    names = ['source.%s ' % rnd.choice(LANGUAGES) + ' '.join([selector(rnd.randint(1, 3)) + '.' +
+        rnd.choice(LANGUAGES) for _ in range(rnd.randint(1, 4))]) for _ in range(names)]
+    return (scheme, names)
+
+def main(argv = None):
+    parser = optparse.OptionParser(usage="%prog [options]")
+    parser.add_option("--rules", type="int", default=400, help="rules in the synthetic scheme")
+    parser.add_option("--names", type="int", default=2000, help="distinct scope names to resolve")
+    options, args = parser.parse_args(argv)
+
+    sys.path[:0] = [BENCH, REPO]
+    import sublime
+    from htmlprint import ScopeColours
+    scheme, names = synthetic(options.rules, options.names)
+
+    started = time.time()
+    colours = ScopeColours(scheme, '#000000')
+    built = time.time() - started
+    started = time.time()
+    for name in names:
+        colours.resolve(name)
+    resolved = time.time() - started
+    started = time.time()
+    for name in names:
+        colours.resolve(name)
+    remembered = time.time() - started
+
+    selectors = dict([(item['scope'], item['settings']['foreground']) for item in scheme if 'scope' in item])
+    view = sublime.View(u'x', [])
+    sublime.CALLS.clear()
+    started = time.time()
+    for name in names:                  # (the view scoring each selector at a point of this scope)
+        view.tokens, view.starts = ([(name, 0, 1)], [0])
+        best = 0
+        for key in selectors:
+            if view.score_selector(0, key) > best:
+                best = view.score_selector(0, key)
+    scored = time.time() - started
+
+    sys.stdout.write("%d rules (%d distinct selectors), %d distinct scope names\n" % (len(scheme) - 1,
+        len(selectors), len(names)))
+    sys.stdout.write("trie built        %8.1f ms\n" % (built * 1e3))
+    sys.stdout.write("resolved          %8.1f ms  (%.1f us a name)\n" % (resolved * 1e3, resolved * 1e6 / len(names)))
+    sys.stdout.write("resolved again    %8.1f ms  (remembered)\n" % (remembered * 1e3))
+    sys.stdout.write("score_selector    %8.1f ms  (%d view API calls)\n" % (scored * 1e3,
+        sublime.CALLS.get('score_selector', 0)))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
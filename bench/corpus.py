@@ -0,0 +1,58 @@
+# The texts the benchmark exports, each with its tokens - [(scope, begin, end), ..] in order, covering
+# the text - as the editor would scope it. make() writes Python-like source of any size (the same
+# for the same size and seed); from_file() lexes a real file with pygments, where it is installed.
+
+import io, random
+
+BASE = 'source.python '
+KEYWORDS = ['def', 'class', 'return', 'if', 'else', 'for', 'while', 'import']
+
+def make(lines, seed = 1):              # -> (text, tokens)
+    rnd = random.Random(seed)
+    pieces, tokens = ([], [])
+    pos = 0
+    for row in range(lines):
+        if rnd.random() < 0.1:
+            line = [('# ' + ' '.join(['word%d' % rnd.randint(0, 99) for _ in range(8)]),
+                BASE + 'comment.line.number-sign.python ')]
+        else:
+            line = [('    ' * rnd.randint(0, 3), BASE),
+                (rnd.choice(KEYWORDS), BASE + 'keyword.control.python '),
+                (' ', BASE),
+                ('name_%d' % rnd.randint(0, 999), BASE + 'meta.function.python entity.name.function.python '),
+                ('(', BASE + 'punctuation.definition.parameters.begin.python '),
+                ("'a string with <tags> & entities %d'" % row, BASE + 'string.quoted.single.python '),
+                (', ', BASE),
+                ('%d' % rnd.randint(0, 10 ** 6), BASE + 'constant.numeric.integer.decimal.python '),
+                (')', BASE + 'punctuation.definition.parameters.end.python '),
+                ('\t', BASE)]
+        line.append(('\n', BASE))
+        for (text, scope) in line:
+            if text:
+                tokens.append((scope, pos, pos + len(text)))
+                pieces.append(text)
+                pos += len(text)
+    return (u''.join(pieces), tokens)
+
+def from_file(file_name, encoding = 'utf-8'):   # -> (text, tokens), or None if it can't be lexed
+    from htmlprint.lexers import find_lexer, scoped_tokens
+    lexer = find_lexer(file_name)
+    if lexer is None:
+        return None
+    with io.open(file_name, 'r', encoding=encoding, errors='replace', newline=None) as the_file:
+        text = the_file.read()
+    return (text, list(scoped_tokens(text, lexer)))
+
+def comment_points(text, density, seed = 1):    # [(pt, word, row), ..] - a word on density of the lines
+    rnd = random.Random(seed)
+    points, pos = ([], 0)
+    for (row, line) in enumerate(text.split('\n')):
+        if line.strip() and rnd.random() < density:
+            begin = pos + len(line) - len(line.lstrip())
+            end = begin
+            while end < pos + len(line) and (text[end].isalnum() or text[end] == '_'):
+                end += 1
+            if end > begin:
+                points.append((begin, text[begin:end], row))
+        pos += len(line) + 1
+    return points
@@ -0,0 +1,131 @@
+# Times PrintHtmlCommand's export - setup, write_header, write_body and add_comments_table - outside
+# the editor, against the stand-in sublime module in this folder, for synthetic texts of several sizes
+# and comment densities (or a real file's). Each case runs in a fresh process so that its peak memory
+# is its own; the report, as JSON, gives each phase's time and the view API calls it made.
+#
+#   python2 bench/export.py --lines 1000,10000,50000 --density 0,0.01,0.1 -o report.json
+#
+# (Python 2, as PrintHtml.py is written for Sublime Text 2's Python.)
+
+import sys, time, json, optparse, platform, subprocess
+from os import path
+
+BENCH = path.dirname(path.abspath(__file__))
+REPO = path.dirname(BENCH)
+
+class Discard(object):                  # a file that only counts what is written to it
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+
+def peak_rss_kb():
+    try:
+        import resource
+    except ImportError:
+        return None                     # (Windows)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak   # (bytes on OS X, KB elsewhere)
+
+def run_case(lines, density, options):  # -> the case's report (in this process)
+    sys.path[:0] = [BENCH, REPO]
+    import sublime, corpus
+    sublime.PACKAGES[0] = path.dirname(REPO)
+    sublime.load_settings('Preferences.sublime-settings').update({'color_scheme':
+        'Packages/%s/ColorSchemes/%s' % (path.basename(REPO), options.scheme), 'tab_size': 4})
+    sublime.load_settings('PrintHtml.sublime-settings').update({'css_classes': options.css_classes})
+    import PrintHtml
+    from htmlprint import HtmlSink, Comment, SortedComments
+
+    if options.file:
+        text, tokens = corpus.from_file(options.file) or (None, None)
+        if text is None:
+            raise SystemExit("No lexer for %s (is pygments installed?)" % options.file)
+    else:
+        text, tokens = corpus.make(lines)
+    view = sublime.View(text, tokens, None, options.bulk)
+    sublime.WINDOW.view = view
+    view.vcomments = SortedComments([(pt, Comment(word, u'Comment %d on <%s> & more' % (i, word), row, 0))
+        for (i, (pt, word, row)) in enumerate(corpus.comment_points(text, density))])
+    report = {'lines': text.count('\n') + 1, 'chars': len(text), 'density': density,
+        'comments': len(view.vcomments), 'seconds': {}, 'calls': {}, 'rss_before_kb': peak_rss_kb()}
+
+    command = PrintHtml.PrintHtmlCommand(view)
+    out = Discard()
+    def setup():
+        command.setup(options.numbers)
+        command.renderer = command.make_renderer()
+    def write_header():
+        command.the_html = HtmlSink(out)
+        command.renderer.write_header(command.the_html)
+    def write_body():
+        command.renderer.write_body(command.the_html, command.scoped_lines())
+    def add_comments_table():
+        if command.renderer.has_comments and command.renderer.comments:
+            command.renderer.add_comments_table(command.the_html)
+        command.the_html.flush()
+    started = time.time()
+    for phase in (setup, write_header, write_body, add_comments_table):
+        sublime.CALLS.clear()
+        phase_started = time.time()
+        phase()
+        report['seconds'][phase.__name__] = round(time.time() - phase_started, 4)
+        report['calls'][phase.__name__] = dict(sublime.CALLS)
+    report['seconds']['total'] = round(time.time() - started, 4)
+    report['html_bytes'] = out.size
+    report['peak_rss_kb'] = peak_rss_kb()
+    return report
+
+def option_parser():
+    parser = optparse.OptionParser(usage="%prog [options]")
+    parser.add_option("--lines", default="1000,10000,50000", help="sizes of the synthetic texts, in lines")
+    parser.add_option("--density", default="0,0.01,0.1", help="proportions of the lines with a comment")
+    parser.add_option("--file", help="export this file (lexed with pygments) instead of synthetic texts")
+    parser.add_option("--scheme", default="Print-Color.tmTheme", help="colour-scheme, in ColorSchemes")
+    parser.add_option("-n", "--numbers", action="store_true", default=False, help="show line numbers")
+    parser.add_option("-c", "--css-classes", action="store_true", default=False)
+    parser.add_option("--bulk", action="store_true", default=False,
+        help="offer the view's bulk scope API (extract_tokens_with_scopes)")
+    parser.add_option("-r", "--repeat", type="int", default=1, help="runs of each case, the fastest reported")
+    parser.add_option("-o", "--output", help="write the report here (default: stdout)")
+    parser.add_option("--case", help=optparse.SUPPRESS_HELP)    # (lines,density - run in this process)
+    return parser
+
+def main(argv = None):
+    options, args = option_parser().parse_args(argv)
+    if options.case:
+        lines, density = options.case.split(',')
+        sys.stdout.write(json.dumps(run_case(int(lines), float(density), options)))
+        return 0
+    passed = ['--scheme', options.scheme] + (['--file', options.file] if options.file else []) + \
+        [flag for (flag, on) in (('-n', options.numbers), ('-c', options.css_classes), ('--bulk', options.bulk)) if on]
+    cases = []
+    sizes = [0] if options.file else [int(n) for n in options.lines.split(',')]
+    for lines in sizes:
+        for density in [float(d) for d in options.density.split(',')]:
+            runs = []
+            for _ in range(max(1, options.repeat)):
+                child = subprocess.Popen([sys.executable, path.abspath(__file__), '--case',
+                    '%d,%s' % (lines, density)] + passed, stdout=subprocess.PIPE)
+                output = child.communicate()[0]
+                if child.returncode != 0:
+                    sys.stderr.write("case %d lines, density %s failed\n" % (lines, density))
+                    return 1
+                runs.append(json.loads(output.decode('utf-8')))
+            best = min(runs, key=lambda run: run['seconds']['total'])
+            sys.stderr.write("%7d lines %5d comments %8.3fs %6s KB peak\n" % (best['lines'], best['comments'],
+                best['seconds']['total'], best['peak_rss_kb']))
+            cases.append(best)
+    report = json.dumps({'python': platform.python_version(), 'platform': platform.platform(),
+        'file': options.file, 'numbers': options.numbers, 'css_classes': options.css_classes,
+        'bulk': options.bulk, 'cases': cases}, indent=2, sort_keys=True)
+    if options.output:
+        with open(options.output, 'w') as the_file:
+            the_file.write(report + '\n')
+    else:
+        sys.stdout.write(report + '\n')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
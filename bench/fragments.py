@@ -0,0 +1,72 @@
+# Times printing a document again after a small edit, with LineFragments re-using the HTML of the lines
+# that did not change, against rendering every line afresh. The document is a synthetic one (see
+# corpus.py); the edit inserts a few characters into lines spread through it, moving every point after
+# them. The re-used render's HTML is checked against a fresh render of the edited document.
+#
+#   python bench/fragments.py --lines 50000 --edits 1 --repeat 3
+
+import io, sys, time, optparse
+from os import path
+
+BENCH = path.dirname(path.abspath(__file__))
+REPO = path.dirname(BENCH)
+INSERTED = u'_x'
+
+def edited(text, tokens, edits):        # -> (text, tokens) with INSERTED at the start of edits tokens
+    step = max(1, len(tokens) // (edits + 1))           # spread through the text (each the first token,
+    at = step                                           # from there, that isn't blank)
+    pieces, new_tokens, moved = ([], [], 0)
+    for (i, (scope, begin, end)) in enumerate(tokens):
+        piece = text[begin:end]
+        if i >= at and edits and piece.strip():
+            piece = INSERTED + piece
+            at, edits = (at + step, edits - 1)
+        pieces.append(piece)
+        new_tokens.append((scope, begin + moved, begin + moved + len(piece)))
+        moved += len(piece) - (end - begin)
+    return (u''.join(pieces), new_tokens)
+
+def render(scheme, text, tokens, fragments):    # -> (the HTML, seconds)
+    from htmlprint import HtmlRenderer, HtmlSink, document_lines, text_lines
+    renderer = HtmlRenderer(scheme, u'corpus.py', True, fragments=fragments)
+    target = io.BytesIO()
+    started = time.time()
+    the_html = HtmlSink(target)
+    renderer.render(the_html, document_lines(text_lines(text), iter(tokens)))
+    the_html.flush()
+    return (target.getvalue(), time.time() - started)
+
+def main(argv = None):
+    parser = optparse.OptionParser(usage="%prog [options]")
+    parser.add_option("--lines", type="int", default=50000, help="lines in the synthetic document")
+    parser.add_option("--edits", type="int", default=1, help="lines edited between the renders")
+    parser.add_option("--repeat", type="int", default=3, help="runs of each render (the fastest is shown)")
+    parser.add_option("--scheme", default="Print-Color.tmTheme", help="colour-scheme (in ColorSchemes/)")
+    options, args = parser.parse_args(argv)
+
+    sys.path[:0] = [BENCH, REPO]
+    import corpus
+    from htmlprint import LineFragments, load_scheme
+    scheme = load_scheme(path.join(REPO, 'ColorSchemes', options.scheme))
+    text, tokens = corpus.make(options.lines)
+    new_text, new_tokens = edited(text, tokens, options.edits)
+
+    times = []                          # [(full, first, after the edit), ..] for each run
+    for _ in range(options.repeat):
+        fragments = LineFragments()
+        _, first = render(scheme, text, tokens, fragments)
+        again, seconds = render(scheme, new_text, new_tokens, fragments)
+        fresh, full = render(scheme, new_text, new_tokens, None)
+        times.append((full, first, seconds))
+    full, first, seconds = [min(run) for run in zip(*times)]
+    sys.stdout.write("%d lines, %d edited\n" % (options.lines, options.edits))
+    sys.stdout.write("full render       %8.1f ms\n" % (full * 1e3))
+    sys.stdout.write("first render      %8.1f ms  (keeping each line)\n" % (first * 1e3))
+    sys.stdout.write("after the edit    %8.1f ms  (%d lines re-used)\n" % (seconds * 1e3, fragments.hits))
+    if again != fresh:
+        sys.stdout.write("The re-used render differs from a fresh one!\n")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
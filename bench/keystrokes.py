@@ -0,0 +1,82 @@
+# Times what typing costs a view with comments: each keystroke's on_modified (noting the edit, for the
+# comments to follow it) and the re-anchoring the comment commands then do - for the edits followed at
+# the caret, and for an edit that couldn't be, after which every comment is re-anchored (as each
+# command once did). Checks, too, that every comment is still on its word afterwards.
+#
+#   python2 bench/keystrokes.py --lines 20000 --comments 5000
+#
+# (Python 2, as PrintHtml.py is written for Sublime Text 2's Python.)
+
+import sys, time, random, optparse
+from os import path
+
+BENCH = path.dirname(path.abspath(__file__))
+REPO = path.dirname(BENCH)
+
+def misplaced(view):                    # the comments no longer on their word
+    return [pt for (pt, the_comment) in view.vcomments.items()
+        if view.text[pt:pt + len(the_comment.word)] != the_comment.word]
+
+def main(argv = None):
+    parser = optparse.OptionParser(usage="%prog [options]")
+    parser.add_option("--lines", type="int", default=20000, help="size of the synthetic text, in lines")
+    parser.add_option("--comments", type="int", default=5000, help="comments on the text's words")
+    parser.add_option("--bursts", type="int", default=100, help="places typed at, a few keys at each")
+    options, args = parser.parse_args(argv)
+
+    sys.path[:0] = [BENCH, REPO]
+    import sublime, corpus, PrintHtml
+    from htmlprint import Comment, SortedComments
+    text, tokens = corpus.make(options.lines)
+    view = sublime.View(text, tokens)
+    sublime.WINDOW.view = view
+    points = corpus.comment_points(text, 1.0)
+    points = random.Random(2).sample(points, min(options.comments, len(points)))
+    PrintHtml.use_comments(view, SortedComments([(pt, Comment(word, u'Comment %d' % i, row, 0))
+        for (i, (pt, word, row)) in enumerate(points)]))
+    command = PrintHtml.CommentHtmlCommand(view)
+    listener = PrintHtml.CommentAnchorsListener()
+    command.adjust_comments()
+
+    rnd = random.Random(3)
+    sublime.CALLS.clear()
+    keys, key_time, adjust_time = (0, 0.0, 0.0)
+    for burst in range(options.bursts):
+        pt = view.text.rfind(' ', 0, rnd.randrange(len(view.text))) + 1     # (before a word)
+        view.selection[:] = [sublime.Region(pt, pt)]
+        listener.on_selection_modified(view)
+        for key in ('abc\n    de' if burst % 2 else 'xyz ') + '\b':
+            if key == '\b':
+                view.replace_text(pt - 1, pt, '')
+            else:
+                view.replace_text(pt, pt, key)
+            pt = view.selection[0].begin()
+            started = time.time()
+            listener.on_modified(view)
+            listener.on_selection_modified(view)
+            key_time += time.time() - started
+            keys += 1
+        calls = sum(sublime.CALLS.values())
+        started = time.time()
+        command.adjust_comments()       # (as get_comment does, whenever the panel is shown)
+        adjust_time += time.time() - started
+        sublime.CALLS.clear()
+    followed = misplaced(view)
+
+    view.replace_text(0, 0, '# a line added by something other than typing\n')
+    listener.on_modified(view)          # (the caret was elsewhere - the edit is lost)
+    started = time.time()
+    command.adjust_comments()
+    lost_time = time.time() - started
+
+    sys.stdout.write("%d lines, %d comments\n" % (view.text.count('\n') + 1, len(view.vcomments)))
+    sys.stdout.write("per keystroke   %8.1f us  (%d keys, %d view API calls each)\n" % (key_time / keys * 1e6,
+        keys, calls // ((keys // options.bursts) or 1)))
+    sys.stdout.write("re-anchor       %8.2f ms  after the keys typed at each place\n" %
+        (adjust_time / options.bursts * 1e3))
+    sys.stdout.write("re-anchor all   %8.2f ms  after an edit away from the caret\n" % (lost_time * 1e3))
+    sys.stdout.write("misplaced       %8d     comments, after typing\n" % len(followed))
+    return 1 if followed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
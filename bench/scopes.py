@@ -0,0 +1,56 @@
+# Times reading a view's lines with their scope runs - as print_html once did, with a scope_name() and a
+# substr() for each point, and as scoped_lines() does now: probing only the points that can start a
+# run, or asking for a line's tokens at once where the editor offers extract_tokens_with_scopes. Each
+# way's runs are checked against the others', line by line.
+#
+#   python2 bench/scopes.py --lines 20000
+#
+# (Python 2, as PrintHtml.py is written for Sublime Text 2's Python.)
+
+import sys, time, optparse
+from os import path
+
+BENCH = path.dirname(path.abspath(__file__))
+REPO = path.dirname(BENCH)
+
+def per_point(sublime, view, begin, end):   # the original loop: each run extended a point at a time
+    for line in view.split_by_newlines(sublime.Region(begin, end)):
+        pt, line_end, runs = (line.begin(), line.end(), [])
+        while pt < line_end:
+            scope_name, run_end = (view.scope_name(pt), pt + 1)
+            while run_end < line_end and (view.scope_name(run_end) == scope_name or
+                    view.substr(run_end) in ('\t', ' ', '')):
+                run_end += 1
+            runs.append((scope_name, pt, run_end))
+            pt = run_end
+        yield (line.begin(), view.substr(line), runs)
+
+def timed(sublime, lines):                  # -> (the lines, seconds, view API calls)
+    sublime.CALLS.clear()
+    started = time.time()
+    lines = list(lines)
+    return (lines, time.time() - started, sum(sublime.CALLS.values()))
+
+def main(argv = None):
+    parser = optparse.OptionParser(usage="%prog [options]")
+    parser.add_option("--lines", type="int", default=20000, help="size of the synthetic text, in lines")
+    options, args = parser.parse_args(argv)
+
+    sys.path[:0] = [BENCH, REPO]
+    import sublime, corpus, PrintHtml
+    text, tokens = corpus.make(options.lines)
+    view = sublime.View(text, tokens)
+    view.rowcol(0)                          # (the stand-in indexes its lines, as the editor has)
+    results = [('per point', timed(sublime, per_point(sublime, view, 0, view.size())))]
+    results.append(('run starts', timed(sublime, PrintHtml.scoped_lines(view, 0, view.size()))))
+    view.extract_tokens_with_scopes = view.tokens_with_scopes
+    results.append(('bulk', timed(sublime, PrintHtml.scoped_lines(view, 0, view.size()))))
+
+    sys.stdout.write("%d lines, %d characters\n" % (len(results[0][1][0]), len(text)))
+    for (name, (lines, seconds, calls)) in results:
+        differ = len([1 for (mine, theirs) in zip(lines, results[0][1][0]) if mine != theirs])
+        sys.stdout.write("%-12s %8.3fs %10d view API calls  %d lines differ\n" % (name, seconds, calls, differ))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
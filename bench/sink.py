@@ -0,0 +1,74 @@
+# Times writing an export's HTML through HtmlSink - the pieces joined and encoded in large blocks -
+# against the way print_html once wrote it: each piece encoded, and written, as it was made. The
+# pieces are those of a synthetic document rendered with a real colour-scheme; they are written to a
+# file (in the temp directory) and to an in-memory target, and the report is in MB of HTML a second.
+#
+#   python bench/sink.py --lines 50000 --repeat 3
+
+import io, os, sys, time, tempfile, optparse
+from os import path
+
+BENCH = path.dirname(path.abspath(__file__))
+REPO = path.dirname(BENCH)
+
+def pieces_of(lines, scheme_name):      # the unicode pieces HtmlRenderer writes for a document
+    import corpus
+    from htmlprint import HtmlRenderer, document_lines, text_lines, load_scheme
+    text, tokens = corpus.make(lines)
+    renderer = HtmlRenderer(load_scheme(path.join(REPO, 'ColorSchemes', scheme_name)), u'corpus.py', True)
+    renderer.start_lines()
+    pieces = list(renderer.lines_html(0, document_lines(text_lines(text), iter(tokens))))
+    renderer.end_lines()
+    return pieces
+
+def per_piece(target, pieces):          # the old way
+    from htmlprint import UTF8
+    for piece in pieces:
+        target.write(piece.encode(*UTF8))
+
+def sunk(target, pieces):
+    from htmlprint import HtmlSink
+    the_html = HtmlSink(target)
+    for piece in pieces:
+        the_html.write(piece)
+    the_html.flush()
+
+def best_of(repeat, write, open_target, pieces):    # -> (seconds, bytes written) of the fastest run
+    best = None
+    for _ in range(repeat):
+        target = open_target()
+        started = time.time()
+        write(target, pieces)
+        target.flush()
+        seconds = time.time() - started
+        size = target.tell()
+        target.close()
+        best = seconds if best is None else min(best, seconds)
+    return (best, size)
+
+def main(argv = None):
+    parser = optparse.OptionParser(usage="%prog [options]")
+    parser.add_option("--lines", type="int", default=50000, help="lines in the synthetic document")
+    parser.add_option("--repeat", type="int", default=3, help="runs of each case (the fastest is shown)")
+    parser.add_option("--scheme", default="Print-Color.tmTheme", help="colour-scheme (in ColorSchemes/)")
+    options, args = parser.parse_args(argv)
+
+    sys.path[:0] = [BENCH, REPO]
+    pieces = pieces_of(options.lines, options.scheme)
+    handle, file_name = tempfile.mkstemp(suffix='.html')
+    os.close(handle)
+    targets = [('file', lambda: open(file_name, 'wb')), ('memory', io.BytesIO)]
+    sys.stdout.write("%d lines, %d pieces of %.0f chars on average\n" % (options.lines, len(pieces),
+        sum([len(piece) for piece in pieces]) / float(len(pieces))))
+    try:
+        for (name, open_target) in targets:
+            for (way, write) in (('per piece', per_piece), ('HtmlSink', sunk)):
+                seconds, size = best_of(options.repeat, write, open_target, pieces)
+                sys.stdout.write("%-7s %-10s %8.1f ms  %7.1f MB/s\n" % (name, way, seconds * 1e3,
+                    size / (seconds or 1e-9) / 1e6))
+    finally:
+        os.remove(file_name)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,266 @@
+# A stand-in for Sublime Text 2's 'sublime' module, enough of it to import PrintHtml.py and export a
+# view outside the editor. A View is backed by a pre-tokenized text - [(scope, begin, end), ..] in
+# order, covering it - and counts the API calls made on it (CALLS), as the cost of crossing into the
+# editor is what the plugin has to keep down.
+
+import bisect, re
+
+DRAW_OUTLINED = 256
+HIDDEN = 128
+LITERAL = 1
+ENCODED_POSITION = 1
+
+NEWLINE = re.compile(r'\n')
+
+CALLS = {}                              # API function -> calls made, since last cleared
+
+def called(name):
+    CALLS[name] = CALLS.get(name, 0) + 1
+
+PACKAGES = ['.']                        # (set by the benchmark) the Packages folder
+SETTINGS = {}
+MESSAGES = []                           # status messages, most recent last
+
+def platform():
+    return "linux"
+
+def packages_path():
+    return PACKAGES[0]
+
+def status_message(message):
+    MESSAGES.append(message)
+
+error_message = status_message
+
+def set_timeout(callback, delay):       # (the benchmark runs exports in the foreground - nothing waits)
+    callback()
+
+class Settings(dict):
+    def get(self, key, default = None):
+        return dict.get(self, key, default)
+
+    def set(self, key, value):
+        self[key] = value
+
+    def add_on_change(self, key, callback):
+        pass
+
+def load_settings(name):
+    return SETTINGS.setdefault(name, Settings())
+
+class Region(object):
+    def __init__(self, a, b):
+        self.a, self.b = (a, b)
+
+    def begin(self):
+        return min(self.a, self.b)
+
+    def end(self):
+        return max(self.a, self.b)
+
+    def size(self):
+        return abs(self.b - self.a)
+
+    def empty(self):
+        return self.a == self.b
+
+    def contains(self, x):
+        if isinstance(x, Region):
+            return self.begin() <= x.begin() and x.end() <= self.end()
+        return self.begin() <= x <= self.end()
+
+    def __eq__(self, other):
+        return isinstance(other, Region) and (self.a, self.b) == (other.a, other.b)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'Region(%d, %d)' % (self.a, self.b)
+
+class Selection(list):
+    def add(self, region):
+        self.append(region)
+
+    def clear(self):
+        del self[:]
+
+class View(object):
+    next_id = [1]
+
+    def __init__(self, text, tokens, file_name = None, bulk = False):
+        self.text = text
+        self.tokens = tokens
+        self.starts = [token[1] for token in tokens]
+        self.the_file_name = file_name
+        self.selection = Selection([Region(0, 0)])
+        self.regions = {}
+        self.changes = 0
+        self.line_starts = None
+        self.view_id = View.next_id[0]
+        View.next_id[0] += 1
+        if bulk:                        # offer the bulk scope API of later editors
+            self.extract_tokens_with_scopes = self.tokens_with_scopes
+
+    def id(self):
+        return self.view_id
+
+    def buffer_id(self):
+        return self.view_id
+
+    def change_count(self):
+        called('change_count')
+        return self.changes
+
+    def replace_text(self, begin, end, text):   # (for a benchmark to edit the view) the caret is left
+        self.text = self.text[:begin] + text + self.text[end:]      # after the new text - the tokens
+        self.changes += 1                                           # are not moved with it
+        if self.line_starts is not None:
+            starts, delta = (self.line_starts, len(text) - (end - begin))
+            i, j = (bisect.bisect_right(starts, begin), bisect.bisect_right(starts, end))
+            starts[i:] = [begin + m.end() for m in NEWLINE.finditer(text)] + [pt + delta for pt in starts[j:]]
+        self.selection[:] = [Region(begin + len(text), begin + len(text))]
+
+    def file_name(self):
+        return self.the_file_name
+
+    def size(self):
+        return len(self.text)
+
+    def sel(self):
+        return self.selection
+
+    def window(self):
+        return WINDOW
+
+    def settings(self):
+        return load_settings('Preferences.sublime-settings')
+
+    def substr(self, x):
+        called('substr')
+        if isinstance(x, Region):
+            return self.text[x.begin():x.end()]
+        return self.text[x:x + 1]
+
+    def token_at(self, pt):
+        return max(0, bisect.bisect_right(self.starts, pt) - 1)
+
+    def scope_name(self, pt):
+        called('scope_name')
+        return self.tokens[self.token_at(pt)][0] if self.tokens else 'text.plain '
+
+    def score_selector(self, pt, selector):     # as the editor scores it, near enough: the depth of the
+        called('score_selector')                # deepest atom matching a selector's last part
+        atoms = self.tokens[self.token_at(pt)][0].split() if self.tokens else []
+        best = 0
+        for part in selector.split(','):
+            part = part.split()
+            if not part:
+                continue
+            for (depth, atom) in enumerate(atoms):
+                if atom == part[-1] or atom.startswith(part[-1] + '.'):
+                    best = max(best, (depth + 1) * 8 + part[-1].count('.') + 1)
+        return best
+
+    def tokens_with_scopes(self, region):       # [(Region, scope), ..] over region
+        called('extract_tokens_with_scopes')
+        tokens, i = ([], self.token_at(region.begin()))
+        while i < len(self.tokens) and self.tokens[i][1] < region.end():
+            scope, begin, end = self.tokens[i]
+            tokens.append((Region(max(begin, region.begin()), min(end, region.end())), scope))
+            i += 1
+        return tokens
+
+    def rowcol(self, pt):
+        called('rowcol')
+        if self.line_starts is None:    # (as the editor, which keeps its lines indexed)
+            self.line_starts = [0] + [m.end() for m in NEWLINE.finditer(self.text)]
+        row = bisect.bisect_right(self.line_starts, pt) - 1
+        return (row, pt - self.line_starts[row])
+
+    def text_point(self, row, col):
+        called('text_point')
+        pt = 0
+        for _ in range(row):
+            pt = self.text.index('\n', pt) + 1
+        return pt + col
+
+    def line(self, x):
+        called('line')
+        pt = x.begin() if isinstance(x, Region) else x
+        end = self.text.find('\n', pt)
+        return Region(self.text.rfind('\n', 0, pt) + 1, len(self.text) if end < 0 else end)
+
+    def split_by_newlines(self, region):
+        called('split_by_newlines')
+        lines, begin = ([], region.begin())
+        while True:
+            end = self.text.find('\n', begin, region.end())
+            if end < 0:
+                lines.append(Region(begin, region.end()))
+                return lines
+            lines.append(Region(begin, end))
+            begin = end + 1
+
+    def lines(self, region):
+        called('lines')
+        return self.split_by_newlines(Region(self.line(region.begin()).begin(), self.line(region.end()).end()))
+
+    def word(self, x):
+        called('word')
+        pt = x.begin() if isinstance(x, Region) else x
+        begin = end = pt
+        while begin > 0 and (self.text[begin - 1].isalnum() or self.text[begin - 1] == '_'):
+            begin -= 1
+        while end < len(self.text) and (self.text[end].isalnum() or self.text[end] == '_'):
+            end += 1
+        return Region(begin, end)
+
+    def add_regions(self, key, regions, scope = '', icon = '', flags = 0):
+        called('add_regions')
+        self.regions[key] = list(regions)
+
+    def get_regions(self, key):
+        called('get_regions')
+        return list(self.regions.get(key, []))
+
+    def erase_regions(self, key):
+        called('erase_regions')
+        self.regions.pop(key, None)
+
+    def show(self, x):
+        pass
+
+    def run_command(self, name, args = None):
+        pass
+
+    def set_status(self, key, value):
+        pass
+
+    def erase_status(self, key):
+        pass
+
+class Window(object):
+    def __init__(self):
+        self.view = None
+        self.opened = []                # files the plugin opened in a tab
+
+    def active_view(self):
+        return self.view
+
+    def open_file(self, file_name, flags = 0):
+        self.opened.append(file_name)
+
+    def folders(self):
+        return []
+
+    def show_input_panel(self, caption, initial, on_done, on_change, on_cancel):
+        return View(u'', [])
+
+    def show_quick_panel(self, items, on_done):
+        pass
+
+WINDOW = Window()
+
+def active_window():
+    return WINDOW
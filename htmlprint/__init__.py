@@ -0,0 +1,13 @@
+# The rendering core of PrintHtml - everything needed to turn scoped text into an HTML document,
+# with no dependency on the editor (see cli.py for rendering files from the command line).
+
+from .scheme import ScopeColours, load_scheme, SCHEMES
+from .render import HtmlRenderer, HtmlSink, join_runs, document_lines, file_lines, text_lines, \
+    dt_stamp, entity_ref, UTF8
+from .comments import Comment, SortedComments, CommentAnchors
+from .store import CommentStore
+from .database import CommentDatabase
+from .cache import ExportCache, LineFragments
+from .timing import PhaseTimer
+from .lines import LineIndex
+from .pages import render_pages, page_name, page_files, PAGE_LINES
@@ -0,0 +1,42 @@
+# Fans render_file() out over a pool of processes. Each worker parses the colour-scheme once (in
+# its initializer) and every HTML file is written to a temporary name and then renamed into place,
+# so a reader never sees a half-written page.
+
+import time, multiprocessing
+from os import path
+from .scheme import load_scheme
+
+WORKER = {}                             # the worker's scheme and options, set by init_worker()
+
+def init_worker(scheme_path, options):
+    WORKER['scheme'] = load_scheme(scheme_path)
+    WORKER['options'] = options
+
+def export_one(job):                    # (src, dst) -> (src, seconds, source bytes, error or None)
+    from .cli import render_file
+    src, dst = job
+    started = time.time()
+    try:
+        render_file(src, dst, WORKER['scheme'], WORKER['options'])
+    except (IOError, OSError) as e:
+        return (src, time.time() - started, 0, str(e))
+    except Exception as e:              # (an unknown encoding, a lexer's bug, ..) - only this file fails
+        return (src, time.time() - started, 0, '%s: %s' % (e.__class__.__name__, e))
+    return (src, time.time() - started, path.getsize(src), None)
+
+def export_files(jobs, scheme_path, options, processes = 1):    # yields export_one() results, in
+    if processes == 1:                                          # completion order
+        init_worker(scheme_path, options)
+        for job in jobs:
+            yield export_one(job)
+        return
+    pool = multiprocessing.Pool(processes or None, init_worker, (scheme_path, options))
+    try:
+        for result in pool.imap_unordered(export_one, jobs, 4):
+            yield result
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
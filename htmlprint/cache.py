@@ -0,0 +1,81 @@
+# Remembers the HTML files written for recent exports, by everything that went into them (the caller's
+# key), so that an export of something unchanged can re-use its file. Files are removed as they are
+# evicted - the least recently used first, once there are too many of them or they take too much room.
+#
+# LineFragments does the same for the lines of a document, so that exporting it again after an edit
+# renders only the lines whose text, scopes or comments changed.
+
+import os
+from os import path
+
+class ExportCache(object):
+    def __init__(self, max_files = 8, max_bytes = 64 * 1024 * 1024):
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.entries = []           # [(key, file name, size, also), ..] the most recently used last
+
+    def find(self, key):            # -> the entry's index, or -1
+        for i, entry in enumerate(self.entries):
+            if entry[0] == key:
+                return i
+        return -1
+
+    def get(self, key):             # -> the file made for key (if it's still there), or None
+        i = self.find(key)
+        if i < 0:
+            return None
+        entry = self.entries.pop(i)
+        if not path.exists(entry[1]):
+            return None             # deleted from under us - forgotten
+        self.entries.append(entry)
+        return entry[1]
+
+    def add(self, key, file_name, also = ()):  # also: the files that go with it (as its pages)
+        i = self.find(key)
+        if i >= 0:
+            self.remove(self.entries.pop(i), file_name)
+        try:
+            size = sum([path.getsize(name) for name in [file_name] + list(also)])
+        except OSError:
+            return
+        self.entries.append((key, file_name, size, tuple(also)))
+        while len(self.entries) > 1 and (len(self.entries) > self.max_files or
+                sum([entry[2] for entry in self.entries]) > self.max_bytes):
+            self.remove(self.entries.pop(0))
+
+    def remove(self, entry, keep = None):
+        if entry[1] != keep:
+            for name in (entry[1],) + entry[3]:
+                try:
+                    os.remove(name)
+                except OSError:
+                    pass            # already gone, or still open (on Windows) - left in the temp dir
+
+    def clear(self):
+        for entry in self.entries:
+            self.remove(entry)
+        self.entries = []
+
+class LineFragments(object):        # the HTML of each line of a document's last render (see HtmlRenderer)
+    def __init__(self):
+        self.settings = None        # what the HTML also depends on - the colours, etc. - as last given
+        self.last = {}              # (text, runs, comments) -> (html, [(comment, stamp), ..]) from the last
+        self.current = {}           # render, and those of the render under way
+        self.hits = 0               # lines re-used by the render under way (or just finished)
+
+    def begin(self, settings):
+        if settings != self.settings:
+            self.settings, self.last = (settings, {})
+        self.current, self.hits = ({}, 0)
+
+    def get(self, key):
+        fragment = self.last.get(key, None) or self.current.get(key, None)
+        if fragment is not None:
+            self.hits += 1
+        return fragment
+
+    def keep(self, key, fragment):
+        self.current[key] = fragment
+
+    def end(self):                  # only the lines of this render are kept, for the next
+        self.last, self.current = (self.current, {})
@@ -0,0 +1,146 @@
+# Render source files to PrintHtml-styled HTML without the editor:
+#
+#   python -m htmlprint.cli -s Print-Color.tmTheme -o html_out src/ README.md
+#
+# Directories are walked (skipping hidden ones, and binary files); each file is written to the output
+# directory, at its path from the directory that holds all of the sources, with '.html' added (two
+# sources that would be written to the same file are refused).  Use -j to render on several processes
+# (a single file is rendered with its lines shared among them), and -p to split files of many lines
+# into pages.
+
+import io, os, sys, time, optparse, itertools
+from os import path
+from .render import HtmlRenderer, HtmlSink, document_lines, file_lines, text_lines
+from .lexers import find_lexer, scoped_tokens
+from .batch import export_files
+from .files import write_atomically
+from .pages import render_pages, remove_pages
+
+BINARY_CHECK = 8192                     # bytes read to tell a binary file (one with a NUL in them)
+
+def is_binary(file_name):
+    try:
+        with open(file_name, 'rb') as the_file:
+            return b'\0' in the_file.read(BINARY_CHECK)
+    except (IOError, OSError):
+        return False                    # (its render will report why it can't be read)
+
+def common_dir(dir_names):              # the deepest directory holding all of the directories
+    common = None
+    for dir_name in dir_names:
+        parts = path.abspath(dir_name).split(os.sep)
+        if common is None:
+            common = parts
+        while parts[:len(common)] != common:
+            common = common[:-1]
+    return os.sep.join(common) or os.sep
+
+def relative_name(file_name, root):     # file_name relative to root (or, on another drive, its name)
+    try:
+        return path.relpath(path.abspath(file_name), root)
+    except ValueError:
+        return path.basename(file_name)
+
+def source_files(sources, skip_binary = True):  # (source path, its path from the directory holding all
+    root = common_dir([source if path.isdir(source) else path.dirname(source)   # the sources) for each
+        for source in sources])                                                 # file - an IOError if
+    named = {}                                  # two would have the same name (and so the same HTML file)
+    for (src, rel) in walked_files(sources, skip_binary, root):
+        key = path.normcase(rel).lower()    # (as a file system that ignores case would see it)
+        if key in named and path.abspath(named[key]) != path.abspath(src):
+            raise IOError('%s and %s would both be printed as %s' % (named[key], src, rel))
+        elif key not in named:
+            named[key] = src
+            yield (src, rel)
+
+def walked_files(sources, skip_binary, root):   # (source path, relative name) for each file, in order
+    for source in sources:
+        if not path.isdir(source):
+            if not (skip_binary and is_binary(source)):
+                yield (source, relative_name(source, root))
+            continue
+        for (dir_path, dir_names, file_names) in os.walk(source):
+            dir_names[:] = sorted(d for d in dir_names if not d.startswith('.'))
+            for file_name in sorted(file_names):
+                src = path.join(dir_path, file_name)
+                if not file_name.startswith('.') and not (skip_binary and is_binary(src)):
+                    yield (src, relative_name(src, root))
+
+def render_file(src, dst, scheme, options):     # streams the source through to the HTML file, only
+    renderer = HtmlRenderer(scheme, src, options.numbers, options.font_size, options.font_face,
+        options.tab_size, options.padd_top, options.padd_bottom, css_classes=options.css_classes,
+        processes=getattr(options, 'line_jobs', 1))
+    lexer = find_lexer(src)         # reading it all when it is to be lexed (pygments needs the text)
+    with io.open(src, 'r', encoding=options.encoding, errors='replace', newline=None) as src_file:
+        if lexer is None:
+            lines = document_lines(file_lines(src_file))
+        else:
+            text = src_file.read()
+            lines = document_lines(text_lines(text), scoped_tokens(text, lexer))
+
+        page_lines = getattr(options, 'page_lines', 0)
+        if page_lines:
+            head = list(itertools.islice(lines, page_lines + 1))
+            if len(head) > page_lines:      # dst is the index, and the pages are written beside it
+                render_pages(renderer, itertools.chain(head, lines), dst, page_lines, write_atomically)
+                return
+            lines = head
+            remove_pages(dst)               # (of an earlier, longer, version)
+
+        def write(html_file):
+            the_html = HtmlSink(html_file)
+            renderer.render(the_html, lines)
+            the_html.flush()
+        write_atomically(dst, write)
+
+def option_parser():
+    parser = optparse.OptionParser(usage="%prog -s SCHEME [options] SOURCE..")
+    parser.add_option("-s", "--scheme", help="the .tmTheme colour-scheme to use")
+    parser.add_option("-o", "--output", default=".", help="directory for the HTML files (default: .)")
+    parser.add_option("-n", "--numbers", action="store_true", default=False, help="show line numbers")
+    parser.add_option("-c", "--css-classes", action="store_true", default=False,
+        help="colour with one CSS class per colour rather than inline styles")
+    parser.add_option("-j", "--jobs", type="int", default=1,
+        help="number of processes to render with, 0 for one per CPU (default: 1)")
+    parser.add_option("-p", "--page-lines", type="int", default=0,
+        help="split files of more lines than this into pages of this many, with an index (default: 0, don't)")
+    parser.add_option("-v", "--verbose", action="store_true", default=False, help="report each file's timing")
+    parser.add_option("--encoding", default="utf-8", help="encoding of the source files (default: utf-8)")
+    parser.add_option("--font-size", type="int", default=10)
+    parser.add_option("--font-face", default="Consolas")
+    parser.add_option("--tab-size", type="int", default=4)
+    parser.add_option("--padding-top", dest="padd_top", type="int", default=0)
+    parser.add_option("--padding-bottom", dest="padd_bottom", type="int", default=0)
+    return parser
+
+def main(argv = None):
+    parser = option_parser()
+    options, sources = parser.parse_args(argv)
+    if not options.scheme or not sources:
+        parser.error("a colour-scheme and at least one source are required")
+    encoding = options.encoding.lower().replace('-', '').replace('_', '')
+    skip_binary = encoding[:5] not in ('utf16', 'utf32')       # (whose every text has NULs)
+    try:
+        jobs = [(src, path.join(options.output, rel + '.html')) for (src, rel) in source_files(sources, skip_binary)]
+    except IOError as e:
+        parser.error(str(e))
+    options.line_jobs = options.jobs if len(jobs) == 1 else 1
+    started = time.time()
+    printed = failed = total_bytes = 0
+    for (src, seconds, size, error) in export_files(jobs, path.abspath(options.scheme), options,
+            options.jobs if len(jobs) > 1 else 1):
+        if error is not None:
+            sys.stderr.write("Could not print %s: %s\n" % (src, error))
+            failed += 1
+            continue
+        printed += 1
+        total_bytes += size
+        if options.verbose:
+            sys.stdout.write("%8.3fs %10d  %s\n" % (seconds, size, src))
+    elapsed = max(time.time() - started, 1e-6)
+    sys.stdout.write("%d file(s) printed, %d failed, %.1f MB in %.2fs (%.2f MB/s, %.1f files/s)\n"
+        % (printed, failed, total_bytes / 1e6, elapsed, total_bytes / 1e6 / elapsed, printed / elapsed))
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
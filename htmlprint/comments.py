@@ -0,0 +1,233 @@
+import bisect, time, itertools
+from .render import dt_stamp
+try:
+    from itertools import izip as zip   # (Python 2)
+except ImportError:
+    pass
+
+CHANGES = itertools.count(1)        # numbers the changes made to any SortedComments (see version)
+
+class Comment(object):              # a comment on the word at a comment-point, and the line it was on;
+    __slots__ = ('word', 'comment', 'line', 'stamp')    # stamp is when it was made or moved (seconds
+                                                        # since the epoch), formatted only to be shown
+    def __init__(self, word, comment, line, stamp = None):
+        self.word = word
+        self.comment = comment
+        self.line = line
+        self.stamp = int(time.time()) if stamp is None else stamp
+
+    def __reduce__(self):
+        return (Comment, (self.word, self.comment, self.line, self.stamp))
+
+    def __eq__(self, other):
+        return isinstance(other, Comment) and (self.word, self.comment, self.line, self.stamp) == \
+            (other.word, other.comment, other.line, other.stamp)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'Comment(%r, %r, %d, %d)' % (self.word, self.comment, self.line, self.stamp)
+
+    def at_line(self, line):        # the same comment, on another line (as edits move it)
+        return Comment(self.word, self.comment, line, self.stamp)
+
+    def shown_stamp(self):
+        return dt_stamp(self.stamp)
+
+class SortedComments(dict):         # a view's comments, {pt: Comment, ..}, that also
+    def __init__(self, *args, **kwargs):        # keeps its points in order, for bisect-based queries
+        dict.__init__(self, *args, **kwargs)
+        self.points = sorted(dict.keys(self))   # read-only for callers - copy it to delete while looping
+        self.words = {}                         # the commented words, each held once however many of
+        for value in dict.values(self):         # these comments share it (and let go with them)
+            self.share_word(value)
+        self.source = getattr(args[0], 'source', None) if args else None
+        # (comments attached from a store are held as their entry's index until used - see attach)
+        self.version = next(CHANGES)            # differs after any change - from any other's, too
+
+    def __reduce__(self):                       # pickle (and copy) as the plain dictionary would
+        return (SortedComments, (dict(self.items()),))
+
+    def attach(self, points, source):           # (to an empty SortedComments) the sorted points of a
+        dict.update(self, zip(points, range(len(points))))   # store's entries, decoded when first used
+        self.points = points                    # (an array.array serves as well as a list)
+        self.source = source
+        self.version = next(CHANGES)
+
+    def share_word(self, value):
+        if isinstance(value, Comment):
+            value.word = self.words.setdefault(value.word, value.word)
+
+    def decoded(self, value):
+        return self.source.entry(value) if isinstance(value, int) else value
+
+    def __getitem__(self, pt):
+        value = dict.__getitem__(self, pt)
+        if isinstance(value, int):
+            value = self.source.entry(value)
+            dict.__setitem__(self, pt, value)
+        return value
+
+    def get(self, pt, default = None):
+        return self[pt] if pt in self else default
+
+    def items(self):
+        return [(pt, self[pt]) for pt in self.points]
+
+    def values(self):
+        return [self[pt] for pt in self.points]
+
+    def __eq__(self, other):
+        return isinstance(other, dict) and dict(self.items()) == dict(other.items())
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __setitem__(self, pt, value):
+        self.share_word(value)
+        if pt not in self:
+            bisect.insort(self.points, pt)
+        dict.__setitem__(self, pt, value)
+        self.version = next(CHANGES)
+
+    def __delitem__(self, pt):
+        dict.__delitem__(self, pt)
+        del self.points[bisect.bisect_left(self.points, pt)]
+        self.version = next(CHANGES)
+
+    def pop(self, pt, *default):
+        if pt in self:
+            value = self[pt]
+            del self[pt]
+            return value
+        return dict.pop(self, pt, *default)
+
+    def popitem(self):
+        pt, value = dict.popitem(self)
+        del self.points[bisect.bisect_left(self.points, pt)]
+        self.version = next(CHANGES)
+        return (pt, self.decoded(value))
+
+    def setdefault(self, pt, value = None):
+        if pt not in self:
+            self[pt] = value
+        return self[pt]
+
+    def update(self, other = (), **kwargs):
+        if hasattr(other, 'items'):
+            other = other.items()
+        for (pt, value) in list(other) + list(kwargs.items()):
+            self[pt] = value
+
+    def clear(self):
+        dict.clear(self)
+        self.points = []
+        self.words = {}
+        self.version = next(CHANGES)
+
+    def copy(self):
+        return SortedComments(self)
+
+    def next_point(self, pt):               # the first comment-point after pt, or None
+        i = bisect.bisect_right(self.points, pt)
+        return self.points[i] if i < len(self.points) else None
+
+    def prev_point(self, pt):               # the last comment-point before pt, or None
+        i = bisect.bisect_left(self.points, pt)
+        return self.points[i - 1] if i > 0 else None
+
+    def points_between(self, begin, end):   # [pt, ..] for begin <= pt <= end
+        return self.points[bisect.bisect_left(self.points, begin):bisect.bisect_right(self.points, end)]
+
+    def nth_point(self, index):             # the index-th comment-point, in order, or None
+        return self.points[index] if 0 <= index < len(self.points) else None
+
+    def shift(self, pos, delta, rows = 0, row = None):  # follow an insertion of delta characters at pos (or
+        touched = []                        # deletion of -delta, from row: pos's row), moving later points
+        i = bisect.bisect_left(self.points, pos)    # and lines; returns the points of comments whose word
+        if i > 0 and pos <= self.points[i - 1] + len(self[self.points[i - 1]].word):    # the edit fell
+            touched.append(self.points[i - 1])                                          # within
+        moved = [(pt, dict.pop(self, pt)) for pt in self.points[i:]]    # all out first, as they may
+        del self.points[i:]                                             # move onto each other's points
+        self.version = next(CHANGES)
+        for (pt, value) in moved:
+            deleted = pt < pos - delta      # (the comment's word was deleted)
+            new_pt = max(pos, pt + delta)   # comments on deleted text collapse to pos - and are then
+            if self.points and new_pt <= self.points[-1]:   # nudged along, one point apiece, rather than
+                new_pt = self.points[-1] + 1                # lost: RECOVER can re-anchor them
+                touched.append(new_pt)
+            elif pt == pos or deleted:
+                touched.append(new_pt)
+            if rows or deleted:
+                value = self.decoded(value)
+                line = row if deleted and row is not None else value.line + rows
+                value = value.at_line(max(0, line))     # (the line of a deleted word is pos's)
+            dict.__setitem__(self, new_pt, value)
+            self.points.append(new_pt)
+        return touched
+
+def edit_at(caret, cursor, delta, rows):    # -> (pos, row) where an edit of delta characters (and rows rows)
+    if caret is None or cursor is None:     # was made, if the caret before and after it - (pt, row, col) -
+        return None                         # shows it was typed, or deleted back, on the caret's line, or
+    (before, row, col), (after, new_row, new_col) = (caret, cursor)     # was a new line (with its indent)
+    typed = ((rows == 0 and new_row == row and new_col - col == delta) or   # or a line joined to the one
+        (rows == 1 and new_row == row + 1 and new_col == delta - 1) or      # before; None if it may have
+        (rows == -1 and delta == -1 and new_row == row - 1 and col == 0))   # been made anywhere else
+    if after - before != delta or not typed:
+        return None                         # (another plugin's, trimmed whitespace, an auto-paired bracket, ..)
+    return (min(before, after), min(row, new_row))
+
+class CommentAnchors(object):       # follows the edits made to a view, so that its comment-points move with
+    limit = 32                      # the text: edits are noted (cheaply) as they are made and applied to the
+                                    # comments, in one pass, when they are next needed
+    def __init__(self, comments, size, rows):
+        self.comments = comments
+        self.size = size            # the view's size and last row, as of the last edit
+        self.rows = rows
+        self.shifts = []            # [[pos, delta, rows, row], ..] edits not yet applied to the comments
+        self.touched = set()        # comment-points an edit fell within (their word may have changed)
+        self.lost = True            # an edit couldn't be followed, all comments need re-anchoring
+        self.caret = None           # (pt, row, col) of the (single, empty) selection, or None
+
+    def moved(self, caret):         # the selection has changed
+        self.caret = caret
+
+    def modified(self, size, rows, cursor):     # cursor: the caret after the edit (see moved) - an edit is
+        delta, row_delta = (size - self.size, rows - self.rows)     # followed only if it can only have
+        self.size, self.rows = (size, rows)                         # been made at the caret
+        caret, self.caret = (self.caret, cursor)
+        if delta == 0:
+            return                  # same-sized replacement - words are checked when comments are used
+        edit = edit_at(caret, cursor, delta, row_delta)
+        if edit is None:
+            self.lost = True
+            return
+        pos, row = edit             # (inserted before, or deleted back from, the cursor - row: pos's)
+        if self.shifts:
+            last = self.shifts[-1]
+            if delta > 0 and last[1] > 0 and pos == last[0] + last[1]:             # typing on
+                last[1] += delta; last[2] += row_delta
+                return
+            if delta < 0 and last[1] < 0 and pos - delta == last[0]:               # deleting backwards
+                last[0] = pos; last[1] += delta; last[2] += row_delta; last[3] = row
+                return
+            if delta < 0 and last[1] > 0 and last[0] <= pos and pos - delta == last[0] + last[1]:
+                last[1] += delta; last[2] += row_delta              # deleting what was just typed
+                return
+        self.shifts.append([pos, delta, row_delta, row])
+        if len(self.shifts) >= self.limit:
+            self.settle()
+
+    def settle(self):               # apply the noted edits to the comments
+        for (pos, delta, rows, row) in self.shifts:
+            self.touched = set(max(pos, pt + delta) if pt >= pos else pt for pt in self.touched)
+            self.touched.update(self.comments.shift(pos, delta, rows, row))
+        self.shifts = []
+
+    def take_touched(self):         # the comment-points to re-anchor, or None for all of them
+        self.settle()
+        touched = None if self.lost else sorted(self.touched)
+        self.touched = set()
+        self.lost = False
+        return touched
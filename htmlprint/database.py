@@ -0,0 +1,136 @@
+# The comments of every file that has saved them, gathered in one (SQLite) database so that they can
+# be searched across a project. Each file's rows are replaced whenever its comments are saved (or
+# loaded, if its .cmts file has changed since); the .cmts files remain the comments' only real copy,
+# so the database can be deleted at any time. Comment text (and the commented word) is searched with
+# SQLite's full-text index where it has one, otherwise with LIKE.
+
+import re
+try:
+    import sqlite3
+except ImportError:                 # optional - ST2's Python doesn't always include it (see the
+    sqlite3 = None                  # 'linux_python2.6_lib' setting)
+from .comments import Comment
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, saved TEXT)",
+    "CREATE TABLE IF NOT EXISTS comments (id INTEGER PRIMARY KEY, file INTEGER NOT NULL, "
+        "pt INTEGER NOT NULL, word TEXT, comment TEXT, line INTEGER, stamp INTEGER)",
+    "CREATE INDEX IF NOT EXISTS comments_file ON comments (file, line)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS comments_point ON comments (file, pt)",
+    "CREATE INDEX IF NOT EXISTS comments_word ON comments (word)",
+    "CREATE INDEX IF NOT EXISTS comments_stamp ON comments (stamp)"
+]
+FTS_SCHEMA = [                      # (with %s the fts module) - the text index follows the comments table
+    "CREATE VIRTUAL TABLE IF NOT EXISTS comments_text USING %s (word, comment)",
+    "CREATE TRIGGER IF NOT EXISTS comments_added AFTER INSERT ON comments BEGIN "
+        "INSERT INTO comments_text (docid, word, comment) VALUES (new.id, new.word, new.comment); END",
+    "CREATE TRIGGER IF NOT EXISTS comments_removed AFTER DELETE ON comments BEGIN "
+        "DELETE FROM comments_text WHERE docid = old.id; END"
+]
+FTS_MODULES = ('fts4', 'fts3')      # the full-text modules to use, the first that SQLite has
+SEARCH_LIMIT = 1000                 # rows a search returns, at most
+TERM = re.compile(r'\w+', re.UNICODE)
+
+class CommentDatabase(object):      # (path ':memory:' for one that isn't kept)
+    def __init__(self, path):       # (raises IOError if it can't be opened, or SQLite isn't available)
+        if sqlite3 is None:
+            raise IOError('SQLite is not available.')
+        self.path = path
+        self.fts = None             # the full-text module in use, or None (searched with LIKE)
+        try:
+            self.db = sqlite3.connect(path, timeout = 5)
+            self.db.execute("PRAGMA synchronous = OFF")     # no waiting on the disk: an update that's
+                                                            # lost is re-made when the file is next loaded
+            with self.db:
+                for statement in SCHEMA:
+                    self.db.execute(statement)
+                for module in FTS_MODULES:
+                    try:
+                        for statement in FTS_SCHEMA:
+                            self.db.execute(statement % module if '%s' in statement else statement)
+                    except sqlite3.OperationalError:
+                        continue    # not compiled in - try the next
+                    self.fts = module
+                    break
+        except sqlite3.Error as e:
+            raise IOError('Comments database %s: %s' % (path, e))
+
+    def close(self):
+        self.db.close()
+
+    def saved_as(self, file_name):  # what update_file() was last given as saved, or None
+        try:
+            row = self.db.execute("SELECT saved FROM files WHERE path = ?", (file_name,)).fetchone()
+        except sqlite3.Error as e:
+            raise IOError('Comments database: %s' % e)
+        return row[0] if row else None
+
+    def file_id(self, file_name, saved):
+        self.db.execute("INSERT OR IGNORE INTO files (path) VALUES (?)", (file_name,))
+        file_id = self.db.execute("SELECT id FROM files WHERE path = ?", (file_name,)).fetchone()[0]
+        self.db.execute("UPDATE files SET saved = ? WHERE id = ?", (saved, file_id))
+        return file_id
+
+    def update_file(self, file_name, comments, saved = None):   # replaces all of the file's comments
+        if hasattr(comments, 'items'):                          # (a dictionary, or [(pt, Comment), ..])
+            comments = comments.items()
+        rows = [(pt, c.word, c.comment, c.line, c.stamp) for pt, c in comments]
+        try:                        # saved: a note of the .cmts file (e.g. its size and mtime)
+            with self.db:
+                file_id = self.file_id(file_name, saved)
+                self.db.execute("DELETE FROM comments WHERE file = ?", (file_id,))
+                self.db.executemany("INSERT INTO comments (file, pt, word, comment, line, stamp) "
+                    "VALUES (%d, ?, ?, ?, ?, ?)" % file_id, rows)
+        except sqlite3.Error as e:
+            raise IOError('Comments database: %s' % e)
+        return len(rows)
+
+    def update_points(self, file_name, changes, saved = None):  # changes: [(pt, Comment or None
+        try:                                                    # to remove it), ..]
+            with self.db:
+                file_id = self.file_id(file_name, saved)
+                self.db.executemany("DELETE FROM comments WHERE file = %d AND pt = ?" % file_id,
+                    [(pt,) for (pt, c) in changes])
+                self.db.executemany("INSERT INTO comments (file, pt, word, comment, line, stamp) "
+                    "VALUES (%d, ?, ?, ?, ?, ?)" % file_id,
+                    [(pt, c.word, c.comment, c.line, c.stamp) for (pt, c) in changes if c is not None])
+        except sqlite3.Error as e:
+            raise IOError('Comments database: %s' % e)
+        return len(changes)
+
+    def search(self, text, folders = None, limit = SEARCH_LIMIT):
+        # -> [(file name, pt, Comment), ..] ordered by file and line. text: words that the comment
+        # (or its word) has, or starts with; '=name' for comments on the word name; '' for all of
+        # them, the most recent first. folders: only the files within these
+        text = text.strip()
+        where, args = ([], [])
+        if text.startswith('='):
+            where.append("c.word = ?")
+            args.append(text[1:].strip())
+        elif text and self.fts:
+            terms = TERM.findall(text)      # (each quoted - 'OR', say, would be an operator)
+            if terms:
+                where.append("c.id IN (SELECT docid FROM comments_text WHERE comments_text MATCH ?)")
+                args.append(' '.join(['"%s*"' % term for term in terms]))
+        elif text:
+            for term in text.split():
+                where.append("(c.comment LIKE ? ESCAPE '\\' OR c.word LIKE ? ESCAPE '\\')")
+                term = '%' + re.sub(r'([%_\\])', r'\\\1', term) + '%'
+                args.extend([term, term])
+        if folders:
+            within = []
+            for folder in folders:
+                folder = folder.rstrip('/\\')
+                within.append("substr(path, 1, ?) IN (?, ?)")
+                args.extend([len(folder) + 1, folder + '/', folder + '\\'])
+            where.append("c.file IN (SELECT id FROM files WHERE %s)" % ' OR '.join(within))
+        order = "f.path, c.line, c.pt" if text else "c.stamp DESC"
+        query = "SELECT f.path, c.pt, c.word, c.comment, c.line, c.stamp " \
+            "FROM comments c JOIN files f ON f.id = c.file %s ORDER BY %s LIMIT %d" \
+            % ("WHERE " + ' AND '.join(where) if where else "", order, limit)
+        try:
+            rows = self.db.execute(query, args).fetchall()
+        except sqlite3.Error as e:
+            raise IOError('Comments database: %s' % e)
+        return [(file_name, pt, Comment(word, comment, line, stamp))
+            for (file_name, pt, word, comment, line, stamp) in rows]
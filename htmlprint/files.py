@@ -0,0 +1,35 @@
+# Writing files so that a reader never sees one half-written: the new contents go to a temporary
+# file beside the old one, which is then renamed over it.
+
+import os, sys, tempfile
+from os import path
+
+UMASK = os.umask(0o022)                 # read (and restored) once, for the permissions of new files
+os.umask(UMASK)
+
+def replace_file(src, dst):             # rename, replacing dst (atomic where the OS allows it)
+    if hasattr(os, 'replace'):
+        os.replace(src, dst)
+    else:
+        if sys.platform == 'win32' and path.exists(dst):
+            os.remove(dst)              # Python 2 on Windows won't rename over an existing file
+        os.rename(src, dst)
+
+def write_atomically(dst, write):       # write(the_file) into a temporary file beside dst
+    dst_dir = path.dirname(dst) or '.'
+    if not path.isdir(dst_dir):
+        try:
+            os.makedirs(dst_dir)
+        except OSError:
+            if not path.isdir(dst_dir):     # another worker may have just made it
+                raise
+    the_file = tempfile.NamedTemporaryFile(dir=dst_dir, prefix='.' + path.basename(dst),
+        suffix='.tmp', delete=False)
+    try:
+        with the_file:
+            write(the_file)
+        os.chmod(the_file.name, 0o666 & ~UMASK)     # temporary files are created private (0600)
+        replace_file(the_file.name, dst)
+    except Exception:
+        os.remove(the_file.name)
+        raise
@@ -0,0 +1,55 @@
+try:
+    from pygments.lexers import get_lexer_for_filename
+    from pygments.util import ClassNotFound
+except ImportError:                 # optional - without pygments files are printed as plain text
+    get_lexer_for_filename = None
+
+TOKEN_SCOPES = {                    # pygments token type -> the nearest colour-scheme scope
+    'Token.Comment': 'comment',
+    'Token.Comment.Preproc': 'meta.preprocessor',
+    'Token.Keyword': 'keyword',
+    'Token.Keyword.Constant': 'constant.language',
+    'Token.Keyword.Declaration': 'storage',
+    'Token.Keyword.Type': 'storage.type',
+    'Token.Operator': 'keyword.operator',
+    'Token.Operator.Word': 'keyword.operator',
+    'Token.Literal.String': 'string.quoted',
+    'Token.Literal.String.Escape': 'constant.character.escape',
+    'Token.Literal.String.Interpol': 'constant.other.placeholder',
+    'Token.Literal.Number': 'constant.numeric',
+    'Token.Name.Builtin': 'support.function',
+    'Token.Name.Builtin.Pseudo': 'variable.language',
+    'Token.Name.Class': 'entity.name.class',
+    'Token.Name.Constant': 'constant.other',
+    'Token.Name.Decorator': 'entity.name.function.decorator',
+    'Token.Name.Exception': 'support.type.exception',
+    'Token.Name.Function': 'entity.name.function',
+    'Token.Name.Tag': 'entity.name.tag',
+    'Token.Name.Attribute': 'entity.other.attribute-name',
+    'Token.Name.Variable': 'variable',
+    'Token.Generic.Deleted': 'markup.deleted',
+    'Token.Generic.Inserted': 'markup.inserted',
+    'Token.Generic.Heading': 'markup.heading',
+    'Token.Error': 'invalid',
+}
+
+def token_scope(ttype):
+    while ttype is not None:
+        if str(ttype) in TOKEN_SCOPES:
+            return TOKEN_SCOPES[str(ttype)]
+        ttype = ttype.parent
+    return None
+
+def find_lexer(file_name):          # a pygments lexer for the file, or None (print it as plain text)
+    if get_lexer_for_filename is None:
+        return None
+    try:
+        return get_lexer_for_filename(file_name, stripnl=False, ensurenl=False)
+    except ClassNotFound:
+        return None
+
+def scoped_tokens(text, lexer):     # (scope, begin, end) for each token of the text, as it is lexed
+    base = 'source.%s' % (lexer.aliases[0] if lexer.aliases else lexer.name.lower())
+    for (begin, ttype, value) in lexer.get_tokens_unprocessed(text):
+        scope = token_scope(ttype)
+        yield ('%s %s ' % (base, scope) if scope else base + ' ', begin, begin + len(value))
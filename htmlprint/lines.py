@@ -0,0 +1,28 @@
+# The line offsets of a text, indexed once: a point becomes (row, col) by a bisect, and a row becomes
+# a point by a lookup - rather than asking the editor (or counting newlines) each time.
+
+import bisect, re
+
+NEWLINE = re.compile(r'\n')
+
+class LineIndex(object):
+    def __init__(self, text):
+        self.size = len(text)
+        self.starts = [0] + [m.end() for m in NEWLINE.finditer(text)]     # each line's begin-point
+
+    def __len__(self):              # the number of lines
+        return len(self.starts)
+
+    def row(self, pt):
+        return bisect.bisect_right(self.starts, pt) - 1
+
+    def rowcol(self, pt):           # as view.rowcol()
+        row = bisect.bisect_right(self.starts, pt) - 1
+        return (row, pt - self.starts[row])
+
+    def text_point(self, row, col = 0):     # as view.text_point() - rows past the end are the last row
+        return self.starts[max(0, min(row, len(self.starts) - 1))] + col
+
+    def line_end(self, pt):         # the end of pt's line (before its newline)
+        row = bisect.bisect_right(self.starts, pt)
+        return self.starts[row] - 1 if row < len(self.starts) else self.size
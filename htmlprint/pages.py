@@ -0,0 +1,157 @@
+# Splits a document into pages of so many lines - a browser is slow to open (and to scroll) one list
+# of hundreds of thousands of lines. NAME.html is then an index, of each page's lines and of every
+# comment, linking to its page and line (NAME-2.html#L5123); NAME-1.html, NAME-2.html, .. are the
+# pages, each a document of its own with links to the previous and next pages and a table of its own
+# comments. The lines are read in one pass, each page written as its lines come - the index last.
+
+import os, itertools
+from os import path
+from .render import HtmlSink, HEADER, dt_stamp
+
+try:
+    from urllib import quote
+except ImportError:
+    from urllib.parse import quote
+
+PAGE_LINES = 5000                       # (the default)
+
+INDEX_STYLE = \
+"""
+    <style type="text/css">
+    body { color: %(fcolor)s; background-color: %(bcolor)s; font: %(fsize)dpt '%(fface)s', Consolas, Monospace; }
+    table { border-collapse: collapse; margin-top: 1em; font-family: Calibri, Tahoma, Geneva, sans-serif; }
+    th, td { border: thin solid; padding: 3px 8px; }
+    td.nos { text-align: right; }
+    td.stamps { text-align: center; font-size: smaller; }
+    td.cmts { min-width: 400px; max-width: 600px; }
+    #tblComments { color: #000000; background-color: lightyellow; }
+    </style>
+</head>
+"""
+
+INDEX_PAGESHEAD = \
+"""
+<table id="tblPages">
+    <tr><th>Page</th><th>Lines</th></tr>
+"""
+INDEX_PAGEROW = \
+"""    <tr><td class="nos"><a href="%(href)s">%(number)d</a></td><td>%(first)d - %(last)d</td></tr>
+"""
+INDEX_COMMENTSHEAD = \
+"""</table>
+<table id="tblComments">
+    <tr><th>Line</th><th>dd/mm</th><th>The Comment</th></tr>
+"""
+INDEX_COMMENTROW = \
+"""    <tr><td class="nos"><a href="%(href)s#L%(line_no)d">%(line_no)d</a></td>
+    <td class="stamps">%(stamp)s</td><td class="cmts">%(comment)s</td></tr>
+"""
+
+GOTO_HASH = \
+"""<script type="text/javascript">
+    (function () {      // scroll to the line in the address (#L5123), as gotoLine() does
+        var found = /^#L(\\d+)$/.exec(window.location.hash), code_lines, line_no;
+        if (found) {
+            code_lines = document.getElementById('olCode').getElementsByTagName('li');
+            line_no = found[1] - %(first)d;
+            line_no = (line_no - 4) * (line_no - 4 > 0);
+            if (code_lines[line_no])
+                code_lines[line_no].scrollIntoView();
+        }
+    })();
+</script>
+"""
+
+def page_name(index_name, number):      # the file of page number (from 1) of the index_name document
+    root, ext = path.splitext(index_name)
+    return '%s-%d%s' % (root, number, ext)
+
+def page_files(index_name):             # the pages written beside index_name
+    pages = []
+    while path.exists(page_name(index_name, len(pages) + 1)):
+        pages.append(page_name(index_name, len(pages) + 1))
+    return pages
+
+def remove_pages(index_name, after = 0):    # removes index_name's pages numbered after after - left
+    number = after + 1                          # from a longer document, written there before
+    while path.exists(page_name(index_name, number)):
+        os.remove(page_name(index_name, number))
+        number += 1
+
+def href(file_name):                    # a link to the file, from beside it
+    name = path.basename(file_name)
+    return quote(name if isinstance(name, str) else name.encode('utf-8'))
+
+def write_plainly(file_name, write):    # write(the_file) into file_name
+    with open(file_name, 'wb') as the_file:
+        write(the_file)
+
+def page_links(index_name, number, last):   # links to the index, and to the previous and next pages
+    links = ['<a href="%s">Index</a>' % href(index_name)]
+    if number > 1:
+        links.append('<a href="%s">&laquo; Page %d</a>' % (href(page_name(index_name, number - 1)), number - 1))
+    links.append('Page %d' % number)
+    if not last:
+        links.append('<a href="%s">Page %d &raquo;</a>' % (href(page_name(index_name, number + 1)), number + 1))
+    return '<p class="pages">%s</p>\n' % ' &nbsp; '.join(links)
+
+def write_page(renderer, the_file, lines, index_name, number, last):    # renderer.curr_row: the
+    the_html = HtmlSink(the_file)                                       # page's first line number
+    links = page_links(index_name, number, last)
+    renderer.write_header(the_html)
+    renderer.write_checks(the_html)
+    the_html.write('</div>' + links)
+    the_html.write('<pre id="preCode"><ol id="olCode"><li value="%d">' % (renderer.curr_row))
+    for piece in renderer.lines_html(0, lines):
+        the_html.write(piece)
+    the_html.write('</ol></pre>\n' + links + '<br/>\n')
+    if renderer.has_comments and renderer.comments:
+        renderer.add_comments_table(the_html)           # (of the page's comments)
+    the_html.write(GOTO_HASH % {"first": renderer.curr_row})
+    the_html.write('</body>\n</html>')
+    the_html.flush()
+
+def write_index(renderer, the_file, index_name, pages, listed):
+    the_html = HtmlSink(the_file)
+    the_html.write(HEADER % {"fname": renderer.file_name})
+    the_html.write(INDEX_STYLE % {"fcolor": renderer.fground, "bcolor": renderer.bground,
+        "fsize": renderer.font_size, "fface": renderer.font_face})
+    the_html.write('<body>\n<p id="top">%s - %s</p>\n' % (renderer.file_name, dt_stamp()))
+    the_html.write(INDEX_PAGESHEAD)
+    for (number, first, last) in pages:
+        the_html.write(INDEX_PAGEROW % {"href": href(page_name(index_name, number)), "number": number,
+            "first": first, "last": last})
+    if listed:
+        the_html.write(INDEX_COMMENTSHEAD)
+        for (number, line_no, comment, stamp) in listed:
+            the_html.write(INDEX_COMMENTROW % {"href": href(page_name(index_name, number)),
+                "line_no": line_no + 1, "stamp": stamp, "comment": comment})
+    the_html.write('</table>\n</body>\n</html>')
+    the_html.flush()
+
+def render_pages(renderer, lines, index_name, page_lines = PAGE_LINES, write_file = None):
+    write_file = write_file or write_plainly    # (file name, write) - writes a file, write(the_file)
+    page_lines = max(1, page_lines)             # filling it; returns the pages' file names
+    first_line = renderer.curr_row
+    pages, listed = ([], [])        # [(number, first line, last line), ..], [(number, line number, comment,
+    lines = iter(lines)             # stamp), ..] for the index
+    pending = list(itertools.islice(lines, 1))  # (the next page's first line, if there is one)
+    renderer.start_lines()
+    while True:
+        page = pending + list(itertools.islice(lines, page_lines - len(pending)))
+        pending = list(itertools.islice(lines, 1))
+        number = len(pages) + 1
+        renderer.curr_row = first_line if not pages else pages[-1][2] + 1
+        renderer.comments_list = []
+        def write(the_file):
+            write_page(renderer, the_file, page, index_name, number, not pending)
+        write_file(page_name(index_name, number), write)
+        pages.append((number, renderer.curr_row, renderer.curr_row + max(0, len(page) - 1)))
+        listed.extend([(number, line_no, comment, stamp) for (line_no, comment, stamp) in renderer.comments_list])
+        if not pending:
+            break
+    renderer.end_lines()
+    renderer.curr_row = first_line
+    write_file(index_name, lambda the_file: write_index(renderer, the_file, index_name, pages, listed))
+    remove_pages(index_name, len(pages))
+    return [page_name(index_name, number) for (number, _, _) in pages]
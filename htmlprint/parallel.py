@@ -0,0 +1,49 @@
+# Renders the lines of one (large) document on a pool of processes. A line's HTML depends only on the
+# line itself and the comments on it, so the lines are sent out in chunks, each rendered by the
+# worker's copy of the renderer, and the chunks' HTML is written back in order - the document is the
+# same as HtmlRenderer.convert_lines() would make it alone.
+
+import bisect, itertools, multiprocessing
+
+CHUNK_LINES = 2000                      # lines sent to a worker at a time
+
+WORKER = {}                             # the worker's renderer, set by init_worker()
+
+def init_worker(renderer):
+    WORKER['renderer'] = renderer
+
+def render_chunk(job):                  # (first row, [(begin, text, runs), ..]) -> (html, [(line number,
+    first_row, lines = job              # comment, stamp), ..] for the comments-table)
+    renderer = WORKER['renderer']
+    renderer.comments_list = []
+    if renderer.has_comments:           # (the walk of the comment-points starts at the chunk)
+        renderer.next_comment = bisect.bisect_left(renderer.comment_points, lines[0][0])
+    return (u''.join(renderer.lines_html(first_row, lines)), renderer.comments_list)
+
+def chunks(lines, size):                # (first row, [line, ..]) for each size lines
+    lines = iter(lines)
+    row = 0
+    while True:
+        chunk = list(itertools.islice(lines, size))
+        if not chunk:
+            return
+        yield (row, chunk)
+        row += len(chunk)
+
+def convert_lines_parallel(renderer, the_html, lines, processes):
+    try:
+        pool = multiprocessing.Pool(processes or None, init_worker, (renderer,))
+    except (ImportError, OSError, NotImplementedError):    # no pool here (no working semaphores, or
+        for piece in renderer.lines_html(0, lines):         # no CPU count) - rendered alone instead
+            the_html.write(piece)
+        return
+    try:
+        for (html, listed) in pool.imap(render_chunk, chunks(lines, CHUNK_LINES)):
+            the_html.write(html)
+            renderer.comments_list.extend(listed)
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
@@ -0,0 +1,514 @@
+import datetime, bisect
+
+UTF8 = ('utf-8', 'xmlcharrefreplace')               # arguments for encode() function
+
+HEADER = \
+"""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>%(fname)s</title>
+"""
+
+CSS_MAIN = \
+"""
+    <style type="text/css">
+    body { color: %(fcolor)s; background-color: %(bcolor)s; font: %(fsize)dpt '%(fface)s', Consolas, Monospace; }
+    #preCode { border: 0; margin: 0; margin-top: 1em; padding: 0; font: %(fsize)dpt '%(fface)s', Consolas, Monospace; }
+    span { color: %(fcolor)s; background-color: %(bcolor)s; display: inline; border: 0; margin: 0; padding: 0; }
+    * html a:hover { background: transparent; }
+"""
+
+CSS_COMMENTS = \
+"""
+    .tooltip {
+        border-bottom: 1px dotted %(dot_colour)s;
+        outline: none; text-decoration: none;
+        position: relative;
+    }
+    .tooltip .comment {
+        border-radius: 5px 5px;
+        -moz-border-radius: 5px;
+        -webkit-border-radius: 5px;
+        box-shadow: 5px 5px 5px rgba(0, 0, 0, 0.1);
+        -webkit-box-shadow: 5px 5px rgba(0, 0, 0, 0.1);
+        -moz-box-shadow: 5px 5px rgba(0, 0, 0, 0.1);
+
+        white-space: -moz-pre-wrap; /* Mozilla */
+        white-space: -hp-pre-wrap; /* HP printers */
+        white-space: -o-pre-wrap; /* Opera 7 */
+        white-space: -pre-wrap; /* Opera 4-6 */
+        white-space: pre-wrap; /* CSS 2.1 */
+        white-space: pre-line; /* CSS 3 (and 2.1 as well, actually) */
+        word-wrap: break-word; /* IE */
+
+        position: absolute; z-index: 99;
+        width: 250px; left: 1em; top: 2em; padding: 0.8em 1em;
+
+        margin-left: -999em;
+
+        color: blue; background: #FFFFAA; border: 1px solid #FFAD33;
+        font-family: Calibri, Tahoma, Geneva, sans-serif;
+        font-size: %(fsize)dpt; font-weight: bold;
+    }
+    .tooltip:hover .comment { margin-left: 0pt; }
+    .comment .stamp { position: absolute; top: 0;
+        color: black; background: #FFFFAA; font-size: x-small; }
+    #divComments { display: none; height: 400px; width: 540px; overflow: auto; margin: 0; }
+    #divComments.inpage { position: static; }
+    #divComments.inpage #bottom_row { display: none; }
+    #divComments.overlay { position: fixed; z-index: 99; height: 400px; right:50px;
+        top: 100px; bottom: auto; left: auto; }
+    #divComments.overlay_bl { position: fixed; z-index: 99; height: 200px; right: auto;
+        top: auto; bottom: 50px; left: 50px; overflow-y: scroll; }
+    #divComments.overlay #bottom_row, #divComments.overlay_bl #bottom_row { display: table-row; }
+    #tblComments {
+        box-shadow: 5px 5px 5px rgba(0, 0, 0, 0.1);
+        -webkit-box-shadow: 5px 5px rgba(0, 0, 0, 0.1);
+        -moz-box-shadow: 5px 5px rgba(0, 0, 0, 0.1);
+        border-collapse: collapse; margin: 0;
+        font-family: Calibri, Tahoma, Geneva, sans-serif;
+        color: #000000; background-color: lightyellow;
+    }
+    #tblComments th, #tblComments td { border: thin solid; padding: 5px; }
+    td.nos { width: 50px; text-align: right; padding-right: 10px !important; }
+    td.stamps {text-align: center; font-size: smaller; }
+    td.cmts { min-width: 400px; max-width: 600px; }
+"""
+
+CKBs_COMMENTS = \
+"""
+<p>Show table of comments:<input type="checkbox" name="ckbComments" id="ckbComments" value="1" onclick="listComments()">&nbsp;
+Overlay table of comments:<input type="checkbox" name="ckbOverlay" id="ckbOverlay" value="1" onclick="overlayComments()">&nbsp;
+Show/hide comments (disables hover):<input type="checkbox" name="ckbToggle" id="ckbToggle" value="1" onclick="toggleComments()"></p>
+"""
+
+SCOPED = \
+"""<span>%(t_text)s</span>"""
+SCOPEDCOLOR = \
+"""<span style="color:%(colour)s;">%(t_text)s</span>"""
+SCOPEDCLASS = \
+"""<span class="%(css_class)s">%(t_text)s</span>"""
+SCOPEDCOMMENT = \
+"""<a class="tooltip" href="#" onclick="return false;">%(scoped)s<span class="comment"><span class="stamp">%(stamp)s</span>%(comment)s</span></a>"""
+
+JS_STANDARD = \
+""" function dismissChecks() {
+        var chks = document.getElementById("dChecks");
+        chks.style.display = "none";
+    }
+    function tidySpaces() {
+        var olCode, spans, i, span_textnode, span_text, span_next, offLeft, newLeft;
+        if (document.getElementsByClassName) {
+            spans = document.getElementsByClassName('tidy');
+            if (spans != 'undefined' && spans.length) {
+                for ( i = 0; i < spans.length; i++ )
+                    spans[i].style.paddingLeft = (spans[i].style.paddingLeft == '0px') ? spans[i].prevValue : '0px';
+                return;
+            }
+        }
+        olCode = document.getElementById('olCode');
+        spans = olCode.getElementsByTagName('span');
+        for (i = 0; i < spans.length; i++) {
+            if ( spans[i].previousSibling ) {
+                if ( spans[i].className && spans[i].className == 'comment')
+                    continue;
+                span_textnode = spans[i].firstChild;
+                span_text = span_textnode.data;
+                tidied = span_text.replace(/\s{2,}$/,'');
+                if (span_text.length && (span_text.length > tidied.length)) {
+                    if ( spans[i].nextSibling ) {
+                        span_next = spans[i];
+                        while ( (span_next = span_next.nextSibling) && span_next.className
+                            && span_next.className == 'comment' && span_next.nextSibling )
+                            ;       // do nothing, get next span (or 'a' tag)
+                        if ( span_next ) {
+                            offLeft = span_next.offsetLeft;
+                            newLeft = (parseInt(offLeft / 60)) * 60 + 60;
+                            span_next.style.paddingLeft = (newLeft - offLeft) + 'px';
+                            span_next.className += (span_next.className) ? ' tidy' : 'tidy';
+                            span_next.prevValue = span_next.style.paddingLeft;
+                        }
+                    }
+                }
+            }
+        }
+    }
+"""
+
+JS_COMMENTS = \
+""" function listComments() {
+        var comments_div = document.getElementById('divComments');
+        if (!comments_div.style.display || comments_div.style.display == 'none') {
+            if (!comments_div.className || comments_div.className == 'inpage')
+                document.getElementById('preCode').style.display = 'none';
+            comments_div.style.display = 'block';
+        }
+        else {
+            comments_div.style.display = 'none';
+            document.getElementById('preCode').style.display = 'block';
+            document.getElementById('ckbComments').checked = false;
+        }
+    }
+    function overlayComments() {
+        var comments_div = document.getElementById('divComments');
+        document.getElementById('preCode').style.display = 'block';
+        if (document.getElementById('ckbOverlay').checked) {
+            comments_div.className = (document.getElementById('ckbBottom').checked) ?
+                'overlay_bl' : 'overlay';
+        }
+        else {
+            comments_div.className = 'inpage';
+        }
+    }
+    function tableToBottom() {
+        document.getElementById('divComments').className =
+            (document.getElementById('ckbBottom').checked) ? 'overlay_bl' : 'overlay'; 
+    }
+    function toggleComments() {
+        var comments, newMargin, i;
+        if (document.getElementsByClassName) {
+            comments = document.getElementsByClassName('comment');
+        }
+        else if (document.querySelectorAll) {
+            comments = document.querySelectorAll('.comment');
+        }
+        else {
+            return false;
+        }
+        newMargin = (document.getElementById('ckbToggle').checked) ? '0pt' : '-999em';
+        for (i = 0; i < comments.length; i++) {
+            comments[i].style.marginLeft = newMargin;
+        }
+    }
+    function gotoLine(line_no) {
+        var code_list = document.getElementById('olCode');
+        var code_lines = code_list.getElementsByTagName('li');
+        // scroll the line(-5) into view (so it's not right at the top)
+        line_no = (line_no - 5 + 1) * (line_no - 5 + 1 > 0);
+        code_lines[line_no].scrollIntoView();
+        return false;
+    }
+    function addComment(e) {
+        var span_target, awrapper, new_comment, comment_text;
+        if (!e) e = window.event;
+        span_target = e.target || e.srcElement;
+        if (span_target.nodeName != 'SPAN' || span_target.className == 'comment') {
+            return false;
+        }
+        awrapper = document.createElement('a');
+        awrapper.href = '#';
+        awrapper.onclick = function () { return false; };
+        awrapper.className = 'tooltip';
+        new_comment = document.createElement('textarea');
+        new_comment.className = 'comment';
+        new_comment.style.marginLeft = '0pt';
+        new_comment.style.backgroundColor = 'yellow';
+        comment_text = document.createTextNode('New comment text');
+        new_comment.appendChild(comment_text);
+        awrapper.appendChild(span_target.cloneNode(true));
+        awrapper.appendChild(new_comment);
+        span_target.parentNode.replaceChild(awrapper, span_target);
+        return false;
+    }
+    window.onload = function () {
+        document.getElementById('olCode').ondblclick = addComment;
+    };
+"""
+
+COMMENTS_TBLHEAD = \
+"""
+<div id="divComments" class="inpage">
+<table id="tblComments"> 
+    <tr><th>Line</th><th>dd/mm</th><th>The Comment</th></tr>
+"""
+COMMENTS_TBLROW = \
+"""
+    <tr><td class="nos"><a href="#" onclick="gotoLine(%(line_adj)s);return false;">%(line_no)s</a></td>
+    <td class="stamps">%(stamp)s</td><td class="cmts">%(comment)s</td></tr>
+"""
+COMMENTS_TBLEND = \
+"""
+    <tr id="bottom_row"><td colspan="3" style=\"font-size:smaller; text-align:right;\"><a href="#top">Top</a>&nbsp;&nbsp;
+    <a href="#" onclick="listComments();return false;">Close</a>&nbsp;&nbsp;
+    Position: bottom-left <input type="checkbox" name="ckbBottom" id="ckbBottom" value="1" onclick="tableToBottom()"></td>
+    </tr>
+</table>
+</div>
+"""
+
+def dt_stamp(when = None):              # when (seconds since the epoch), or now, as day/month hour:minute
+    the_time = datetime.datetime.now() if when is None else datetime.datetime.fromtimestamp(when)
+    return the_time.strftime("%d/%m %H:%M")
+
+def entity_ref(text, reverse=False):
+    if reverse:
+        return text.replace('&lt;', '<').replace('&gt;', '>').replace('&amp;', '&')
+    else:
+        return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+class HtmlSink(object):             # collects unicode pieces and writes them to a file (or in-memory
+    def __init__(self, target, block_size = 65536):     # target) encoded, in large blocks
+        self.target = target
+        self.block_size = block_size
+        self.pieces = []
+        self.pending = 0
+
+    def write(self, text):
+        self.pieces.append(text)
+        self.pending += len(text)
+        if self.pending >= self.block_size:
+            self.flush()
+
+    def flush(self):
+        if self.pieces:
+            self.target.write(u''.join(self.pieces).encode(*UTF8))
+            self.pieces = []
+            self.pending = 0
+
+def join_runs(begin, text, tokens):         # [(scope, begin, end), ..] for a line from its (scope,
+    runs = []                               # begin, end) tokens - whitespace joins the preceding run
+    for (scope, t_begin, t_end) in tokens:
+        if runs and scope != runs[-1][0]:
+            t_text = text[t_begin - begin:t_end - begin]
+            t_begin += len(t_text) - len(t_text.lstrip(' \t'))
+            if t_begin < t_end:
+                runs[-1][2] = t_begin
+                runs.append([scope, t_begin, t_end])
+            else:
+                runs[-1][2] = t_end
+        elif runs:
+            runs[-1][2] = t_end
+        else:
+            runs.append([scope, t_begin, t_end])
+    return [tuple(run) for run in runs]
+
+def text_lines(text):               # the lines of text (without newlines), one at a time
+    begin = 0
+    while True:
+        end = text.find('\n', begin)
+        if end < 0:
+            yield text[begin:]
+            return
+        yield text[begin:end]
+        begin = end + 1
+
+def file_lines(the_file):           # the lines of an open (text) file, as text_lines() would give them
+    line = u''
+    for line in the_file:
+        yield line[:-1] if line.endswith('\n') else line
+    if line == u'' or line.endswith('\n'):
+        yield u''                   # the (empty) line after the final newline
+
+def document_lines(lines, tokens = None, scope = 'text.plain '):   # (begin, text, runs) for each of
+    begin = 0                       # the lines, tokens being ordered (scope, begin, end) over their
+    if tokens is None:              # text - or None, to give all of the text the one scope
+        for line_text in lines:
+            yield (begin, line_text, [(scope, begin, begin + len(line_text))] if line_text else [])
+            begin += len(line_text) + 1
+        return
+    tokens = iter(tokens)
+    pending = next(tokens, None)
+    for line_text in lines:
+        end = begin + len(line_text)
+        line_tokens = []
+        while pending is not None and pending[1] < end:
+            scope, t_begin, t_end = pending
+            line_tokens.append((scope, max(t_begin, begin), min(t_end, end)))
+            if t_end > end:
+                break                       # the token continues on the next line
+            pending = next(tokens, None)
+        yield (begin, line_text, join_runs(begin, line_text, line_tokens))
+        begin = end + 1
+
+class HtmlRenderer(object):         # produces the HTML document from a colour-scheme and scoped lines
+    def __init__(self, scheme, file_name, numbers = False, font_size = 10, font_face = 'Consolas',
+            tab_size = 4, padd_top = 0, padd_bottom = 0, curr_row = 1, comments = None, css_classes = False,
+            fragments = None, processes = 1):
+        self.bground, self.fground, self.gfground, self.colours = scheme    # as from load_scheme()
+        self.file_name = file_name
+        self.numbers = numbers
+        self.font_size = font_size
+        self.font_face = font_face
+        self.tab_size = tab_size
+        self.padd_top = padd_top
+        self.padd_bottom = padd_bottom
+        self.curr_row = curr_row            # line number of the first line
+        self.comments = comments or {}      # {pt: Comment, ..}
+        self.has_comments = (len(self.comments) > 0)
+        self.comments_list = []     # [(line number, comment, stamp), ..] for the commments-table
+        self.css_classes = css_classes      # one class per colour (in the style block), not inline styles
+        self.colour_classes = []            # [(colour, class name), ..] for the css_classes mode
+        if css_classes:
+            self.colour_classes = [(colour, 'c%d' % i) for (i, colour) in \
+                enumerate(c for c in self.colours.palette if c != self.fground)]
+        self.class_of = dict(self.colour_classes)
+        self.fragments = fragments          # a LineFragments, the lines of the last render to re-use
+        self.processes = processes          # to render the lines on (0 for one per CPU - see parallel.py)
+
+    def add_comments_table(self, the_html):
+        the_html.write(COMMENTS_TBLHEAD)
+
+        for (line_no, comment, stamp) in self.comments_list:
+            the_html.write(COMMENTS_TBLROW % {"line_adj": str(line_no - self.curr_row), \
+                "line_no": str(line_no + 1), "stamp": stamp, "comment": comment})
+
+        the_html.write(COMMENTS_TBLEND)
+
+    def write_header(self, the_html):
+        the_html.write(HEADER % {"fname": self.file_name})
+
+        the_html.write(CSS_MAIN % {"fcolor": self.fground, "bcolor": self.bground, \
+                    "fsize": self.font_size, "fface": self.font_face})
+
+        if self.numbers:
+            the_html.write('\t#olCode { list-style-type: decimal; list-style-position: outside; }\n')
+        else:
+            the_html.write('\t#olCode { list-style-type: none; list-style-position: inside; ' \
+                            + 'margin: 0px; padding: 0px; }\n')
+
+        the_html.write('\tli { color: %s; margin-top: %dpt; margin-bottom: %dpt; }\n' \
+            % (self.gfground, self.padd_top, self.padd_bottom))
+
+        for (colour, css_class) in self.colour_classes:
+            the_html.write('\t.%s { color: %s; }\n' % (css_class, colour))
+
+        if self.has_comments:
+            the_html.write(CSS_COMMENTS % { "dot_colour": self.fground, "fsize": self.font_size })
+
+        the_html.write('\t</style>\n')
+
+        the_html.write('\t<script type="text/javascript">\n')
+        the_html.write(JS_STANDARD)
+        if self.has_comments:
+            the_html.write(JS_COMMENTS)  # JS code to display comments
+        the_html.write('\t</script>\n')
+
+        the_html.write('</head>\n')
+
+    def start_lines(self):          # before the first line: the walk of the comment-points begins (and
+        if self.has_comments:       # the lines of the last render are offered for re-use)
+            self.comments_list = []     # [(line number, comment, stamp), ..] for the commments-table
+            self.comment_points = list(getattr(self.comments, 'points', None) or sorted(self.comments))
+            self.next_comment = 0       # index of the first comment-point not yet passed
+        if self.fragments is not None:
+            self.fragments.begin((self.colours, self.fground, self.tab_size, self.css_classes))
+
+    def end_lines(self):
+        if self.fragments is not None:
+            self.fragments.end()
+
+    def convert_lines(self, the_html, lines):     # lines: (begin, text, [(scope, begin, end), ..])
+        self.start_lines()
+        if self.processes != 1 and self.fragments is None:
+            from .parallel import convert_lines_parallel
+            convert_lines_parallel(self, the_html, lines, self.processes)
+            return
+        for piece in self.lines_html(0, lines):
+            the_html.write(piece)
+        self.end_lines()
+
+    def lines_html(self, first_row, lines):     # the HTML for lines, the first of them being row first_row
+        for (row, (line_begin, line_text, runs)) in enumerate(lines, first_row):
+            if not line_text:
+                yield '<li>\n</li>' if row else '\n</li>'
+                continue
+            if row:
+                yield '<li>'            # (the 1st opening-li is already in place)
+            if self.fragments is None:
+                for span in self.line_spans(row, line_text, line_begin, runs):
+                    yield span
+            else:
+                yield self.line_fragment(row, line_text, line_begin, runs)
+            yield '</li>'
+
+    def line_fragment(self, row, line_text, line_begin, runs):  # the line's spans, as last rendered if
+        line_comments = ()                                      # its text, scopes and comments are the same
+        if self.has_comments:
+            points = self.comment_points
+            line_end = line_begin + len(line_text)
+            line_comments = tuple([(pt - line_begin, self.comments[pt].comment, self.comments[pt].shown_stamp())
+                for pt in points[bisect.bisect_left(points, line_begin):bisect.bisect_left(points, line_end)]])
+        key = (line_text, tuple([(scope_name, pt - line_begin, end - line_begin) for (scope_name, pt, end) in runs]),
+            line_comments)
+        fragment = self.fragments.get(key)
+        if fragment is None:
+            listed = len(self.comments_list)
+            html = u''.join(self.line_spans(row, line_text, line_begin, runs))
+            fragment = (html, [(comment, stamp) for (_, comment, stamp) in self.comments_list[listed:]])
+        elif fragment[1]:
+            line_no = self.curr_row - 1 + row
+            self.comments_list.extend([(line_no, comment, stamp) for (comment, stamp) in fragment[1]])
+        self.fragments.keep(key, fragment)
+        return fragment[0]
+
+    def line_spans(self, row, line_text, line_begin, runs):     # the HTML for each of a line's runs
+        pending = None                      # [colour, text] still to be written (css_classes mode),
+        for (scope_name, pt, end) in runs:  # so that neighbours of the same colour are merged
+            tidied_text = line_text[pt - line_begin:end - line_begin]
+            the_colour = self.colours.resolve(scope_name.strip())
+            the_comment = None; the_stamp = None
+
+            if tidied_text and self.has_comments:   # walk the comment-points alongside the runs
+                points = self.comment_points
+                while self.next_comment < len(points) and points[self.next_comment] < pt:
+                    self.next_comment += 1
+                if self.next_comment < len(points) and points[self.next_comment] < end:
+                    comment = self.comments[points[self.next_comment]]
+                    the_comment, the_stamp = (comment.comment, comment.shown_stamp())
+
+            tidied_text = entity_ref(tidied_text)
+            tidied_text = tidied_text.replace('\t', ' ' * self.tab_size).strip('\r\n')
+            if self.css_classes and the_comment is None:
+                if pending is not None and pending[0] == the_colour:
+                    pending[1] += tidied_text
+                    continue
+                if pending is not None:
+                    yield self.span(*pending)
+                pending = [the_colour, tidied_text]
+                continue
+            if pending is not None:
+                yield self.span(*pending)
+                pending = None
+            the_span = self.span(the_colour, tidied_text)
+            if the_comment is not None:
+                the_span = (SCOPEDCOMMENT % { "scoped": the_span, "comment": the_comment, "stamp": the_stamp })
+                line_no = self.curr_row - 1 + row
+                self.comments_list.append((line_no, the_comment, the_stamp))    # for the comments table
+            yield the_span
+        if pending is not None:
+            yield self.span(*pending)
+
+    def span(self, the_colour, tidied_text):
+        if the_colour == self.fground:
+            return (SCOPED % { "t_text": tidied_text })         # just use body (default) color
+        elif self.css_classes:
+            return (SCOPEDCLASS % { "css_class": self.class_of[the_colour], "t_text": tidied_text })
+        else:
+            return (SCOPEDCOLOR % { "colour": the_colour, "t_text": tidied_text })
+
+    def write_checks(self, the_html):       # the top of the body, with the options' check-boxes
+        the_html.write('<body>\n<p id="top" style="color:%s">%s - %s</p>\n' % (self.fground, self.file_name, dt_stamp()))
+        the_html.write('<div id="dChecks"><p>Attempt to tidy spaces:<input type="checkbox" name="ckbTidy" ' \
+            + 'id="ckbTidy" value="1" onclick="tidySpaces()">&nbsp;\n')
+        the_html.write('Remove these check-boxes:<input type="checkbox" name="ckbDismiss" ' \
+            + 'id="ckbDismiss" value="1" onclick="dismissChecks()"></p>\n')
+
+        if self.has_comments:
+            the_html.write(CKBs_COMMENTS)           # the checkbox options
+
+    def write_body(self, the_html, lines):
+        self.write_checks(the_html)
+        the_html.write('</div><pre id="preCode"><ol id="olCode"><li value="%d">' % (self.curr_row))    # use code's line numbering
+
+        self.convert_lines(the_html, lines)         # convert the code to HTML
+
+        the_html.write('</ol></pre>\n<br/>\n')
+        # included empty line (br) to allow copying of last line without issue
+
+    def render(self, the_html, lines):      # the complete document
+        self.write_header(the_html)
+        self.write_body(the_html, lines)
+        if self.has_comments and self.comments:                     # check if all comments were deleted
+            self.add_comments_table(the_html)                       # initially, display: none
+        the_html.write('</body>\n</html>')
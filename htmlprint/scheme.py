@@ -0,0 +1,87 @@
+import re, time
+from os import path
+try:
+    from plistlib import readPlist
+except ImportError:                 # Python 3.9+ dropped readPlist
+    import plistlib
+
+    def readPlist(plist_path):
+        with open(plist_path, 'rb') as plist_file:
+            return plistlib.load(plist_file)
+
+SCHEMES = {}        # colour-scheme path -> (mtime, scheme-details), parsed once per session
+
+class ScopeColours(object):         # the colour-scheme's scope selectors compiled into a trie, so that a
+    exclusion = re.compile(r"\s-\s*")  # full scope-name resolves to a colour without asking the view
+
+    def __init__(self, scheme_settings, default):
+        self.default = default
+        self.trie = ({}, [])                # (children by scope-part, rules ending at this node)
+        self.resolved = {}                  # scope-name -> colour, filled in as names are met
+        self.palette = [default]            # every colour the scheme can resolve to, in order
+        self.guessed = 0                    # scope-names resolved from the trie (not yet met) ..
+        self.guessing = 0.0                 # .. and the seconds spent on them
+        order = 0
+        for item in scheme_settings:
+            scope = item.get('scope', None)
+            colour = item.get('settings', {}).get('foreground', None)
+            if scope is None or colour is None:
+                continue
+            for selector in scope.split(','):
+                paths = [path.replace('>', ' ').split() for path in self.exclusion.split(selector)]
+                if not paths[0]:
+                    continue
+                node = self.trie
+                for part in paths[0][-1].split('.'):    # index the rule on its last (deepest) atom
+                    node = node[0].setdefault(part, ({}, []))
+                node[1].append((order, paths[0][:-1], paths[1:], colour))
+                order += 1                  # later rules win a tie, as in the editor
+            if colour not in self.palette:
+                self.palette.append(colour)
+
+    def rank(self, path, atoms, end):       # how well (if at all) the path matches atoms[:end]
+        ranking = []
+        for selector in reversed(path):
+            end -= 1
+            while end >= 0 and not (atoms[end] == selector or atoms[end].startswith(selector + '.')):
+                end -= 1
+            if end < 0:
+                return None
+            ranking.append((end, selector.count('.')))
+        return tuple(ranking)
+
+    def resolve(self, scope_name):
+        if scope_name in self.resolved:
+            return self.resolved[scope_name]
+        started = time.time()
+        atoms = scope_name.split()
+        best, the_colour = (None, self.default)
+        for depth, atom in enumerate(atoms):
+            node = self.trie
+            for parts, part in enumerate(atom.split('.')):
+                node = node[0].get(part, None)
+                if node is None:
+                    break
+                for (order, ancestors, excludes, colour) in node[1]:
+                    ranking = self.rank(ancestors, atoms, depth)
+                    if ranking is None or [x for x in excludes if self.rank(x, atoms, len(atoms)) is not None]:
+                        continue
+                    score = (depth, parts, ranking, order)
+                    if best is None or score > best:
+                        best, the_colour = (score, colour)
+        self.resolved[scope_name] = the_colour
+        self.guessed += 1
+        self.guessing += time.time() - started
+        return the_colour
+
+def load_scheme(scheme_path):       # (background, foreground, gutterForeground, ScopeColours)
+    mtime = path.getmtime(scheme_path)
+    if scheme_path in SCHEMES and SCHEMES[scheme_path][0] == mtime:
+        return SCHEMES[scheme_path][1]      # unchanged since it was last parsed
+    plist_file = readPlist(scheme_path)
+    colour_settings = plist_file["settings"][0]["settings"]
+    fground = colour_settings.get('foreground', '#000000')
+    scheme = (colour_settings.get('background', '#FFFFFF'), fground,
+        colour_settings.get('gutterForeground', fground), ScopeColours(plist_file["settings"], fground))
+    SCHEMES[scheme_path] = (mtime, scheme)
+    return scheme
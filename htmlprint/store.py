@@ -0,0 +1,275 @@
+# The .cmts file a view's comments are saved in. It holds a header, the comment-points (sorted) with
+# a fixed-width entry for each, a table of the distinct strings the entries use, and then a journal
+# of the changes saved since the file was last written in full. A save appends only what changed,
+# and the file is compacted (re-written) once its journal outgrows the comments. Files pickled by
+# earlier versions are read, once, and re-written in this format.
+#
+# A file is loaded by mapping it (or, where mmap isn't available, reading it): only its points are
+# read, and each entry is decoded (into the SortedComments) the first time the comment is used.
+
+import io, os, sys, time, datetime, struct, pickle
+try:
+    import mmap
+except ImportError:                     # optional - not every embedded Python has it (see the
+    mmap = None                         # 'linux_python2.6_lib' setting): the file is read instead
+try:
+    import array
+except ImportError:
+    array = None                        # (the u32s are unpacked into a list)
+from .files import write_atomically
+from .comments import Comment, SortedComments
+
+MAGIC = b'PHCM'
+VERSION = 2
+HEADER = struct.Struct('<4sHHIII')      # magic, version, flags (none yet), count, offsets of the string
+                                        # table and of the journal
+                                        # - followed by the points (u32s), then the entries:
+PLACE = struct.Struct('<II')            # a comment's line and stamp (seconds since the epoch)
+ENTRY = struct.Struct('<IIII')          # word and comment (string indices), then the comment's PLACE
+RECORD = struct.Struct('<IcI')          # length (of what follows), 'S'et or 'D'elete, point - a set is
+                                        # followed by its PLACE, then the word and comment (each a length
+                                        # and utf-8 bytes)
+COUNT = struct.Struct('<I')
+COMPACT_AT = 64                         # journal records allowed, or as many as there are comments
+U32_MAX = 0xffffffff
+
+def u32(value, what):                   # value, if a u32 holds it - else an IOError, raised before
+    if not 0 <= value <= U32_MAX:       # anything is written (rather than a struct.error part way)
+        raise IOError('Cannot save a comment with a %s of %r.' % (what, value))
+    return value
+
+def encoded(text):                      # utf-8 bytes (a Python 2 str is taken to be utf-8 already)
+    return text if isinstance(text, bytes) else text.encode('utf-8')
+
+def pack_strings(strings):              # count, offsets (count + 1) into the block, the block
+    offsets = [0]
+    for text in strings:
+        offsets.append(offsets[-1] + len(text))
+    return COUNT.pack(len(strings)) + struct.pack('<%dI' % len(offsets), *offsets) + b''.join(strings)
+
+def u32s(data):                         # an array of the little-endian u32s in data
+    if array is None or array.array('I').itemsize != COUNT.size:
+        return list(struct.unpack('<%dI' % (len(data) // COUNT.size), data))
+    values = array.array('I')
+    if hasattr(values, 'frombytes'):
+        values.frombytes(data)
+    else:
+        values.fromstring(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+def legacy_stamp(text):                 # a pickled file's "day/month hour:minute" (within the last year)
+    now = datetime.datetime.now()       # -> seconds since the epoch, or now if it can't be read
+    try:
+        when = datetime.datetime.strptime('%d/%s' % (now.year, text), '%Y/%d/%m %H:%M')
+        if when > now:
+            when = when.replace(year = now.year - 1)
+    except ValueError:
+        return int(time.time())
+    return int(time.mktime(when.timetuple()))
+
+def pack_comments(comments):            # the whole file, with an empty journal
+    points = sorted(comments)
+    strings, index, entries = ([], {}, [])
+    for pt in points:
+        the_comment = comments[pt]
+        entry = []
+        for text in (encoded(the_comment.word), encoded(the_comment.comment)):
+            if text not in index:
+                index[text] = len(strings)
+                strings.append(text)
+            entry.append(index[text])
+        entries.extend(entry + [u32(the_comment.line, 'line'), u32(the_comment.stamp, 'stamp')])
+    points = [u32(pt, 'point') for pt in points]
+    body = struct.pack('<%dI' % len(points), *points) + struct.pack('<%dI' % len(entries), *entries)
+    table = pack_strings(strings)
+    strings_at = HEADER.size + len(body)
+    return HEADER.pack(MAGIC, VERSION, 0, len(points), strings_at, strings_at + len(table)) + body + table
+
+def pack_record(pt, value = None):      # a journal record: set pt to value, or delete it (value None)
+    if value is None:
+        return RECORD.pack(0, b'D', u32(pt, 'point'))
+    payload = [PLACE.pack(u32(value.line, 'line'), u32(value.stamp, 'stamp'))]
+    for text in (encoded(value.word), encoded(value.comment)):
+        payload.append(COUNT.pack(len(text)) + text)
+    payload = b''.join(payload)
+    return RECORD.pack(len(payload), b'S', u32(pt, 'point')) + payload
+
+def read_header(data):                  # -> (count, string-table offset, journal offset)
+    if len(data) < HEADER.size:
+        raise IOError('Not a comments file (too short).')
+    magic, version, _flags, count, strings_at, journal_at = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise IOError('Not a comments file.')
+    if version > VERSION:
+        raise IOError('Comments file is from a newer version (%d) of PrintHtml.' % version)
+    if version < VERSION:
+        raise IOError('Not a comments file.')
+    if HEADER.size + COUNT.size * count * 5 > strings_at or strings_at > journal_at or journal_at > len(data):
+        raise IOError('Comments file is damaged.')
+    return (count, strings_at, journal_at)
+
+def read_journal(data, pos, comments):  # applies the journal's records to comments
+    records = 0                         # -> (records, whether the journal ends cleanly)
+    while pos + RECORD.size <= len(data):
+        length, op, pt = RECORD.unpack_from(data, pos)
+        start, pos = (pos + RECORD.size, pos + RECORD.size + length)
+        if pos > len(data):
+            break                       # a save that didn't finish
+        if op == b'D':
+            comments.pop(pt, None)
+        elif op == b'S':
+            (line, stamp), at = (PLACE.unpack_from(data, start), start + PLACE.size)
+            texts = []
+            for _ in range(2):          # word, comment
+                size = COUNT.unpack_from(data, at)[0]
+                texts.append(data[at + COUNT.size:at + COUNT.size + size].decode('utf-8'))
+                at += COUNT.size + size
+            comments[pt] = Comment(texts[0], texts[1], line, stamp)
+        else:
+            break
+        records += 1
+    return (records, pos == len(data))
+
+class MappedEntries(object):            # the entries of a mapped .cmts file, decoded when asked for
+    def __init__(self, data, count, strings_at):
+        self.data = data
+        self.entries_at = HEADER.size + COUNT.size * count
+        strings = COUNT.unpack_from(data, strings_at)[0]
+        self.block = strings_at + COUNT.size * (strings + 2)
+        self.offsets = u32s(data[strings_at + COUNT.size:self.block])
+        self.words = {}                 # index -> word, as decoded
+
+    def text(self, index):
+        return self.data[self.block + self.offsets[index]:self.block + self.offsets[index + 1]].decode('utf-8')
+
+    def entry(self, index):             # -> Comment
+        word, comment, line, stamp = ENTRY.unpack_from(self.data, self.entries_at + ENTRY.size * index)
+        the_word = self.words.get(word, None)
+        if the_word is None:
+            the_word = self.words[word] = self.text(word)
+        return Comment(the_word, self.text(comment), line, stamp)
+
+class LegacyUnpickler(pickle.Unpickler):        # files pickled by earlier versions hold a dictionary of
+    def find_class(self, module, name):         # tuples - anything that needs a class (or function) to
+        raise pickle.UnpicklingError('%s.%s' % (module, name))  # load it is refused
+
+def unpickle_comments(data):
+    if sys.version_info[0] < 3:
+        unpickler = LegacyUnpickler(io.BytesIO(data))
+    else:
+        unpickler = LegacyUnpickler(io.BytesIO(data), encoding='utf-8')
+    try:
+        comments = unpickler.load()
+    except Exception:
+        raise IOError('Not a comments file.')
+    if not isinstance(comments, dict) or \
+            [v for v in comments.values() if not isinstance(v, tuple) or len(v) != 4]:
+        raise IOError('Not a comments file.')
+    return dict([(pt, Comment(word, comment, line, legacy_stamp(stamp)))
+        for (pt, (word, comment, line, stamp)) in comments.items()])
+
+class CommentStore(object):             # a .cmts file, and the comments it held when last read or written,
+    def __init__(self, path):           # so that a save need only append the changes
+        self.path = path
+        self.saved = {}                 # (entries not yet decoded are kept as their index in the file)
+        self.entries = None             # the MappedEntries of the loaded file
+        self.records = 0                # records in the file's journal
+        self.compact = True             # the next save re-writes the file in full
+        self.stat = None                # the file's (size, mtime) after we last read or wrote it
+        self.migrated = False           # the last load converted a pickled file
+        self.changes = []               # [(pt, Comment or None if removed), ..] written by the last save
+
+    def file_stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_size, st.st_mtime)
+
+    def load(self):                     # -> SortedComments, decoded as they are used
+        with open(self.path, 'rb') as the_file:
+            if the_file.read(len(MAGIC)) == MAGIC:
+                data = None
+                if mmap is not None:
+                    try:
+                        data = mmap.mmap(the_file.fileno(), 0, access = mmap.ACCESS_READ)
+                    except (EnvironmentError, ValueError):
+                        pass            # (a file system that can't map it) - read instead
+                if data is None:
+                    the_file.seek(0)
+                    data = the_file.read()
+            else:
+                the_file.seek(0)
+                data = None
+                legacy = the_file.read()
+        self.migrated = False
+        if data is not None:
+            count, strings_at, journal_at = read_header(data)
+            comments = SortedComments()
+            self.entries = MappedEntries(data, count, strings_at)
+            comments.attach(u32s(data[HEADER.size:self.entries.entries_at]), self.entries)
+            try:
+                self.records, clean = read_journal(data, journal_at, comments)
+            except (struct.error, UnicodeDecodeError):
+                raise IOError('Comments file is damaged.')
+            self.compact = not clean    # (don't append after a torn record)
+        else:
+            comments = SortedComments(unpickle_comments(legacy))
+            self.entries, self.compact = (None, True)
+        self.saved = dict.copy(comments)
+        self.stat = self.file_stat()
+        if data is None:
+            try:
+                self.save(comments)
+                self.migrated = True
+            except (IOError, OSError):
+                pass                    # read-only? it will be converted when next saved
+        return comments
+
+    def saved_items(self):              # [(pt, Comment), ..] as last read or written - decoding any entries
+        decode = self.entries.entry if self.entries is not None else None   # still in the file afresh
+        return [(pt, decode(value) if isinstance(value, int) else value)    # (not into the comments,
+            for (pt, value) in sorted(self.saved.items())]                  # which stay as they were)
+
+    def unchanged(self, pt, value):     # value (a comment, or an entry still in the file) is as saved?
+        saved = self.saved.get(pt, None)
+        if isinstance(saved, int) and not isinstance(value, int):
+            saved = self.entries.entry(saved)
+        return saved == value
+
+    def save(self, comments):           # -> the number of comments added, changed or removed
+        lazy = self.entries is not None and getattr(comments, 'source', None) is self.entries
+        if lazy:
+            values = dict.copy(comments)    # entries not yet decoded are compared by their index
+        else:
+            values = dict(comments.items())
+        changes = [(pt, value) for pt, value in values.items() if not self.unchanged(pt, value)]
+        changes = [(pt, comments[pt]) for pt, value in changes]     # (decoded)
+        changes.extend([(pt, None) for pt in self.saved if pt not in values])
+        if self.compact or self.file_stat() != self.stat or \
+                self.records + len(changes) > max(COMPACT_AT, len(comments)):
+            try:
+                data = pack_comments(comments)
+            except struct.error as e:
+                raise IOError('Cannot save the comments: %s' % e)
+            if lazy:
+                comments.source = None  # now all decoded, and the old file can be let go
+            self.entries, lazy = (None, False)
+            write_atomically(self.path, lambda the_file: the_file.write(data))
+            self.records, self.compact = (0, False)
+        elif changes:
+            changes.sort()
+            try:
+                records = b''.join([pack_record(pt, value) for pt, value in changes])
+            except struct.error as e:
+                raise IOError('Cannot save the comments: %s' % e)
+            self.compact = True         # until the records are all written
+            with open(self.path, 'ab') as the_file:
+                the_file.write(records)
+            self.records, self.compact = (self.records + len(changes), False)
+        self.saved = dict.copy(comments) if lazy else dict(comments.items())
+        self.stat = self.file_stat()
+        self.changes = changes
+        return len(changes)
@@ -0,0 +1,57 @@
+# Finding where an export's time goes: a PhaseTimer times its phases (which may nest, and may be
+# timed in several pieces, or elsewhere - on another thread - and added).
+
+import time
+
+class PhaseTimer(object):
+    def __init__(self):
+        self.started = time.time()
+        self.order = []             # [(name, depth), ..] in the order the phases were first begun
+        self.seconds = {}           # name -> seconds spent in the phase
+        self.open = []              # [(name, when begun), ..] the phases under way, innermost last
+
+    def phase(self, name):          # for a with-statement
+        return Phase(self, name)
+
+    def begin(self, name):
+        if name not in self.seconds:
+            self.order.append((name, len(self.open)))
+            self.seconds[name] = 0.0
+        self.open.append((name, time.time()))
+
+    def end(self):
+        name, begun = self.open.pop()
+        self.seconds[name] += time.time() - begun
+
+    def add(self, name, seconds):   # a phase timed elsewhere (on another thread, say)
+        if name not in self.seconds:
+            self.order.append((name, len(self.open)))
+            self.seconds[name] = 0.0
+        self.seconds[name] += seconds
+
+    def report(self):               # "setup 0.012s (theme 0.010s), scopes 1.234s, .. - total 2.076s"
+        parts, depth = ([], 0)
+        for (name, at) in self.order:
+            text = '%s %.3fs' % (name, self.seconds[name])
+            if at > depth:
+                text = '(' * (at - depth) + text
+            elif at < depth:
+                parts[-1] += ')' * (depth - at)
+            parts.append(text)
+            depth = at
+        if parts and depth:
+            parts[-1] += ')' * depth
+        return '%s - total %.3fs' % (', '.join(parts).replace(', (', ' ('), time.time() - self.started)
+
+class Phase(object):
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.timer.begin(self.name)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.timer.end()
+        return False
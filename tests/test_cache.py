@@ -0,0 +1,118 @@
+# Printing again: ExportCache re-using (and evicting) the files of recent exports, and, after an edit,
+# LineFragments re-using the HTML of the lines that did not change.
+
+import os, re, sys, shutil, tempfile, unittest
+from os import path
+
+sys.path[:0] = [path.dirname(path.dirname(path.abspath(__file__)))]
+from htmlprint import HtmlRenderer, ScopeColours, ExportCache, LineFragments, Comment, SortedComments, \
+    document_lines, text_lines
+
+SCHEME = ('#FFFFFF', '#000000', '#000000', ScopeColours([{'settings': {}},
+    {'scope': 'k', 'settings': {'foreground': '#FF0000'}}], '#000000'))
+KEYWORDS = [u'a', u'c', u'e', u'x']
+
+def render(text, fragments, comments = None, tab_size = 4):     # -> (the lines' HTML, comments_list)
+    tokens = [('k' if word.group() in KEYWORDS else 't', word.start(), word.end())
+        for word in re.finditer(r'\S+', text)]
+    renderer = HtmlRenderer(SCHEME, u'test', comments=comments, tab_size=tab_size, fragments=fragments)
+    renderer.start_lines()
+    html = u''.join(renderer.lines_html(0, document_lines(text_lines(text), iter(tokens))))
+    renderer.end_lines()
+    return (html, renderer.comments_list)
+
+class ExportCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def export(self, name, size = 4):   # -> the file written
+        file_name = path.join(self.dir, name)
+        with open(file_name, 'wb') as the_file:
+            the_file.write(b'x' * size)
+        return file_name
+
+    def left(self):                     # the files still there
+        return sorted(os.listdir(self.dir))
+
+    def test_the_least_recently_used_is_evicted_past_max_files(self):
+        cache = ExportCache(max_files=2)
+        for key in 'abc':
+            cache.add(key, self.export(key + '.html'))
+        self.assertEqual(cache.get('a'), None)
+        self.assertEqual(self.left(), ['b.html', 'c.html'])
+        self.assertEqual(cache.get('b'), path.join(self.dir, 'b.html'))     # (now the most recent)
+        cache.add('d', self.export('d.html'))
+        self.assertEqual(self.left(), ['b.html', 'd.html'])
+
+    def test_the_least_recently_used_is_evicted_past_max_bytes(self):
+        cache = ExportCache(max_bytes=10)
+        cache.add('a', self.export('a.html'))
+        cache.add('b', self.export('b.html'), [self.export('b-1.html')])   # (8 bytes with its page)
+        self.assertEqual(self.left(), ['b-1.html', 'b.html'])
+        cache.add('c', self.export('c.html', 20))      # (too big for it, but the most recent is kept)
+        self.assertEqual(self.left(), ['c.html'])
+        self.assertEqual(cache.get('c'), path.join(self.dir, 'c.html'))
+
+    def test_a_key_added_again_replaces_its_file(self):
+        cache = ExportCache()
+        cache.add('a', self.export('a.html'))
+        cache.add('a', self.export('a2.html'))
+        cache.add('a', path.join(self.dir, 'a2.html'))     # (the same file - kept)
+        self.assertEqual(self.left(), ['a2.html'])
+        self.assertEqual(cache.get('a'), path.join(self.dir, 'a2.html'))
+
+    def test_a_file_deleted_from_under_it_is_forgotten(self):
+        cache = ExportCache()
+        cache.add('a', self.export('a.html'))
+        os.remove(path.join(self.dir, 'a.html'))
+        self.assertEqual(cache.get('a'), None)
+        self.assertEqual(cache.entries, [])
+        cache.add('b', self.export('b.html'))
+        cache.clear()
+        self.assertEqual(self.left(), [])
+
+class LineFragmentsTest(unittest.TestCase):
+    TEXT = u'a b\nc d\ne f\n'
+
+    def test_unchanged_lines_are_reused_after_an_edit(self):
+        fragments = LineFragments()
+        render(self.TEXT, fragments)
+        self.assertEqual(fragments.hits, 0)
+        edited = u'a b\nc dd\ne f\n'
+        html, _ = render(edited, fragments)
+        self.assertEqual(fragments.hits, 2)
+        self.assertEqual(html, render(edited, None)[0])
+
+    def test_lines_moved_by_an_edit_are_reused(self):
+        fragments = LineFragments()
+        render(self.TEXT, fragments)
+        html, _ = render(u'x y\n' + self.TEXT, fragments)
+        self.assertEqual(fragments.hits, 3)
+        self.assertEqual(html, render(u'x y\n' + self.TEXT, None)[0])
+
+    def test_other_settings_render_every_line(self):
+        fragments = LineFragments()
+        render(self.TEXT, fragments)
+        render(self.TEXT, fragments, tab_size=8)
+        self.assertEqual(fragments.hits, 0)
+
+    def test_only_the_last_render_is_kept(self):
+        fragments = LineFragments()
+        render(self.TEXT, fragments)
+        render(u'g h\n', fragments)
+        render(self.TEXT, fragments)
+        self.assertEqual(fragments.hits, 0)
+
+    def test_a_reused_lines_comments_are_listed_at_its_new_line(self):
+        fragments = LineFragments()
+        render(self.TEXT, fragments, SortedComments([(4, Comment(u'c', u'on c', 1, 0))]))
+        html, listed = render(u'x y\n' + self.TEXT, fragments, SortedComments([(8, Comment(u'c', u'on c', 2, 0))]))
+        self.assertEqual(fragments.hits, 3)
+        self.assertEqual([row[:2] for row in listed], [(2, u'on c')])
+        self.assertTrue(u'on c' in html)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+# Printing files from the command line: the files found (source_files) and the names they're printed
+# as, and each file's failure kept to itself (export_files).
+
+import io, os, sys, shutil, tempfile, unittest
+from os import path
+
+REPO = path.dirname(path.dirname(path.abspath(__file__)))
+sys.path[:0] = [REPO]
+from htmlprint.cli import option_parser, source_files, main
+from htmlprint.batch import export_files
+
+SCHEME = path.join(REPO, 'ColorSchemes', 'Print-Color.tmTheme')
+
+class TempDirTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, name, data):        # -> the file's path
+        file_name = path.join(self.dir, name)
+        if not path.isdir(path.dirname(file_name)):
+            os.makedirs(path.dirname(file_name))
+        with open(file_name, 'wb') as the_file:
+            the_file.write(data)
+        return file_name
+
+class SourceFilesTest(TempDirTest):
+    def names(self, sources, skip_binary = True):   # -> [(src relative to the temp dir, rel), ..]
+        return [(path.relpath(src, self.dir), rel) for (src, rel) in
+            source_files([path.join(self.dir, source) for source in sources], skip_binary)]
+
+    def test_directories_are_walked_skipping_hidden_and_binary_files(self):
+        self.write(path.join('src', 'b.py'), b'b = 1\n')
+        self.write(path.join('src', 'a.png'), b'\x89PNG\r\n\x1a\n\0\0\0\rIHDR')
+        self.write(path.join('src', '.hidden'), b'x\n')
+        self.write(path.join('src', 'sub', 'c.py'), b'c = 1\n')
+        self.write(path.join('src', '.git', 'd.py'), b'd = 1\n')
+        self.assertEqual(self.names(['src']), [(path.join('src', 'b.py'), 'b.py'),
+            (path.join('src', 'sub', 'c.py'), path.join('sub', 'c.py'))])
+
+    def test_a_nul_after_the_first_block_is_text(self):
+        self.write('late.txt', b'x' * 10000 + b'\0')
+        self.assertEqual(self.names(['late.txt']), [('late.txt', 'late.txt')])
+
+    def test_binary_files_named_are_skipped(self):
+        self.write('a.bin', b'\0\1\2')
+        self.assertEqual(self.names(['a.bin']), [])
+        self.assertEqual(self.names(['a.bin'], False), [('a.bin', 'a.bin')])
+
+    def test_files_named_are_placed_from_the_directory_holding_them_all(self):
+        self.write(path.join('one', 'x.py'), b'x = 1\n')
+        self.write(path.join('two', 'deep', 'x.py'), b'x = 2\n')
+        self.assertEqual([rel for (_, rel) in self.names([path.join('one', 'x.py'),
+            path.join('two', 'deep', 'x.py')])], [path.join('one', 'x.py'), path.join('two', 'deep', 'x.py')])
+        self.assertEqual([rel for (_, rel) in self.names([path.join('two', 'deep', 'x.py')])], ['x.py'])
+
+    def test_directories_are_placed_from_the_directory_holding_them_all(self):
+        self.write(path.join('a', '__init__.py'), b'a = 1\n')
+        self.write(path.join('b', '__init__.py'), b'b = 1\n')
+        self.write(path.join('b', 'c', 'd.py'), b'd = 1\n')
+        self.assertEqual([rel for (_, rel) in self.names(['a', 'b'])], [path.join('a', '__init__.py'),
+            path.join('b', '__init__.py'), path.join('b', 'c', 'd.py')])
+        self.assertEqual([rel for (_, rel) in self.names(['b', path.join('a', '__init__.py')])],
+            [path.join('b', '__init__.py'), path.join('b', 'c', 'd.py'), path.join('a', '__init__.py')])
+
+    def test_a_file_given_twice_is_printed_once(self):
+        self.write(path.join('a', 'x.py'), b'x = 1\n')
+        self.assertEqual(self.names(['a', path.join('a', 'x.py')]), [(path.join('a', 'x.py'), 'x.py')])
+
+    def test_names_differing_only_in_case_are_refused(self):
+        self.write(path.join('a', 'x.py'), b'x = 1\n')
+        self.write(path.join('A', 'x.py'), b'x = 2\n')
+        self.assertRaises(IOError, self.names, ['A', 'a'])
+
+class MainTest(TempDirTest):
+    def test_each_directorys_files_are_printed_apart(self):
+        self.write(path.join('a', 'x.py'), b'x = 1\n')
+        self.write(path.join('b', 'x.py'), b'x = 2\n')
+        self.assertEqual(main(['-s', SCHEME, '-o', path.join(self.dir, 'out'), path.join(self.dir, 'a'),
+            path.join(self.dir, 'b')]), 0)
+        self.assertTrue(path.exists(path.join(self.dir, 'out', 'a', 'x.py.html')))
+        self.assertTrue(path.exists(path.join(self.dir, 'out', 'b', 'x.py.html')))
+
+    def test_sources_printed_to_one_name_are_an_error(self):
+        self.write(path.join('a', 'x.py'), b'x = 1\n')
+        self.write(path.join('A', 'x.py'), b'x = 2\n')
+        stderr, sys.stderr = (sys.stderr, io.StringIO() if sys.version_info[0] >= 3 else io.BytesIO())
+        try:
+            self.assertRaises(SystemExit, main, ['-s', SCHEME, '-o', path.join(self.dir, 'out'),
+                path.join(self.dir, 'a'), path.join(self.dir, 'A')])
+        finally:
+            sys.stderr = stderr
+        self.assertFalse(path.exists(path.join(self.dir, 'out')))
+
+class ExportFilesTest(TempDirTest):
+    def export(self, names, *args):     # -> [(src, error), ..] in the order given
+        options, _ = option_parser().parse_args(['-s', SCHEME] + list(args))
+        options.line_jobs = 1
+        jobs = [(self.write(name, b'one two\nthree\n'), path.join(self.dir, name + '.html')) for name in names]
+        results = dict([(src, error) for (src, _, _, error) in export_files(jobs, SCHEME, options)])
+        return [(path.basename(src), results[src]) for (src, _) in jobs]
+
+    def test_each_file_is_printed(self):
+        self.assertEqual(self.export(['a.txt', 'b.txt']), [('a.txt', None), ('b.txt', None)])
+        self.assertTrue(path.exists(path.join(self.dir, 'b.txt.html')))
+
+    def test_any_error_is_reported_as_the_files_failure(self):
+        results = self.export(['a.txt', 'b.txt'], '--encoding', 'no-such-encoding')
+        self.assertEqual([src for (src, _) in results], ['a.txt', 'b.txt'])
+        for (_, error) in results:
+            self.assertTrue(error.startswith('LookupError: '), error)
+        self.assertFalse(path.exists(path.join(self.dir, 'a.txt.html')))
+
+if __name__ == '__main__':
+    unittest.main()
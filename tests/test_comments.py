@@ -0,0 +1,131 @@
+# Comments following the edits made to a view: SortedComments.shift and CommentAnchors - and the words
+# a view's comments share.
+#
+#   python -m pytest tests        (or: python -m unittest discover tests)
+
+import sys, shutil, tempfile, unittest
+from os import path
+
+sys.path[:0] = [path.dirname(path.dirname(path.abspath(__file__)))]
+from htmlprint import Comment, SortedComments, CommentAnchors, CommentStore
+
+def numbered_lines(count):              # -> (text, [each line's begin-point, ..])
+    lines = ['word%d and more\n' % row for row in range(count)]
+    starts = [0]
+    for line in lines:
+        starts.append(starts[-1] + len(line))
+    return (''.join(lines), starts)
+
+def commented(starts, rows):            # a comment on the first word of each of rows
+    return SortedComments([(starts[row], Comment('word%d' % row, 'on %d' % row, row, 0)) for row in rows])
+
+class ShiftTest(unittest.TestCase):
+    def delete_rows(self, comments, starts, first, last):   # deletes rows first to last (inclusive)
+        pos = starts[first]
+        return comments.shift(pos, pos - starts[last + 1], first - (last + 1), first)
+
+    def test_insert_moves_later_comments(self):
+        text, starts = numbered_lines(10)
+        comments = commented(starts, [2, 5])
+        touched = comments.shift(starts[3], 12, 1, 3)
+        self.assertEqual(comments.points, [starts[2], starts[5] + 12])
+        self.assertEqual([c.line for c in comments.values()], [2, 6])
+        self.assertEqual(touched, [])
+
+    def test_deleting_a_block_keeps_each_comment(self):
+        text, starts = numbered_lines(20)
+        comments = commented(starts, [3, 5, 6, 12])
+        touched = self.delete_rows(comments, starts, 4, 8)
+        self.assertEqual(len(comments), 4)
+        self.assertEqual([c.comment for c in comments.values()], ['on 3', 'on 5', 'on 6', 'on 12'])
+        self.assertEqual([c.line for c in comments.values()], [3, 4, 4, 7])
+        pos = starts[4]
+        self.assertEqual(comments.points, [starts[3], pos, pos + 1, starts[12] - (starts[9] - pos)])
+        self.assertEqual(sorted(touched), [pos, pos + 1])
+
+    def test_deleting_a_larger_block_leaves_no_negative_line(self):
+        text, starts = numbered_lines(20)
+        comments = commented(starts, [3, 5, 6, 12])
+        self.delete_rows(comments, starts, 4, 10)
+        self.assertEqual([c.line for c in comments.values()], [3, 4, 4, 5])
+        comments = commented(starts, [5, 6])
+        comments.shift(starts[4], starts[4] - starts[11], -7)      # (the row of the deletion not known)
+        self.assertEqual([c.line for c in comments.values()], [0, 0])
+
+    def test_deleted_comments_nudge_later_ones_along(self):
+        text, starts = numbered_lines(10)
+        comments = commented(starts, [1, 2, 3])
+        comments[starts[3] + 1] = Comment('ord3', 'inside', 3, 0)
+        pos = starts[1]
+        comments.shift(pos, pos - starts[3], -2, 1)                 # rows 1 and 2 deleted
+        self.assertEqual(comments.points, [pos, pos + 1, pos + 2, pos + 3])
+        self.assertEqual([c.comment for c in comments.values()], ['on 1', 'on 2', 'on 3', 'inside'])
+        self.assertEqual([c.line for c in comments.values()], [1, 1, 1, 1])
+
+    def test_deleted_block_can_be_saved(self):
+        text, starts = numbered_lines(20)
+        comments = commented(starts, [3, 5, 6, 12])
+        self.delete_rows(comments, starts, 4, 10)
+        folder = tempfile.mkdtemp()
+        try:
+            store = CommentStore(path.join(folder, 'file.txtcmts'))
+            store.save(comments)
+            self.assertEqual(CommentStore(store.path).load(), comments)
+        finally:
+            shutil.rmtree(folder)
+
+class AnchorsTest(unittest.TestCase):
+    def setUp(self):
+        self.text, self.starts = numbered_lines(20)
+        self.comments = commented(self.starts, [3, 5, 6, 12])
+        self.anchors = CommentAnchors(self.comments, len(self.text), 19)
+        self.anchors.take_touched()
+
+    def edit(self, delta, rows, caret, cursor):     # an edit, with the caret before and after it
+        self.anchors.moved(caret)
+        self.anchors.modified(self.anchors.size + delta, self.anchors.rows + rows, cursor)
+        return self.anchors.take_touched()
+
+    def test_typing_at_the_caret_is_followed(self):
+        pt = self.starts[4] + 3
+        for i in range(5):
+            self.assertEqual(self.edit(1, 0, (pt + i, 4, 3 + i), (pt + i + 1, 4, 4 + i)), [])
+        self.assertEqual(self.edit(5, 1, (pt + 5, 4, 8), (pt + 10, 5, 4)), [])     # (a new, indented line)
+        self.assertEqual(self.edit(-2, 0, (pt + 10, 5, 4), (pt + 8, 5, 2)), [])    # backspaces
+        self.assertEqual(self.comments.points[:2], self.starts[3:4] + [self.starts[5] + 8])
+        self.assertEqual([c.line for c in self.comments.values()], [3, 6, 7, 13])
+
+    def test_deleting_back_over_a_commented_word(self):
+        pt = self.starts[5] + 5                     # (after word5)
+        touched = self.edit(-5, 0, (pt, 5, 5), (pt - 5, 5, 0))
+        self.assertEqual(touched, [self.starts[5]])
+        self.assertEqual(self.comments[self.starts[5]].line, 5)
+
+    def test_edits_away_from_the_caret_are_lost(self):
+        pt = self.starts[10]
+        self.assertEqual(self.edit(-3, 0, (pt, 10, 0), (pt, 10, 0)), None)         # trimmed elsewhere
+        self.assertEqual(self.edit(2, 0, (pt, 10, 0), (pt + 1, 10, 1)), None)      # ( typed as ()
+        self.assertEqual(self.edit(9, 1, (pt, 10, 0), (pt + 9, 11, 0)), None)      # a line above
+        self.assertEqual(self.edit(-20, -1, (pt, 10, 0), (pt - 20, 9, 2)), None)   # a block deleted
+        self.assertEqual(self.edit(1, 0, None, (pt + 1, 10, 1)), None)             # (no caret before)
+        self.assertEqual(self.comments.points, [self.starts[row] for row in [3, 5, 6, 12]])
+
+def word_copy(word):                    # an equal string that isn't word itself (as view.substr gives)
+    return word[:1] + word[1:]
+
+class SharedWordsTest(unittest.TestCase):
+    def test_comments_on_one_word_share_its_string(self):
+        comments = SortedComments([(0, Comment(word_copy(u'name'), u'a', 0, 0))])
+        comments[10] = Comment(word_copy(u'name'), u'b', 1, 0)
+        comments.update([(20, Comment(word_copy(u'name'), u'c', 2, 0))])
+        words = [c.word for c in comments.values()]
+        self.assertTrue(words[0] is words[1] and words[1] is words[2])
+
+    def test_the_words_go_with_the_comments(self):
+        comments = SortedComments([(0, Comment(u'gone', u'a', 0, 0))])
+        comments.clear()
+        self.assertEqual(comments.words, {})
+        self.assertEqual(SortedComments().words, {})
+
+if __name__ == '__main__':
+    unittest.main()
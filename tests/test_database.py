@@ -0,0 +1,104 @@
+# The database of every file's comments: CommentDatabase's updates and searches - with SQLite's
+# full-text index, and with LIKE where SQLite has none - and indexing a store's comments as loaded.
+
+import os, sys, shutil, tempfile, unittest
+from os import path
+
+sys.path[:0] = [path.dirname(path.dirname(path.abspath(__file__)))]
+from htmlprint import Comment, SortedComments, CommentStore, CommentDatabase
+from htmlprint import database
+
+ROOT = path.join(os.sep, 'project')
+MAIN = path.join(ROOT, 'src', 'main.py')
+UTIL = path.join(ROOT, 'src', 'lib', 'util.py')
+NOTES = path.join(ROOT, 'srcs', 'notes.txt')       # (not within src)
+
+def found(rows):                        # -> [(file name, pt, comment text), ..]
+    return [(file_name, pt, c.comment) for (file_name, pt, c) in rows]
+
+class DatabaseTest(unittest.TestCase):
+    modules = database.FTS_MODULES
+
+    def setUp(self):
+        database.FTS_MODULES, modules = (self.modules, database.FTS_MODULES)
+        try:
+            self.db = CommentDatabase(':memory:')
+        finally:
+            database.FTS_MODULES = modules
+        self.db.update_file(MAIN, {10: Comment(u'parse', u'Parses the header', 1, 100),
+            50: Comment(u'load', u'Loads 50% of it', 4, 300)})
+        self.db.update_file(UTIL, [(5, Comment(u'parse', u'Another parser', 0, 200)),
+            (9, Comment(u'x_y', u'snake_case name', 2, 50))])
+        self.db.update_file(NOTES, {0: Comment(u'todo', u'Parse later', 0, 400)})
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_words_match_by_their_beginning(self):
+        self.assertEqual(found(self.db.search(u'pars')), [(UTIL, 5, u'Another parser'),
+            (MAIN, 10, u'Parses the header'), (NOTES, 0, u'Parse later')])   # (by file, then line)
+        self.assertEqual(found(self.db.search(u'parse header')), [(MAIN, 10, u'Parses the header')])
+
+    def test_an_equals_sign_matches_the_commented_word(self):
+        self.assertEqual(found(self.db.search(u'=parse')), [(UTIL, 5, u'Another parser'),
+            (MAIN, 10, u'Parses the header')])
+        self.assertEqual(self.db.search(u'=pars'), [])
+
+    def test_nothing_lists_every_comment_the_most_recent_first(self):
+        self.assertEqual([pt for (_, pt, _) in self.db.search(u'')], [0, 50, 5, 10, 9])
+        self.assertEqual(len(self.db.search(u'', limit=2)), 2)
+
+    def test_folders_hold_only_their_own_files(self):
+        self.assertEqual(found(self.db.search(u'pars', [path.join(ROOT, 'src') + os.sep])),
+            [(UTIL, 5, u'Another parser'), (MAIN, 10, u'Parses the header')])
+        self.assertEqual(found(self.db.search(u'', [path.join(ROOT, 'srcs')])), [(NOTES, 0, u'Parse later')])
+
+    def test_points_are_updated_and_removed(self):
+        self.db.update_points(MAIN, [(10, None), (70, Comment(u'save', u'Saves it', 6, 500))], u'note')
+        self.assertEqual(found(self.db.search(u'', [path.join(ROOT, 'src')])), [(MAIN, 70, u'Saves it'),
+            (MAIN, 50, u'Loads 50% of it'), (UTIL, 5, u'Another parser'), (UTIL, 9, u'snake_case name')])
+        self.assertEqual(self.db.search(u'header'), [])
+        self.assertEqual(self.db.saved_as(MAIN), u'note')
+
+    def test_a_file_is_replaced_as_a_whole(self):
+        self.db.update_file(MAIN, {})
+        self.assertEqual(found(self.db.search(u'=parse')), [(UTIL, 5, u'Another parser')])
+
+class LikeDatabaseTest(DatabaseTest):   # (an SQLite without a full-text module)
+    modules = ('no_such_module',)
+
+    def test_no_full_text_module(self):
+        self.assertEqual(self.db.fts, None)
+
+    def test_percent_and_underscore_are_matched_as_themselves(self):
+        self.assertEqual(found(self.db.search(u'50%')), [(MAIN, 50, u'Loads 50% of it')])
+        self.assertEqual(found(self.db.search(u'e_c')), [(UTIL, 9, u'snake_case name')])
+        self.assertEqual(self.db.search(u'x%y'), [])
+        self.assertEqual(self.db.search(u's_a'), [])     # (not 'sna', in snake_case)
+
+class Fts3DatabaseTest(DatabaseTest):   # (an SQLite without fts4)
+    modules = ('no_such_module', 'fts3')
+
+    def test_the_next_module_is_used(self):
+        self.assertEqual(self.db.fts, 'fts3')
+
+class IndexStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_a_loaded_store_is_indexed_without_decoding_the_views_comments(self):
+        store = CommentStore(path.join(self.folder, 'file.txtcmts'))
+        store.save(SortedComments([(pt, Comment(u'w%d' % pt, u'comment %d' % pt, pt, 0)) for pt in range(5)]))
+        store = CommentStore(store.path)
+        comments = store.load()
+        db = CommentDatabase(':memory:')
+        self.assertEqual(db.update_file(u'file.txt', store.saved_items()), 5)
+        self.assertEqual(found(db.search(u'=w3')), [(u'file.txt', 3, u'comment 3')])
+        self.assertEqual([value for value in dict.values(comments) if not isinstance(value, int)], [])
+        db.close()
+
+if __name__ == '__main__':
+    unittest.main()
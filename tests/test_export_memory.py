@@ -0,0 +1,68 @@
+# An export's memory is bounded whatever the size of the view: print_html exports a large synthetic
+# text, against the stand-in sublime module in bench/, in a child process (of Python 2, which
+# PrintHtml.py is written for) that reports how far its resident memory grew over the export.
+
+import os, sys, json, subprocess, unittest
+from os import path
+
+TESTS = path.dirname(path.abspath(__file__))
+REPO = path.dirname(TESTS)
+LINES = 30000                           # (about 2.4 MB of text, 8 MB of HTML)
+BUDGET_KB = 16 * 1024                   # growth allowed, over the view and its tokens (a list of the
+                                        # lines, read before rendering them, took 41 MB)
+
+def current_rss_kb():                   # (Linux)
+    with open('/proc/self/statm') as the_file:
+        return int(the_file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+
+def export(lines):                      # (in the child) -> {'lines': .., 'growth_kb': ..}
+    import resource
+    sys.path[:0] = [path.join(REPO, 'bench'), REPO]
+    import sublime, corpus, desktop
+    sublime.PACKAGES[0] = path.dirname(REPO)
+    sublime.load_settings('Preferences.sublime-settings').update({'color_scheme':
+        'Packages/%s/ColorSchemes/Print-Color.tmTheme' % path.basename(REPO)})
+    opened = []
+    desktop.open = opened.append        # (not in a browser)
+    import PrintHtml
+    text, tokens = corpus.make(lines)
+    view = sublime.View(text, tokens)
+    sublime.WINDOW.view = view
+    view.rowcol(0)                      # (the stand-in indexes its lines, as the editor has)
+    before = current_rss_kb()
+    PrintHtml.PrintHtmlCommand(view).run(None, True, False)
+    growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+    size = path.getsize(opened[0])
+    os.remove(opened[0])
+    return {'lines': text.count('\n') + 1, 'html_bytes': size, 'growth_kb': growth}
+
+def python2():                          # a Python 2 to run the export in, or None
+    if sys.version_info[0] < 3:
+        return sys.executable
+    for name in ('python2', 'python2.7'):
+        try:
+            if subprocess.call([name, '-c', 'pass'], stderr=subprocess.STDOUT) == 0:
+                return name
+        except OSError:
+            pass
+    return None
+
+class ExportMemoryTest(unittest.TestCase):
+    def test_large_export_within_budget(self):
+        if not path.exists('/proc/self/statm'):
+            self.skipTest('needs /proc to read the resident memory')
+        python = python2()
+        if python is None:
+            self.skipTest('needs Python 2, to import PrintHtml.py')
+        output = subprocess.check_output([python, path.abspath(__file__), str(LINES)])
+        report = json.loads(output.decode('utf-8'))
+        self.assertEqual(report['lines'], LINES + 1)
+        self.assertTrue(report['html_bytes'] > 4 * 2 ** 20)
+        self.assertTrue(report['growth_kb'] < BUDGET_KB,
+            'the export grew by %d KB (over %d KB)' % (report['growth_kb'], BUDGET_KB))
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1].isdigit():
+        sys.stdout.write(json.dumps(export(int(sys.argv[1]))))
+    else:
+        unittest.main()
@@ -0,0 +1,51 @@
+# Rendering one document's lines on a pool of processes (processes, as -j sets it): the same HTML as
+# rendering them alone, and rendered alone where a pool can't be started.
+
+import io, sys, unittest
+from os import path
+
+sys.path[:0] = [path.dirname(path.dirname(path.abspath(__file__)))]
+from htmlprint import HtmlRenderer, HtmlSink, ScopeColours, Comment, SortedComments, document_lines, text_lines
+from htmlprint import parallel
+
+SCHEME = ('#FFFFFF', '#000000', '#000000', ScopeColours([{'settings': {}},
+    {'scope': 'k', 'settings': {'foreground': '#FF0000'}}], '#000000'))
+TEXT = u''.join([u'k%d = <%d> & x\n' % (row, row) for row in range(40)])
+
+def body(processes):                    # -> (the document's body, its comments-table rows)
+    starts = [0] + [i + 1 for (i, c) in enumerate(TEXT) if c == u'\n']
+    comments = SortedComments([(starts[row], Comment(u'k%d' % row, u'On %d' % row, row, 0))
+        for row in (0, 6, 7, 20, 39)])
+    tokens = [('k' if TEXT[pt] == u'k' else 't', pt, pt + 2) for pt in range(0, len(TEXT), 2)]
+    renderer = HtmlRenderer(SCHEME, u'test', comments=comments, processes=processes)
+    target = io.BytesIO()
+    the_html = HtmlSink(target)
+    renderer.write_body(the_html, document_lines(text_lines(TEXT), iter(tokens)))
+    the_html.flush()
+    return (target.getvalue(), renderer.comments_list)
+
+class Unavailable(object):              # a multiprocessing whose pool can't be started
+    def Pool(self, *args):
+        raise OSError('This platform lacks a functioning sem_open implementation')
+
+class ParallelTest(unittest.TestCase):
+    def setUp(self):
+        self.chunk_lines, parallel.CHUNK_LINES = (parallel.CHUNK_LINES, 7)    # (several chunks)
+
+    def tearDown(self):
+        parallel.CHUNK_LINES = self.chunk_lines
+
+    def test_a_pool_renders_the_same_document(self):
+        alone = body(1)
+        self.assertEqual(len(alone[1]), 5)
+        self.assertEqual(body(2), alone)
+
+    def test_rendered_alone_where_a_pool_cannot_be_started(self):
+        multiprocessing, parallel.multiprocessing = (parallel.multiprocessing, Unavailable())
+        try:
+            self.assertEqual(body(2), body(1))
+        finally:
+            parallel.multiprocessing = multiprocessing
+
+if __name__ == '__main__':
+    unittest.main()
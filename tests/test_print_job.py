@@ -0,0 +1,114 @@
+# PrintJob, print_html's export of a view: what it leaves behind when the export fails or is cancelled,
+# and printing again only what has changed since (PRINTED).
+# (PrintHtml.py is written for Sublime Text 2's Python 2 - these run there, against the stand-in
+# sublime module in bench/.)
+
+import os, sys, unittest
+from os import path
+
+REPO = path.dirname(path.dirname(path.abspath(__file__)))
+
+class Failing(object):              # a renderer that fails part way through
+    def __init__(self, error):
+        self.error = error
+
+    def render(self, the_html, lines):
+        for (i, line) in enumerate(lines):
+            the_html.write(u'<li>line</li>\n' * 100)
+            if i == 10:
+                raise self.error
+
+class Cancelling(object):           # a renderer whose print is cancelled part way through
+    job = None
+
+    def render(self, the_html, lines):
+        for (i, line) in enumerate(lines):
+            the_html.write(u'<li>line</li>\n' * 100)
+            if i == 10:
+                self.job.cancelled = True
+
+@unittest.skipIf(sys.version_info[0] >= 3, 'PrintHtml.py is Python 2: python2 -m unittest discover -s tests')
+class PrintJobTest(unittest.TestCase):
+    def setUp(self):
+        sys.path[:0] = [path.join(REPO, 'bench'), REPO]
+        import sublime, PrintHtml
+        self.PrintHtml = PrintHtml
+        self.view = sublime.View(u'line\n' * 100, [('text.plain ', 0, 500)])
+        self.lines = [(pt * 5, u'line', [('text.plain ', pt * 5, pt * 5 + 4)]) for pt in range(100)]
+
+    def print_with(self, renderer):
+        job = renderer.job = self.PrintHtml.PrintJob(self.view, ('key', id(renderer)), renderer,
+            iter(self.lines), 100)
+        job.start(False)
+        return job
+
+    def test_an_unexpected_error_is_reported(self):
+        job = self.print_with(Failing(ValueError('bad scope')))
+        self.assertTrue(isinstance(job.error, ValueError))
+        self.assertTrue(job.finished)
+        self.assertFalse(path.exists(job.file_name))
+        self.assertEqual(self.PrintHtml.PRINTED.get(job.key), None)
+
+    def test_a_cancelled_print_leaves_no_file(self):
+        job = self.print_with(Cancelling())
+        self.assertEqual((job.error, job.done), (None, 11))
+        self.assertFalse(path.exists(job.file_name))
+        self.assertEqual(self.PrintHtml.PRINTED.get(job.key), None)
+        job.remove_files()              # (again - nothing there now)
+
+    def test_the_view_calls_reading_the_lines_are_counted(self):
+        import sublime
+        view = sublime.View(u'a b\n\tc d e\n', [('a ', 0, 4), ('b ', 4, 11), ('a ', 11, 12)])
+        calls, sublime.CALLS = (dict(self.PrintHtml.VIEW_CALLS), {})
+        list(self.PrintHtml.scoped_lines(view, 0, view.size()))
+        self.assertEqual([(name, self.PrintHtml.VIEW_CALLS[name] - calls.get(name, 0)) for name in
+            sorted(sublime.CALLS)], sorted(sublime.CALLS.items()))
+
+@unittest.skipIf(sys.version_info[0] >= 3, 'PrintHtml.py is Python 2: python2 -m unittest discover -s tests')
+class PrintedTest(unittest.TestCase):
+    def setUp(self):
+        sys.path[:0] = [path.join(REPO, 'bench'), REPO]
+        import sublime, PrintHtml
+        self.sublime, self.PrintHtml = (sublime, PrintHtml)
+        sublime.PACKAGES[0] = path.dirname(REPO)
+        sublime.load_settings('Preferences.sublime-settings').update({'color_scheme':
+            'Packages/%s/ColorSchemes/Print-Color.tmTheme' % path.basename(REPO)})
+        self.opened = []
+        self.desktop_open, PrintHtml.desktop.open = (PrintHtml.desktop.open, self.opened.append)
+        self.view = sublime.View(u'one two\nthree\n', [('text.plain ', 0, 14)])
+        sublime.WINDOW.view = self.view
+        sublime.WINDOW.opened = []
+
+    def tearDown(self):
+        self.PrintHtml.desktop.open = self.desktop_open
+        self.PrintHtml.PRINTED.clear()
+
+    def print_view(self):           # -> the file opened
+        self.PrintHtml.PrintHtmlCommand(self.view).run(None, True, False)
+        return self.opened[-1]
+
+    def test_an_unchanged_view_opens_the_file_printed_before(self):
+        printed = self.print_view()
+        self.assertEqual(self.print_view(), printed)
+        self.assertEqual(self.sublime.MESSAGES[-1], 'Unchanged since last printed: %s' % printed)
+
+    def test_an_edited_view_is_printed_again(self):
+        printed = self.print_view()
+        self.view.replace_text(0, 3, u'ONE')
+        self.assertNotEqual(self.print_view(), printed)
+        with open(self.opened[-1], 'rb') as the_file:
+            self.assertTrue(b'ONE' in the_file.read())
+
+    def test_a_print_is_opened_in_the_active_window_once_its_view_is_closed(self):
+        def unavailable(file_name):
+            raise OSError('no browser')
+        self.PrintHtml.desktop.open = unavailable
+        self.view.window = lambda: None
+        self.PrintHtml.PrintHtmlCommand(self.view).run(None, True, False)
+        self.PrintHtml.PrintHtmlCommand(self.view).run(None, True, False)     # (unchanged - re-opened)
+        self.assertEqual(len(self.sublime.WINDOW.opened), 2)
+        self.assertTrue(self.sublime.WINDOW.opened[0].endswith('.html'))
+        self.assertEqual(self.sublime.WINDOW.opened[1], self.sublime.WINDOW.opened[0])
+
+if __name__ == '__main__':
+    unittest.main()
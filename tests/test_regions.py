@@ -0,0 +1,68 @@
+# CommentRegions, a view's comment highlights and gutter icons: a batch of changes drawn with one
+# add_regions (or erase_regions) for each key changed, and re-read once the view has changed.
+# (PrintHtml.py is written for Sublime Text 2's Python 2 - these run there, against the stand-in
+# sublime module in bench/.)
+
+import sys, unittest
+from os import path
+
+REPO = path.dirname(path.dirname(path.abspath(__file__)))
+
+@unittest.skipIf(sys.version_info[0] >= 3, 'PrintHtml.py is Python 2: python2 -m unittest discover -s tests')
+class CommentRegionsTest(unittest.TestCase):
+    def setUp(self):
+        sys.path[:0] = [path.join(REPO, 'bench'), REPO]
+        import sublime, PrintHtml
+        self.sublime = sublime
+        self.view = sublime.View(u'word ' * 100, [('text.plain ', 0, 500)])
+        self.regions = PrintHtml.CommentRegions(self.view)
+        sublime.CALLS.clear()
+
+    def drawn(self, key):               # -> [(begin, end), ..] as the view has them
+        return [(r.begin(), r.end()) for r in self.view.regions.get(key, [])]
+
+    def calls(self, *names):
+        return [self.sublime.CALLS.get(name, 0) for name in names]
+
+    def test_a_batch_is_drawn_once_for_each_key(self):
+        for pt in range(0, 500, 50):
+            self.regions.add('comments', self.sublime.Region(pt, pt + 4))
+            self.regions.add('hidden_cmts', self.sublime.Region(pt, pt + 4))
+        self.regions.remove('comments', 102)
+        self.assertEqual(self.drawn('comments'), [])      # (nothing drawn until flushed)
+        self.regions.flush()
+        self.assertEqual(self.calls('add_regions', 'get_regions'), [2, 3])  # (read once, for each key)
+        self.assertEqual(self.drawn('comments'), [(pt, pt + 4) for pt in range(0, 500, 50) if pt != 100])
+        self.assertEqual(len(self.drawn('hidden_cmts')), 10)
+
+    def test_only_the_keys_changed_are_drawn(self):
+        self.regions.set('comments', [self.sublime.Region(5, 9), self.sublime.Region(0, 4)])
+        self.regions.flush()
+        self.regions.set('comments', [self.sublime.Region(0, 4), self.sublime.Region(5, 9)])    # (as it is)
+        self.regions.remove('comments', 300)                                                  # (none there)
+        self.regions.set('comment_errs', [])
+        self.regions.flush()
+        self.assertEqual(self.calls('add_regions', 'erase_regions'), [1, 0])
+        self.regions.set('comments', [])
+        self.regions.flush()
+        self.assertEqual(self.calls('add_regions', 'erase_regions'), [1, 1])
+        self.assertEqual(self.drawn('comments'), [])
+
+    def test_the_regions_are_read_again_once_the_view_changes(self):
+        self.regions.add('comments', self.sublime.Region(10, 14))
+        self.regions.flush()
+        self.view.replace_text(0, 0, u'more ')              # (the editor moves the regions with it)
+        self.view.regions['comments'] = [self.sublime.Region(15, 19)]
+        self.regions.add('comments', self.sublime.Region(30, 34))
+        self.assertEqual([(r.begin(), r.end()) for r in self.regions.get('comments')], [(15, 19), (30, 34)])
+        self.assertEqual(self.calls('get_regions'), [6])     # (read twice, for each key)
+
+    def test_changes_not_yet_drawn_are_drawn_before_reading_again(self):
+        self.regions.add('comments', self.sublime.Region(10, 14))
+        self.view.replace_text(0, 0, u'')
+        self.regions.get('comments')
+        self.assertEqual(self.drawn('comments'), [(10, 14)])
+        self.assertEqual([(r.begin(), r.end()) for r in self.regions.get('comments')], [(10, 14)])
+
+if __name__ == '__main__':
+    unittest.main()
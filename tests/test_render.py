@@ -0,0 +1,170 @@
+# The rendering core: lines into scope runs (join_runs, document_lines), comments attached to the runs
+# they fall in, the output sink, and a document rendered as pages with an index of them (render_pages).
+
+import io, os, re, sys, shutil, tempfile, unittest
+from os import path
+
+sys.path[:0] = [path.dirname(path.dirname(path.abspath(__file__)))]
+from htmlprint import join_runs, document_lines, text_lines, HtmlSink, HtmlRenderer, ScopeColours, \
+    Comment, SortedComments, render_pages, page_name
+from htmlprint.pages import remove_pages
+
+class JoinRunsTest(unittest.TestCase):
+    def test_whitespace_joins_the_preceding_run(self):
+        self.assertEqual(join_runs(10, u'def  f', [('k', 10, 13), ('s', 13, 15), ('n', 15, 16)]),
+            [('k', 10, 15), ('n', 15, 16)])
+
+    def test_leading_whitespace_of_a_token_joins_the_preceding_run(self):
+        self.assertEqual(join_runs(0, u'def \tx', [('k', 0, 3), ('n', 3, 6)]), [('k', 0, 5), ('n', 5, 6)])
+
+    def test_tokens_of_one_scope_are_one_run(self):
+        self.assertEqual(join_runs(0, u'abc', [('k', 0, 1), ('k', 1, 3)]), [('k', 0, 3)])
+
+    def test_a_line_starting_with_whitespace_keeps_its_scope(self):
+        self.assertEqual(join_runs(0, u'  def', [('s', 0, 2), ('k', 2, 5)]), [('s', 0, 2), ('k', 2, 5)])
+
+    def test_no_tokens(self):
+        self.assertEqual(join_runs(0, u'', []), [])
+
+class DocumentLinesTest(unittest.TestCase):
+    def test_tokens_are_split_at_newlines(self):
+        text = u'a "b\nc" d'
+        tokens = [('n', 0, 1), ('t', 1, 2), ('q', 2, 7), ('t', 7, 8), ('n', 8, 9)]
+        self.assertEqual(list(document_lines(text_lines(text), tokens)), [
+            (0, u'a "b', [('n', 0, 2), ('q', 2, 4)]),
+            (5, u'c" d', [('q', 5, 8), ('n', 8, 9)])])
+
+    def test_one_scope(self):
+        self.assertEqual(list(document_lines([u'ab', u''], None, 'x')), [(0, u'ab', [('x', 0, 2)]), (3, u'', [])])
+
+def make_renderer(comments, curr_row = 1):
+    return HtmlRenderer(('#FFFFFF', '#000000', '#000000', ScopeColours([{'settings': {}}], '#000000')),
+        u'test', comments=comments, curr_row=curr_row)
+
+def rendered(text, tokens, comments, curr_row = 1):  # -> (the lines' HTML, the renderer's comments_list)
+    renderer = make_renderer(comments, curr_row)
+    renderer.start_lines()
+    html = u''.join(renderer.lines_html(0, document_lines(text_lines(text), iter(tokens))))
+    renderer.end_lines()
+    return (html, renderer.comments_list)
+
+def on(comments):                       # {pt: comment text, ..} -> SortedComments
+    return SortedComments([(pt, Comment(u'w', text, 0, 0)) for (pt, text) in comments.items()])
+
+class CommentWalkTest(unittest.TestCase):
+    TEXT = u'ab cd\nef gh\n'                # runs: (a, 0-3) (b, 3-5) / (a, 6-9) (b, 9-11)
+    TOKENS = [('a', 0, 2), ('s', 2, 3), ('b', 3, 5), ('s', 5, 6), ('a', 6, 8), ('s', 8, 9), ('b', 9, 11),
+        ('s', 11, 12)]
+
+    def test_each_comment_attaches_to_the_run_it_falls_in(self):
+        html, listed = rendered(self.TEXT, self.TOKENS, on({4: u'C1', 6: u'C2'}))
+        self.assertEqual([row[:2] for row in listed], [(0, u'C1'), (1, u'C2')])
+        first, second = html.split(u'</li>')[:2]
+        self.assertTrue(u'<span>cd</span><span class="comment">' in first)
+        self.assertTrue(u'<span>ef </span><span class="comment">' in second)
+
+    def test_a_comment_on_joined_whitespace_is_its_runs(self):
+        html, listed = rendered(self.TEXT, self.TOKENS, on({2: u'C1'}))
+        self.assertEqual([row[:2] for row in listed], [(0, u'C1')])
+        self.assertTrue(u'<span>ab </span><span class="comment">' in html)
+
+    def test_only_a_runs_first_comment_is_shown(self):
+        html, listed = rendered(self.TEXT, self.TOKENS, on({0: u'C1', 1: u'C2', 10: u'C3'}))
+        self.assertEqual([row[:2] for row in listed], [(0, u'C1'), (1, u'C3')])
+        self.assertFalse(u'C2' in html)
+
+    def test_line_numbers_follow_the_first_row(self):
+        html, listed = rendered(self.TEXT, self.TOKENS, on({9: u'C1'}), curr_row=100)
+        self.assertEqual([row[:2] for row in listed], [(100, u'C1')])
+
+    def test_a_plain_dict_of_comments_is_walked_in_order(self):
+        comments = dict(on({9: u'C2', 0: u'C1'}))
+        html, listed = rendered(self.TEXT, self.TOKENS, comments)
+        self.assertEqual([row[:2] for row in listed], [(0, u'C1'), (1, u'C2')])
+
+class CountingTarget(io.BytesIO):
+    def __init__(self):
+        io.BytesIO.__init__(self)
+        self.writes = 0
+
+    def write(self, data):
+        self.writes += 1
+        return io.BytesIO.write(self, data)
+
+class HtmlSinkTest(unittest.TestCase):
+    def test_pieces_are_written_in_blocks(self):
+        target = CountingTarget()
+        the_html = HtmlSink(target, block_size=100)
+        for i in range(100):
+            the_html.write(u'<i>%02d</i>' % i)
+        self.assertEqual(target.writes, 8)      # (12 pieces of 9 chars to a block)
+        the_html.flush()
+        self.assertEqual(target.writes, 9)
+        self.assertEqual(target.getvalue(), b''.join([b'<i>%02d</i>' % i for i in range(100)]))
+
+    def test_encoded_as_utf8_when_flushed(self):
+        target = io.BytesIO()
+        the_html = HtmlSink(target)
+        the_html.write(u'caf\u00e9 ')
+        the_html.write('plain')
+        self.assertEqual(target.getvalue(), b'')
+        the_html.flush()
+        the_html.flush()
+        self.assertEqual(target.getvalue().decode('utf-8'), u'caf\u00e9 plain')
+
+class PagesTest(unittest.TestCase):
+    TEXT = u''.join([u'line %d\n' % row for row in range(7)])     # (each line 7 characters)
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.index = path.join(self.dir, 'doc.html')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def read(self, file_name):
+        with open(file_name, 'rb') as the_file:
+            return the_file.read().decode('utf-8')
+
+    def render(self, page_lines = 3, curr_row = 1, comments = None):   # -> (the pages' file names, the
+        renderer = make_renderer(comments, curr_row)                        # renderer)
+        lines = document_lines(text_lines(self.TEXT[:-1]), None, 'x')
+        return (render_pages(renderer, lines, self.index, page_lines), renderer)
+
+    def test_each_page_holds_its_lines(self):
+        pages, _ = self.render()
+        self.assertEqual(pages, [page_name(self.index, number) for number in (1, 2, 3)])
+        for (page, rows) in zip(pages, ([0, 1, 2], [3, 4, 5], [6])):
+            self.assertEqual(re.findall(r'line (\d)', self.read(page)), [str(row) for row in rows])
+        self.assertFalse(u'&laquo;' in self.read(pages[0]))
+        self.assertFalse(u'&raquo;' in self.read(pages[2]))
+        self.assertTrue(u'<a href="doc-3.html">Page 3 &raquo;</a>' in self.read(pages[1]))
+
+    def test_line_numbers_continue_from_the_first_row(self):
+        pages, renderer = self.render(curr_row=10)
+        self.assertEqual([re.findall(r'<li value="(\d+)">', self.read(page)) for page in pages],
+            [['10'], ['13'], ['16']])
+        self.assertTrue(u'line_no = found[1] - 13;' in self.read(pages[1]))    # (#L14 is its second line)
+        self.assertEqual(re.findall(r'<td>(\d+ - \d+)</td>', self.read(self.index)), ['10 - 12', '13 - 15', '16 - 16'])
+        self.assertEqual(renderer.curr_row, 10)
+
+    def test_the_index_links_each_page_and_comment(self):
+        self.render(comments=SortedComments([(28, Comment(u'line', u'On five', 4, 0)),
+            (43, Comment(u'line', u'On seven', 6, 0))]))
+        index = self.read(self.index)
+        self.assertEqual(re.findall(r'<a href="(doc-\d\.html)">(\d)</a>', index),
+            [('doc-1.html', '1'), ('doc-2.html', '2'), ('doc-3.html', '3')])
+        self.assertEqual(re.findall(r'<a href="(doc-\d\.html#L\d+)">\d+</a>.*\n.*<td class="cmts">([^<]*)<', index),
+            [('doc-2.html#L5', u'On five'), ('doc-3.html#L7', u'On seven')])
+
+    def test_pages_of_a_longer_document_are_removed(self):
+        for number in (4, 5):
+            with open(page_name(self.index, number), 'wb') as the_file:
+                the_file.write(b'old')
+        pages, _ = self.render()
+        self.assertEqual(sorted(os.listdir(self.dir)), ['doc-1.html', 'doc-2.html', 'doc-3.html', 'doc.html'])
+        remove_pages(self.index, 1)
+        self.assertEqual(sorted(os.listdir(self.dir)), ['doc-1.html', 'doc.html'])
+
+if __name__ == '__main__':
+    unittest.main()
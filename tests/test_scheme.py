@@ -0,0 +1,53 @@
+# Resolving scope names to a colour-scheme's colours (ScopeColours), as the editor would match them.
+
+import sys, unittest
+from os import path
+
+sys.path[:0] = [path.dirname(path.dirname(path.abspath(__file__)))]
+from htmlprint import ScopeColours
+
+RULES = [{'settings': {'foreground': '#000000'}},
+    {'scope': 'string', 'settings': {'foreground': '#111111'}},
+    {'scope': 'invalid', 'settings': {'foreground': '#222222'}},
+    {'scope': 'invalid.deprecated', 'settings': {'foreground': '#333333'}},
+    {'scope': 'meta.structure.dictionary.json string.quoted.double.json', 'settings': {'foreground': '#444444'}},
+    {'scope': 'source - comment, text.html > keyword', 'settings': {'foreground': '#555555'}},
+    {'scope': 'comment', 'settings': {'foreground': '#666666'}}]
+
+class ScopeColoursTest(unittest.TestCase):
+    def setUp(self):
+        self.colours = ScopeColours(RULES, 'FG')
+
+    def assertResolves(self, scope_name, colour):
+        self.assertEqual(self.colours.resolve(scope_name), colour)
+
+    def test_the_deepest_match_wins(self):
+        self.assertResolves('source.python string.quoted punctuation.definition.string.begin', '#111111')
+        self.assertResolves('source.python comment.line', '#666666')
+
+    def test_the_more_specific_selector_wins(self):
+        self.assertResolves('source.x invalid.deprecated.y', '#333333')
+        self.assertResolves('source.x invalid.illegal', '#222222')
+
+    def test_ancestors(self):
+        self.assertResolves('source.json meta.structure.dictionary.json string.quoted.double.json', '#444444')
+        self.assertResolves('source.json string.quoted.double.json', '#111111')
+
+    def test_exclusions_and_child_selectors(self):
+        self.assertResolves('source.python', '#555555')
+        self.assertResolves('text.html keyword.x', '#555555')
+
+    def test_unmatched_names_take_the_default(self):
+        self.assertResolves('text.plain', 'FG')
+
+    def test_names_are_remembered(self):
+        self.colours.resolve('source.python comment.line')
+        self.assertEqual(self.colours.resolved['source.python comment.line'], '#666666')
+
+    def test_only_names_not_yet_met_are_guessed(self):
+        for scope_name in ('source.python comment.line', 'text.plain', 'source.python comment.line'):
+            self.colours.resolve(scope_name)
+        self.assertEqual(self.colours.guessed, 2)
+
+if __name__ == '__main__':
+    unittest.main()
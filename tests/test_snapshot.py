@@ -0,0 +1,65 @@
+# ViewSnapshot, what the comment commands answer from when walking many points: the view's words and line
+# offsets, with its text held only while a command is using it - a command looking up a point or two asks
+# the view. (PrintHtml.py is written for Sublime Text 2's Python 2 - these
+# run there, against the stand-in sublime module in bench/, whose set_timeout() runs at once.)
+
+import sys, unittest
+from os import path
+
+REPO = path.dirname(path.dirname(path.abspath(__file__)))
+
+@unittest.skipIf(sys.version_info[0] >= 3, 'PrintHtml.py is Python 2: python2 -m unittest discover -s tests')
+class ViewSnapshotTest(unittest.TestCase):
+    def setUp(self):
+        sys.path[:0] = [path.join(REPO, 'bench'), REPO]
+        import sublime, PrintHtml
+        self.sublime, self.PrintHtml = (sublime, PrintHtml)
+        self.view = sublime.View(u'def f(x):\n    return x.y\n', [('source.python ', 0, 25)])
+
+    def tearDown(self):
+        self.PrintHtml.SNAPSHOTS.pop(self.view.id(), None)
+
+    def test_words_and_lines_are_answered_as_the_view_would(self):
+        snap = self.PrintHtml.view_snapshot(self.view)
+        word = snap.word(16)
+        self.assertEqual((word.begin(), word.end(), snap.substr(word)), (14, 20, u'return'))
+        self.assertEqual(snap.substr(snap.word(21)), u'x')
+        self.assertEqual(snap.word(13), None)
+        self.assertEqual(snap.lines().rowcol(16), (1, 6))
+
+    def test_the_text_is_let_go_once_the_command_is_done(self):
+        snap = self.PrintHtml.view_snapshot(self.view)
+        snap.word(16)
+        snap.lines()
+        self.assertEqual(snap.held, None)
+        self.assertEqual(snap.lines().rowcol(25), (2, 0))   # (the line offsets are kept)
+
+    def test_a_change_begins_a_new_snapshot(self):
+        snap = self.PrintHtml.view_snapshot(self.view)
+        self.assertTrue(self.PrintHtml.view_snapshot(self.view) is snap)
+        self.view.replace_text(0, 3, u'async def')
+        changed = self.PrintHtml.view_snapshot(self.view)
+        self.assertFalse(changed is snap)
+        self.assertEqual(changed.substr(changed.word(2)), u'async')
+
+    def test_a_command_looking_up_a_few_points_asks_the_view(self):
+        self.assertEqual(self.PrintHtml.walk_snapshot(self.view, 2), None)
+        cmd = self.PrintHtml.CommentHtmlCommand(self.view)
+        self.sublime.CALLS.clear()
+        metrics = cmd.get_metrics(16)
+        self.assertEqual((metrics['word'], metrics['word_pt'], metrics['line'], metrics['col']), (u'return', 14, 1, 4))
+        self.assertEqual(sorted(self.sublime.CALLS.items()), [('rowcol', 1), ('substr', 1), ('word', 1)])
+        self.assertFalse(self.view.id() in self.PrintHtml.SNAPSHOTS)
+
+    def test_a_walk_of_many_points_reads_the_text_once(self):
+        snap = self.PrintHtml.walk_snapshot(self.view, self.PrintHtml.SNAPSHOT_POINTS + 1)
+        self.assertTrue(snap is self.PrintHtml.view_snapshot(self.view))
+        cmd = self.PrintHtml.CommentHtmlCommand(self.view)
+        words = [cmd.get_metrics(pt)['word'] for pt in (16, 21, 4)]
+        self.sublime.CALLS.clear()
+        snap.held = snap.text()             # (as if the command were still running)
+        self.assertEqual([cmd.get_metrics(pt, snap)['word'] for pt in (16, 21, 4)], words)
+        self.assertEqual(sorted(self.sublime.CALLS.items()), [('substr', 1)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+# The .cmts file: CommentStore's saves, in full and as journal records, what it refuses to save, and its
+# loads without mmap or array (where the Python has neither).
+
+import os, sys, shutil, tempfile, unittest
+from os import path
+
+sys.path[:0] = [path.dirname(path.dirname(path.abspath(__file__)))]
+from htmlprint import Comment, SortedComments, CommentStore
+from htmlprint import store
+
+class StoreTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.store = CommentStore(path.join(self.folder, 'file.txtcmts'))
+        self.comments = SortedComments([(pt * 10, Comment(u'word%d' % pt, u'comment \u00e9 %d' % pt, pt, 1000 + pt))
+            for pt in range(20)])
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def reloaded(self):
+        return CommentStore(self.store.path).load()
+
+    def test_saves_in_full_then_appends(self):
+        self.assertEqual(self.store.save(self.comments), 20)
+        self.comments[5] = Comment(u'new', u'added', 0, 2000)
+        del self.comments[100]
+        size = os.path.getsize(self.store.path)
+        self.assertEqual(self.store.save(self.comments), 2)
+        self.assertTrue(os.path.getsize(self.store.path) > size)    # (appended)
+        self.assertEqual(self.reloaded(), self.comments)
+
+    def test_a_negative_line_is_an_ioerror(self):
+        self.comments[7] = Comment(u'bad', u'line', -2, 0)
+        self.assertRaises(IOError, self.store.save, self.comments)
+        self.assertFalse(path.exists(self.store.path))
+
+    def test_a_bad_record_leaves_the_file_as_it_was(self):
+        self.store.save(self.comments)
+        size = os.path.getsize(self.store.path)
+        self.comments[7] = Comment(u'bad', u'stamp', 0, -1)
+        self.assertRaises(IOError, self.store.save, self.comments)
+        self.assertEqual(os.path.getsize(self.store.path), size)
+        del self.comments[7]
+        self.assertEqual(self.reloaded(), self.comments)
+
+    def test_only_this_versions_files_are_read(self):
+        self.store.save(self.comments)
+        with open(self.store.path, 'rb') as the_file:
+            data = the_file.read()
+        for version in (store.VERSION - 1, store.VERSION + 1):
+            with open(self.store.path, 'wb') as the_file:
+                the_file.write(data[:4] + store.struct.pack('<H', version) + data[6:])
+            self.assertRaises(IOError, self.reloaded)
+
+    def test_loads_without_mmap_or_array(self):
+        self.store.save(self.comments)
+        self.comments[5] = Comment(u'new', u'added', 0, 2000)
+        self.store.save(self.comments)              # (and a journal record)
+        modules = (store.mmap, store.array)
+        store.mmap = store.array = None
+        try:
+            loaded = self.reloaded()
+        finally:
+            store.mmap, store.array = modules
+        self.assertEqual(loaded, self.comments)
+        self.assertEqual(loaded[50].comment, u'comment \u00e9 5')
+
+if __name__ == '__main__':
+    unittest.main()